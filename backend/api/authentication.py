@@ -0,0 +1,139 @@
+"""
+Stateless signed-token authentication for the API.
+
+A token is the user's id and a hash of their password hash, signed with
+SECRET_KEY and timestamped, so it needs no table and expires after
+API_TOKEN_MAX_AGE seconds. Changing the password invalidates it.
+
+Authenticating a request reads a small set of user claims instead of the
+user row. Claims are kept in the default cache and memoized in the worker
+for API_USER_CLAIMS_TIMEOUT seconds. Saving or deleting a user drops both,
+so flipping is_active revokes the user's tokens straight away in this
+worker and within API_USER_CLAIMS_TIMEOUT seconds in the others.
+QuerySet.update() sends no signal: call forget_claims() for the users it
+changed, or their claims stay valid until they time out.
+
+request.user is loaded with only the claim fields; the other fields are
+deferred, read from the database on first access, and left alone by
+save().
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import DEFERRED
+from django.utils.crypto import salted_hmac
+from rest_framework import authentication, exceptions
+
+TOKEN_SALT = 'api.authentication.token'
+CLAIM_FIELDS = ('id', 'email', 'slug', 'is_active', 'is_staff',
+                'is_superuser')
+
+_lock = threading.Lock()
+_local_claims = {}
+
+
+def _claims_key(user_id):
+    return f'api:user-claims:{user_id}'
+
+
+def _password_hash(password):
+    return salted_hmac(TOKEN_SALT, password or '').hexdigest()[:16]
+
+
+def issue_token(user):
+    """Return a signed API token for the user."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(
+        f'{user.pk}:{_password_hash(user.password)}'
+    )
+
+
+def load_claims(user_id):
+    """Return the cached claims of a user, or None if there is no user."""
+    now = time.monotonic()
+    with _lock:
+        claims, expires = _local_claims.get(user_id, (None, 0))
+    if expires > now:
+        return claims
+
+    key = _claims_key(user_id)
+    claims = cache.get(key)
+    if claims is None:
+        row = get_user_model().objects.filter(pk=user_id).values(
+            *CLAIM_FIELDS, 'password',
+        ).first()
+        claims = {}
+        if row is not None:
+            # Only a digest of the password hash is kept, for token checks.
+            claims = dict(row, password=_password_hash(row['password']))
+        cache.set(key, claims, settings.API_USER_CLAIMS_TIMEOUT)
+    with _lock:
+        _local_claims[user_id] = (
+            claims, now + settings.API_USER_CLAIMS_TIMEOUT,
+        )
+    return claims or None
+
+
+def forget_claims(user_id):
+    """Drop the cached claims of a user."""
+    cache.delete(_claims_key(user_id))
+    with _lock:
+        _local_claims.pop(user_id, None)
+
+
+def clear_local_claims():
+    with _lock:
+        _local_claims.clear()
+
+
+def user_from_claims(claims):
+    """Build a User instance from claims without a query.
+
+    Fields other than the claims are deferred, as with only(), so saving
+    the instance writes the claim fields and nothing else.
+    """
+    fields = get_user_model()._meta.concrete_fields
+    return get_user_model().from_db(
+        'default', [field.attname for field in fields],
+        [
+            claims[field.attname] if field.attname in CLAIM_FIELDS
+            else DEFERRED
+            for field in fields
+        ],
+    )
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """Authenticate "Authorization: Token <token>" headers."""
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        try:
+            value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+                auth[1].decode(), max_age=settings.API_TOKEN_MAX_AGE,
+            )
+            user_id, password_hash = value.split(':')
+            user_id = int(user_id)
+        except (signing.BadSignature, UnicodeError, ValueError):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        claims = load_claims(user_id)
+        if claims is None or not claims['is_active']:
+            raise exceptions.AuthenticationFailed(
+                'User inactive or deleted.',
+            )
+        if password_hash != claims['password']:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return user_from_claims(claims), None
+
+    def authenticate_header(self, request):
+        return self.keyword
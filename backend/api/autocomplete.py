@@ -0,0 +1,73 @@
+"""
+Prefix suggestions for books, authors and genres.
+
+Every lookup is `lower(column) LIKE 'prefix%'`, served by the
+text_pattern_ops expression indexes from core_db migrations 0012 and 0025.
+Authors come from the author leaderboard, one row per reviewed author, so
+no lookup aggregates books.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models.functions import Lower
+
+from core_db.models import AuthorLeaderboard, Book, Genre
+
+MIN_LENGTH = 2
+DEBOUNCE_MS = 150
+MAX_LIMIT = 20
+CACHE_TIMEOUT = 60
+
+
+def normalize_query(query):
+    return ' '.join((query or '').split()).lower()
+
+
+def suggest_books(prefix, limit):
+    return list(
+        Book.objects
+        .annotate(title_lower=Lower('title'))
+        .filter(title_lower__startswith=prefix)
+        .order_by('-review_count', 'title')
+        .values('slug', 'title', 'author', 'review_count')[:limit]
+    )
+
+
+def suggest_authors(prefix, limit):
+    """Reviewed authors as of the last refresh_leaderboards run."""
+    return list(
+        AuthorLeaderboard.objects
+        .annotate(author_lower=Lower('author'))
+        .filter(author_lower__startswith=prefix)
+        .order_by('-review_count', 'author')
+        .values('author', 'book_count', 'review_count')[:limit]
+    )
+
+
+def suggest_genres(prefix, limit):
+    return list(
+        Genre.objects
+        .annotate(name_lower=Lower('name'))
+        .filter(is_approved=True, name_lower__startswith=prefix)
+        .order_by('-review_count', 'name')
+        .values('slug', 'name', 'review_count')[:limit]
+    )
+
+
+def suggest(query, limit=10):
+    """Return cached top-`limit` suggestions for a typed prefix."""
+    prefix = normalize_query(query)
+    limit = max(1, min(limit, MAX_LIMIT))
+    if len(prefix) < MIN_LENGTH:
+        return {'books': [], 'authors': [], 'genres': []}
+
+    def build():
+        return {
+            'books': suggest_books(prefix, limit),
+            'authors': suggest_authors(prefix, limit),
+            'genres': suggest_genres(prefix, limit),
+        }
+
+    digest = hashlib.md5(prefix.encode()).hexdigest()
+    key = f'autocomplete:{limit}:{digest}'
+    return cache.get_or_set(key, build, CACHE_TIMEOUT)
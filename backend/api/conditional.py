@@ -0,0 +1,59 @@
+"""
+Conditional GET support for the public read endpoints.
+
+Each endpoint supplies a version function that reads only the stored
+updated_at columns of the objects it serves, in a single query. The
+result is memoized on the request so the ETag and Last-Modified checks
+share it, and a matching If-None-Match or If-Modified-Since is answered
+with 304 before the view loads anything else.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+CACHE_MAX_AGE = 60
+VARY_HEADERS = ('Accept',)
+
+
+def _version(request, version_func, kwargs):
+    if not hasattr(request, '_resource_version'):
+        request._resource_version = version_func(request, **kwargs)
+    return request._resource_version
+
+
+def conditional(version_func, max_age=CACHE_MAX_AGE):
+    """Make a view answer conditional GETs from `version_func`.
+
+    `version_func(request, **kwargs)` returns (key, last_modified) for the
+    resource, or None when it does not exist. The ETag is derived from the
+    key and last_modified, so it changes whenever the resource does.
+    """
+    def etag_func(request, **kwargs):
+        version = _version(request, version_func, kwargs)
+        if version is None:
+            raise Http404
+        key, last_modified = version
+        seed = f'{key}:{last_modified.isoformat() if last_modified else ""}'
+        return hashlib.md5(seed.encode()).hexdigest()
+
+    def last_modified_func(request, **kwargs):
+        version = _version(request, version_func, kwargs)
+        return version[1] if version else None
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag_func, last_modified_func=last_modified_func,
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, public=True, max_age=max_age)
+                patch_vary_headers(response, VARY_HEADERS)
+            return response
+        return wrapper
+    return decorator
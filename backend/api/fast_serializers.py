@@ -0,0 +1,218 @@
+"""
+Read-only serializers for hot list endpoints that skip model instances.
+
+A ValuesSerializer lists its output fields and, in `sources`, where the
+ones not named after a model field come from: a lookup such as
+'book__slug', a Nested to-one relation or a Many to-many relation. The
+first time a class is used its field plan is compiled once: the columns
+of a single values_list() query, including those of nested to-one
+serializers, and a function that turns one row tuple into the output
+dict, with converters only on the columns whose JSON form differs from
+the Python value (datetimes, decimals, uuids). A page then costs one
+query, plus one per Many field, and no model instances, field objects or
+per-field method calls.
+
+Output matches the ModelSerializer each one stands in for; see
+api/tests/test_fast_serializers.py.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+
+__all__ = ['Many', 'Nested', 'ValuesSerializer']
+
+
+class Nested:
+    """A to-one relation rendered as a dict, or None, by `serializer`."""
+
+    def __init__(self, serializer, source):
+        self.serializer = serializer
+        self.source = source
+
+
+class Many:
+    """A to-many relation rendered as a list by `serializer`.
+
+    The related rows of a whole page are fetched in one query, narrowed
+    by `queryset` when given (e.g. approved genres only) and in its order.
+    """
+
+    def __init__(self, serializer, source, queryset=None):
+        self.serializer = serializer
+        self.source = source
+        self.queryset = queryset
+
+
+def _datetime(value):
+    # Same as rest_framework.fields.DateTimeField with ISO 8601 output.
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+# Checked in order: DateTimeField is a DateField.
+CONVERTERS = (
+    (models.DateTimeField, _datetime),
+    (models.DateField, _isoformat),
+    (models.TimeField, _isoformat),
+    (models.DecimalField, str),
+    (models.UUIDField, str),
+)
+
+
+def _resolve(model, lookup):
+    """Return the model field at the end of `lookup`."""
+    field = None
+    for name in lookup.split('__'):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.get_field(name)
+    if field.is_relation and not field.many_to_many:
+        field = field.target_field
+    return field
+
+
+def _converter(field):
+    if isinstance(field, models.FileField):
+        raise ImproperlyConfigured(
+            f'{field} needs a request to build its URL; use a '
+            f'ModelSerializer.'
+        )
+    for field_class, convert in CONVERTERS:
+        if isinstance(field, field_class):
+            return convert
+    return None
+
+
+def _column(index, convert):
+    """Return a function reading row[index] through `convert`."""
+    if convert is None:
+        return itemgetter(index)
+
+    def get(row):
+        value = row[index]
+        return None if value is None else convert(value)
+    return get
+
+
+def _nested(guard, build):
+    """Return a function building a nested dict, or None if row[guard] is."""
+    def get(row):
+        return None if row[guard] is None else build(row)
+    return get
+
+
+def _none(row):
+    return None
+
+
+def _builder(getters):
+    """Return a function building a dict from (key, getter) pairs."""
+    def build(row):
+        return {key: get(row) for key, get in getters}
+    return build
+
+
+class ValuesSerializer:
+    """Serialize a queryset of `model` to a list of dicts.
+
+    Use like a read-only ModelSerializer with many=True: build it with
+    the queryset and read `.data`. The primary keys of the rows are left
+    in `.pks`, in the same order, for paging.
+    """
+    model = None
+    fields = ()
+    sources = {}
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.pks = []
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.serialize(self.queryset)
+        return self._data
+
+    @classmethod
+    def plan(cls):
+        """Return the compiled (columns, build, many) of this class."""
+        plan = cls.__dict__.get('_plan')
+        if plan is None:
+            columns, many = [], []
+            build = cls._build(cls.model, '', columns, many)
+            plan = cls._plan = (tuple(columns), build, tuple(many))
+        return plan
+
+    @classmethod
+    def _build(cls, root, prefix, columns, many):
+        """Return a function building the output dict from a `row`.
+
+        row[0] is left to the caller, for the key rows are grouped by.
+        """
+        if cls.model is None:
+            raise ImproperlyConfigured(f'{cls.__name__} has no model.')
+        getters = []
+        for key in cls.fields:
+            source = cls.sources.get(key, key)
+            if isinstance(source, Many):
+                if prefix:
+                    raise ImproperlyConfigured(
+                        f'{cls.__name__}.{key}: Many inside Nested is not '
+                        f'supported.'
+                    )
+                many.append((key, source))
+                getters.append((key, _none))
+            elif isinstance(source, Nested):
+                path = f'{prefix}{source.source}__'
+                guard = len(columns) + 1
+                columns.append(f'{path}pk')
+                inner = source.serializer._build(root, path, columns, many)
+                getters.append((key, _nested(guard, inner)))
+            else:
+                index = len(columns) + 1
+                columns.append(prefix + source)
+                convert = _converter(_resolve(root, prefix + source))
+                getters.append((key, _column(index, convert)))
+        return _builder(tuple(getters))
+
+    def serialize(self, queryset):
+        columns, build, many = self.plan()
+        rows = queryset.values_list('pk', *columns)
+        self.pks = []
+        data = []
+        for row in rows:
+            self.pks.append(row[0])
+            data.append(build(row))
+        for key, relation in many:
+            related = self.related(relation)
+            for pk, item in zip(self.pks, data):
+                item[key] = related.get(pk, [])
+        return data
+
+    def related(self, relation):
+        """Return {pk of our row: [related dicts]} for the page."""
+        field = self.model._meta.get_field(relation.source)
+        back = field.remote_field.name
+        queryset = relation.queryset
+        if queryset is None:
+            queryset = field.related_model._default_manager.all()
+        queryset = queryset.filter(**{f'{back}__in': self.pks})
+        columns, build, many = relation.serializer.plan()
+        if many:
+            raise ImproperlyConfigured(
+                f'{relation.serializer.__name__}: Many inside Many is not '
+                f'supported.'
+            )
+        grouped = {}
+        for row in queryset.values_list(back, *columns):
+            grouped.setdefault(row[0], []).append(build(row))
+        return grouped
@@ -0,0 +1,118 @@
+"""
+Django command to compare the fast list serializers with ModelSerializer.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    BookSerializer,
+    BookValuesSerializer,
+    ReviewPostListSerializer,
+    ReviewPostListValuesSerializer,
+)
+from core_db.models import Book, Genre, ReviewPost, User
+
+
+class Rollback(Exception):
+    pass
+
+
+def _model_reviews(rows):
+    queryset = ReviewPost.objects.select_related('book', 'reviewer')
+    return ReviewPostListSerializer(queryset[:rows], many=True).data
+
+
+def _fast_reviews(rows):
+    return ReviewPostListValuesSerializer(ReviewPost.objects.all()[:rows]).data
+
+
+def _model_books(rows):
+    queryset = Book.objects.prefetch_related(Prefetch(
+        'genres', queryset=Genre.objects.filter(is_approved=True),
+    ))
+    return BookSerializer(queryset[:rows], many=True).data
+
+
+def _fast_books(rows):
+    return BookValuesSerializer(Book.objects.all()[:rows]).data
+
+
+CASES = {
+    'reviews': (_model_reviews, _fast_reviews),
+    'books': (_model_books, _fast_books),
+}
+
+
+class Command(BaseCommand):
+    """Print rows per second of each serializer pair, queries included."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Create the rows to serialize in a transaction that is '
+                 'rolled back afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['rows'])
+                self.run(options['rows'], options['repeat'])
+                if options['seed']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        genres = [
+            Genre.objects.create(name=f'Bench Genre {i}', is_approved=True)
+            for i in range(5)
+        ]
+        user = User.objects.create_user(
+            email='bench@example.com', password=None,
+        )
+        books = Book.objects.bulk_create(
+            Book(title=f'Bench {i}', author='Bench', slug=f'bench-{i}')
+            for i in range(rows)
+        )
+        Book.genres.through.objects.bulk_create(
+            Book.genres.through(book=book, genre=genres[i % 5])
+            for i, book in enumerate(books)
+        )
+        ReviewPost.objects.bulk_create(
+            ReviewPost(
+                reviewer=user, book=book, rating=4, slug=f'bench-{i}',
+                review_content='x', review_excerpt='x',
+            )
+            for i, book in enumerate(books)
+        )
+
+    def run(self, rows, repeat):
+        for name, (model, fast) in CASES.items():
+            results = {}
+            for label, func in (('ModelSerializer', model), ('fast', fast)):
+                for renderer in (JSONRenderer(), FastJSONRenderer()):
+                    best = float('inf')
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        data = func(rows)
+                        renderer.render(data)
+                        best = min(best, time.perf_counter() - started)
+                    key = f'{label} + {renderer.__class__.__name__}'
+                    results[key] = len(data) / best if best else 0
+            baseline = next(iter(results.values()))
+            self.stdout.write(f'{name} ({len(data)} rows per page):')
+            for key, rate in results.items():
+                speedup = rate / baseline if baseline else 0
+                self.stdout.write(
+                    f'  {key:40} {rate:>12,.0f} rows/s  {speedup:5.1f}x'
+                )
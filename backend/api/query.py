@@ -0,0 +1,534 @@
+"""
+A GraphQL-style query language over reviews, books, users and comments.
+
+Clients send a selection such as
+
+    {
+      reviews(limit: 50) {
+        slug rating excerpt
+        book { title author genres { name } }
+        reviewer { slug first_name }
+        reactions { like love }
+        comments(limit: 3) { content user { slug } }
+      }
+    }
+
+and get back the same shape filled in. Fields may be aliased
+(`latest: comments(limit: 1) { ... }`) and arguments may be $variables.
+There are no fragments, directives or mutations.
+
+Related objects are never fetched per row. Each level of the result is
+built for all its rows at once: the keys of every relation are first
+registered with the request's Loaders, and the first lookup then fetches
+everything pending for that loader with one IN query. Loaded rows are
+kept for the request, so users already fetched as reviewers are not
+fetched again as comment authors. The number of queries depends on the
+shape of the query, not on how many rows it returns.
+
+Before anything runs, queries nested deeper than MAX_DEPTH or whose
+cost, the most objects they could return, exceeds MAX_COST are refused.
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+
+from core_db.models import Book, Comment, Genre, Reaction, ReviewPost
+
+MAX_DEPTH = 5
+MAX_COST = 1000
+
+
+class QueryError(Exception):
+    pass
+
+
+# Parsing
+
+TOKENS = re.compile(r'''
+    (?P<skip>[\s,]+|\#[^\n]*)
+  | (?P<punct>[{}():!=])
+  | (?P<variable>\$[_A-Za-z][_0-9A-Za-z]*)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+  | (?P<int>-?[0-9]+)
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+''', re.VERBOSE)
+
+Selection = namedtuple('Selection', ['key', 'name', 'args', 'selections'])
+
+
+def tokenize(text):
+    tokens, position = [], 0
+    while position < len(text):
+        match = TOKENS.match(text, position)
+        if match is None:
+            raise QueryError(f'Unexpected character at {position}.')
+        if match.lastgroup != 'skip':
+            tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser of the subset of GraphQL we accept."""
+
+    def __init__(self, text, variables):
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.variables = dict(variables)
+        self.depth = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, kind, value=None):
+        token = self.peek()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise QueryError(
+                f'Expected {value or kind}, got {token[1] or "end of query"}.'
+            )
+        self.position += 1
+        return token[1]
+
+    def document(self):
+        if self.peek() == ('name', 'query'):
+            self.take('name')
+            if self.peek()[0] == 'name':
+                self.take('name')
+            if self.peek() == ('punct', '('):
+                self.variable_definitions()
+        selections = self.selection_set()
+        if self.peek()[0] is not None:
+            raise QueryError(f'Unexpected {self.peek()[1]} after the query.')
+        return selections
+
+    def variable_definitions(self):
+        """Skip `($name: Type! = default ...)`, applying the defaults."""
+        self.take('punct', '(')
+        while self.peek() != ('punct', ')'):
+            name = self.take('variable')[1:]
+            self.take('punct', ':')
+            self.take('name')
+            if self.peek() == ('punct', '!'):
+                self.take('punct', '!')
+            if self.peek() == ('punct', '='):
+                self.take('punct', '=')
+                default = self.value()
+                self.variables.setdefault(name, default)
+        self.take('punct', ')')
+
+    def selection_set(self):
+        # Refused here already, so deep nesting cannot exhaust the stack.
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise QueryError(
+                f'Query is nested deeper than {MAX_DEPTH} levels.'
+            )
+        self.take('punct', '{')
+        selections = []
+        while self.peek() != ('punct', '}'):
+            selections.append(self.field())
+        self.take('punct', '}')
+        self.depth -= 1
+        if not selections:
+            raise QueryError('Empty selection.')
+        return selections
+
+    def field(self):
+        key = name = self.take('name')
+        if self.peek() == ('punct', ':'):
+            self.take('punct', ':')
+            name = self.take('name')
+        args = {}
+        if self.peek() == ('punct', '('):
+            self.take('punct', '(')
+            while self.peek() != ('punct', ')'):
+                arg = self.take('name')
+                self.take('punct', ':')
+                args[arg] = self.value()
+            self.take('punct', ')')
+        selections = None
+        if self.peek() == ('punct', '{'):
+            selections = self.selection_set()
+        return Selection(key, name, args, selections)
+
+    def value(self):
+        kind, text = self.peek()
+        self.position += 1
+        if kind == 'int':
+            return int(text)
+        if kind == 'string':
+            return json.loads(text)
+        if kind == 'variable':
+            if text[1:] not in self.variables:
+                raise QueryError(f'Variable {text} is not defined.')
+            return self.variables[text[1:]]
+        if kind == 'name' and text in ('true', 'false', 'null'):
+            return {'true': True, 'false': False, 'null': None}[text]
+        raise QueryError(f'Expected a value, got {text or "end of query"}.')
+
+
+def parse(text, variables=None):
+    """Return the Selections of a query."""
+    if not isinstance(text, str):
+        raise QueryError('The query must be a string.')
+    return Parser(text, variables or {}).document()
+
+
+# Loaders
+
+class Loader:
+    """Collects keys and fetches all of them the first time one is read.
+
+    `fetch(keys, columns, **args)` returns {key: value}; missing keys
+    read as None. Values are kept for the rest of the request.
+    """
+
+    def __init__(self, fetch, columns, args):
+        self.fetch = fetch
+        self.columns = columns
+        self.args = args
+        self.values = {}
+        self.pending = set()
+
+    def want(self, keys):
+        self.pending.update(
+            key for key in keys
+            if key is not None and key not in self.values
+        )
+
+    def get(self, key):
+        if self.pending:
+            found = self.fetch(self.pending, self.columns, **self.args)
+            self.values.update(dict.fromkeys(self.pending))
+            self.values.update(found)
+            self.pending = set()
+        return self.values.get(key)
+
+
+class Context:
+    """The loaders of one request, one per fetch function and arguments."""
+
+    def __init__(self):
+        self.loaders = {}
+
+    def loader(self, fetch, columns, args):
+        key = (fetch, tuple(sorted(args.items())))
+        if key not in self.loaders:
+            self.loaders[key] = Loader(fetch, columns, args)
+        return self.loaders[key]
+
+
+def by_pk(queryset):
+    def fetch(keys, columns):
+        rows = queryset().filter(pk__in=keys).values(*columns)
+        return {row['pk']: row for row in rows}
+    return fetch
+
+
+fetch_books = by_pk(Book.objects.all)
+fetch_users = by_pk(lambda: get_user_model().objects.all())
+
+
+def fetch_genres(book_ids, columns):
+    """Approved genres of each book, by name."""
+    rows = Genre.objects.filter(
+        is_approved=True, books__in=book_ids,
+    ).order_by('name').values(*columns, book_key=F('books'))
+    found = {}
+    for row in rows:
+        found.setdefault(row.pop('book_key'), []).append(row)
+    return found
+
+
+def fetch_reactions(review_ids, columns):
+    """Reaction counts of each review, by type and in total."""
+    rows = Reaction.objects.by_live_users().filter(
+        review_post_id__in=review_ids,
+    ).values('review_post_id', 'reaction_type').annotate(
+        count=Count('pk'),
+    ).order_by()
+    found = {
+        review_id: {'like': 0, 'love': 0, 'total': 0}
+        for review_id in review_ids
+    }
+    for row in rows:
+        counts = found[row['review_post_id']]
+        counts[row['reaction_type'].lower()] = row['count']
+        counts['total'] += row['count']
+    return found
+
+
+def fetch_comments(review_ids, columns, limit):
+    """The latest `limit` comments of each review."""
+    comments = Comment.objects.by_live_users()
+    latest = comments.filter(
+        review_post_id=OuterRef('review_post_id'),
+    ).order_by('-created_at', '-pk').values('pk')[:limit]
+    rows = comments.filter(
+        review_post_id__in=review_ids, pk__in=Subquery(latest),
+    ).order_by('-created_at', '-pk').values('review_post_id', *columns)
+    found = {}
+    for row in rows:
+        found.setdefault(row.pop('review_post_id'), []).append(row)
+    return found
+
+
+# Schema
+
+Arg = namedtuple('Arg', ['kind', 'default', 'maximum', 'required'])
+Arg.__new__.__defaults__ = (None, None, False)
+
+
+class Link:
+    """A field of one object, or a list of them, found by a loader.
+
+    The loader is given the parent row's `key` column. `size` is the
+    number of objects a list counts for in the cost when it takes no
+    limit argument.
+    """
+
+    def __init__(self, type_name, key, fetch, many=False, args=None,
+                 size=1):
+        self.type_name = type_name
+        self.key = key
+        self.fetch = fetch
+        self.many = many
+        self.args = args or {}
+        self.size = size
+
+
+class ObjectType:
+    def __init__(self, name, fields, links=None):
+        self.name = name
+        self.fields = fields
+        self.links = links or {}
+        self.columns = list(dict.fromkeys([
+            'pk', *fields.values(),
+            *(link.key for link in self.links.values()),
+        ]))
+
+
+TYPES = {
+    'Genre': ObjectType('Genre', {'name': 'name', 'slug': 'slug'}),
+    'Book': ObjectType(
+        'Book',
+        {
+            'id': 'pk', 'slug': 'slug', 'title': 'title',
+            'author': 'author', 'review_count': 'review_count',
+        },
+        {'genres': Link('Genre', 'pk', fetch_genres, many=True, size=5)},
+    ),
+    'User': ObjectType('User', {
+        'slug': 'slug', 'first_name': 'first_name', 'last_name': 'last_name',
+    }),
+    'Reactions': ObjectType(
+        'Reactions', {'like': 'like', 'love': 'love', 'total': 'total'},
+    ),
+    'Comment': ObjectType(
+        'Comment',
+        {'id': 'pk', 'content': 'content', 'created_at': 'created_at'},
+        {'user': Link('User', 'user_id', fetch_users)},
+    ),
+    'Review': ObjectType(
+        'Review',
+        {
+            'id': 'pk', 'slug': 'slug', 'title': 'review_title',
+            'rating': 'rating', 'excerpt': 'review_excerpt',
+            'reading_time': 'reading_time', 'review_date': 'review_date',
+        },
+        {
+            'book': Link('Book', 'book_id', fetch_books),
+            'reviewer': Link('User', 'reviewer_id', fetch_users),
+            'reactions': Link('Reactions', 'pk', fetch_reactions),
+            'comments': Link(
+                'Comment', 'pk', fetch_comments, many=True,
+                args={'limit': Arg(int, 3, 10)},
+            ),
+        },
+    ),
+}
+
+
+def resolve_reviews(columns, limit, before=None, book=None):
+    queryset = ReviewPost.objects.exclude_unapproved_only().order_by('-pk')
+    if book is not None:
+        queryset = queryset.filter(book__slug=book)
+    if before is not None:
+        queryset = queryset.filter(pk__lt=before)
+    return list(queryset.values(*columns)[:limit])
+
+
+def resolve_review(columns, slug):
+    return ReviewPost.objects.exclude_unapproved_only().filter(
+        slug=slug,
+    ).values(*columns).first()
+
+
+def resolve_book(columns, slug):
+    return Book.objects.filter(slug=slug).values(*columns).first()
+
+
+class Root:
+    def __init__(self, type_name, resolve, many=False, args=None):
+        self.type_name = type_name
+        self.resolve = resolve
+        self.many = many
+        self.args = args or {}
+
+
+ROOTS = {
+    'reviews': Root('Review', resolve_reviews, many=True, args={
+        'limit': Arg(int, 20, 50),
+        'before': Arg(int),
+        'book': Arg(str),
+    }),
+    'review': Root('Review', resolve_review, args={
+        'slug': Arg(str, required=True),
+    }),
+    'book': Root('Book', resolve_book, args={
+        'slug': Arg(str, required=True),
+    }),
+}
+
+
+# Validation
+
+def check_args(where, specs, given):
+    """Return the arguments of a field with defaults filled in."""
+    unknown = set(given) - set(specs)
+    if unknown:
+        raise QueryError(f'Unknown argument {sorted(unknown)[0]} on {where}.')
+    args = {}
+    for name, spec in specs.items():
+        value = given.get(name)
+        if value is None:
+            value = spec.default
+        if value is None:
+            if spec.required:
+                raise QueryError(f'{where} needs argument {name}.')
+            continue
+        if not isinstance(value, spec.kind) or isinstance(value, bool):
+            raise QueryError(
+                f'Argument {name} on {where} must be '
+                f'{"an integer" if spec.kind is int else "a string"}.'
+            )
+        if spec.kind is int and not 1 <= value <= (spec.maximum or value):
+            raise QueryError(
+                f'Argument {name} on {where} must be between 1 and '
+                f'{spec.maximum}.'
+            )
+        args[name] = value
+    return args
+
+
+def check(type_name, selections, depth):
+    """Validate selections on a type; return their cost."""
+    object_type = TYPES[type_name]
+    if depth > MAX_DEPTH:
+        raise QueryError(f'Query is nested deeper than {MAX_DEPTH} levels.')
+    cost = 0
+    for selection in selections:
+        where = f'{type_name}.{selection.name}'
+        if selection.name in object_type.fields:
+            if selection.selections is not None or selection.args:
+                raise QueryError(f'{where} is a scalar field.')
+            continue
+        link = object_type.links.get(selection.name)
+        if link is None:
+            raise QueryError(f'Cannot query field {where}.')
+        if selection.selections is None:
+            raise QueryError(f'{where} needs a selection of fields.')
+        args = check_args(where, link.args, selection.args)
+        count = args.get('limit', link.size) if link.many else 1
+        cost += count * (1 + check(link.type_name, selection.selections,
+                                   depth + 1))
+    return cost
+
+
+def validate(selections):
+    cost = 0
+    for selection in selections:
+        root = ROOTS.get(selection.name)
+        if root is None:
+            raise QueryError(f'Cannot query field {selection.name}.')
+        if selection.selections is None:
+            raise QueryError(f'{selection.name} needs a selection of fields.')
+        args = check_args(selection.name, root.args, selection.args)
+        count = args.get('limit', 1)
+        cost += count * (1 + check(root.type_name, selection.selections, 2))
+    if cost > MAX_COST:
+        raise QueryError(
+            f'Query could return {cost} objects; the limit is {MAX_COST}.'
+        )
+    return cost
+
+
+# Execution
+
+def build(object_type, rows, selections, context):
+    """Return the result dicts of `rows` for `selections`.
+
+    Every relation's keys are registered before any is read, so each
+    loader fetches the whole level with one query.
+    """
+    results = [{} for _ in rows]
+    links = []
+    for selection in selections:
+        column = object_type.fields.get(selection.name)
+        if column is not None:
+            for row, result in zip(rows, results):
+                result[selection.key] = row[column]
+            continue
+        link = object_type.links[selection.name]
+        args = check_args(selection.name, link.args, selection.args)
+        child_type = TYPES[link.type_name]
+        loader = context.loader(link.fetch, child_type.columns, args)
+        loader.want(row[link.key] for row in rows)
+        links.append((selection, link, child_type, loader))
+
+    for selection, link, child_type, loader in links:
+        values = [loader.get(row[link.key]) for row in rows]
+        if link.many:
+            values = [value or [] for value in values]
+            children = [child for value in values for child in value]
+        else:
+            children = [value for value in values if value is not None]
+        built = iter(build(child_type, children, selection.selections,
+                           context))
+        for value, result in zip(values, results):
+            if link.many:
+                result[selection.key] = [next(built) for _ in value]
+            else:
+                result[selection.key] = (
+                    next(built) if value is not None else None
+                )
+    return results
+
+
+def execute(text, variables=None):
+    """Run a query and return its data."""
+    selections = parse(text, variables)
+    validate(selections)
+    context = Context()
+    data = {}
+    for selection in selections:
+        root = ROOTS[selection.name]
+        object_type = TYPES[root.type_name]
+        args = check_args(selection.name, root.args, selection.args)
+        found = root.resolve(object_type.columns, **args)
+        if root.many:
+            data[selection.key] = build(
+                object_type, found, selection.selections, context,
+            )
+        elif found is None:
+            data[selection.key] = None
+        else:
+            data[selection.key] = build(
+                object_type, [found], selection.selections, context,
+            )[0]
+    return data
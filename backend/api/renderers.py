@@ -0,0 +1,33 @@
+"""
+JSON renderer backed by orjson when it is installed.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Compact JSON through orjson, or the stock renderer without it.
+
+    Requests asking for indented output are passed to JSONRenderer, and
+    values orjson would format differently or not at all (datetimes,
+    decimals, lazy strings) to its encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or indent:
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+        return orjson.dumps(
+            data, default=JSONEncoder().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
@@ -0,0 +1,95 @@
+"""
+Serializers for the API.
+"""
+from rest_framework import serializers
+
+from api.fast_serializers import Many, ValuesSerializer
+from core_db.models import Book, Genre, ReviewPost
+
+
+class GenreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ['name', 'slug']
+
+
+class GenreListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ['name', 'slug', 'book_count', 'review_count']
+
+
+class BookSerializer(serializers.ModelSerializer):
+    genres = GenreSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Book
+        fields = [
+            'title', 'author', 'slug', 'review_count', 'genres',
+            'updated_at',
+        ]
+
+
+class ReviewPostListSerializer(serializers.ModelSerializer):
+    """Feed entry: the stored excerpt instead of the full body."""
+    book = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    reviewer = serializers.SlugRelatedField(
+        slug_field='slug', read_only=True,
+    )
+
+    class Meta:
+        model = ReviewPost
+        fields = [
+            'review_title', 'slug', 'book', 'book_title', 'reviewer',
+            'review_excerpt', 'content_length', 'reading_time', 'rating',
+            'review_date',
+        ]
+
+
+class ReviewPostSerializer(serializers.ModelSerializer):
+    book = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    reviewer = serializers.SlugRelatedField(
+        slug_field='slug', read_only=True,
+    )
+
+    class Meta:
+        model = ReviewPost
+        fields = [
+            'review_title', 'slug', 'book', 'book_title', 'reviewer',
+            'review_content', 'content_length', 'reading_time', 'rating',
+            'review_date', 'updated_at',
+        ]
+
+
+# Instance-free equivalents of the serializers above, for list endpoints.
+# Keep the fields in step with them.
+
+class GenreValuesSerializer(ValuesSerializer):
+    model = Genre
+    fields = ['name', 'slug']
+
+
+class BookValuesSerializer(ValuesSerializer):
+    """BookSerializer with approved genres only."""
+    model = Book
+    fields = [
+        'title', 'author', 'slug', 'review_count', 'genres', 'updated_at',
+    ]
+    sources = {
+        'genres': Many(
+            GenreValuesSerializer, 'genres',
+            queryset=Genre.objects.filter(is_approved=True).order_by('name'),
+        ),
+    }
+
+
+class ReviewPostListValuesSerializer(ValuesSerializer):
+    model = ReviewPost
+    fields = ReviewPostListSerializer.Meta.fields
+    sources = {
+        'book': 'book__slug',
+        'book_title': 'book__title',
+        'reviewer': 'reviewer__slug',
+    }
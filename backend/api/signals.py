@@ -0,0 +1,14 @@
+"""
+Signal handlers keeping cached API auth claims fresh.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import forget_claims
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def drop_user_claims(sender, instance, **kwargs):
+    forget_claims(instance.pk)
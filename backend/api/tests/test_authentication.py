@@ -0,0 +1,122 @@
+"""
+Tests for signed-token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import authentication
+from backend import ratelimit
+
+TOKEN_URL = reverse('api:token')
+ME_URL = reverse('api:me')
+
+
+class SignedTokenAuthenticationTests(TestCase):
+    """Test issuing tokens and authenticating requests with them."""
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local_claims()
+        ratelimit.reset_store()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass1234',
+        )
+
+    def tearDown(self):
+        ratelimit.reset_store()
+
+    def authorize(self, user=None):
+        token = authentication.issue_token(user or self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def test_obtain_token_does_not_touch_last_login(self):
+        """Test exchanging credentials for a token writes nothing."""
+        res = self.client.post(
+            TOKEN_URL, {'email': 'reader@example.com', 'password': 'pass1234'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+    def test_obtain_token_bad_credentials(self):
+        """Test a wrong password gets no token."""
+        res = self.client.post(
+            TOKEN_URL, {'email': 'reader@example.com', 'password': 'wrong'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('token', res.data)
+
+    def test_authenticated_request_without_queries(self):
+        """Test a warm token request needs no session or user query."""
+        self.authorize()
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'reader@example.com')
+
+    def test_user_from_claims_defers_other_fields(self):
+        """Test saving a claims-only user leaves the other columns alone."""
+        self.user.first_name = 'Ada'
+        self.user.save()
+        claims = authentication.load_claims(self.user.pk)
+
+        user = authentication.user_from_claims(claims)
+        self.assertIn('password', user.get_deferred_fields())
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Ada')
+        self.assertTrue(self.user.check_password('pass1234'))
+
+    def test_deactivated_user_is_rejected(self):
+        """Test flipping is_active revokes existing tokens."""
+        self.authorize()
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_token(self):
+        """Test tokens issued before a password change stop working."""
+        self.authorize()
+        self.user.set_password('new-pass-5678')
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_token_is_rejected(self):
+        """Test a token whose user id was changed fails verification."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass1234',
+        )
+        token = authentication.issue_token(self.user)
+        forged = token.replace(f'{self.user.pk}:', f'{other.pk}:', 1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {forged}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_is_rejected(self):
+        """Test tokens older than API_TOKEN_MAX_AGE fail."""
+        self.authorize()
+        with self.settings(API_TOKEN_MAX_AGE=-1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
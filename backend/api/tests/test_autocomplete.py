@@ -0,0 +1,105 @@
+"""
+Tests for the autocomplete API.
+"""
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core_db.models import Book, Genre, ReviewPost
+
+AUTOCOMPLETE_URL = reverse('api:autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+    """Test prefix suggestions for books, authors and genres."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.hobbit = Book.objects.create(
+            title='The Hobbit', author='J.R.R. Tolkien',
+        )
+        self.hobbits = Book.objects.create(
+            title='The Hobbits of Shire', author='Fan Fiction',
+        )
+        dune = Book.objects.create(title='Dune', author='Frank Herbert')
+        Genre.objects.create(name='Thriller', is_approved=True)
+        Genre.objects.create(name='Theology')
+        for i in range(2):
+            user = get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='pass',
+            )
+            ReviewPost.objects.create(
+                reviewer=user, book=self.hobbit,
+                review_content='...', rating=5,
+            )
+        ReviewPost.objects.create(
+            reviewer=user, book=dune, review_content='...', rating=4,
+        )
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+    def test_books_ranked_by_review_count(self):
+        """Test matching books come back most reviewed first."""
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'The Hob'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [book['slug'] for book in res.data['books']],
+            [self.hobbit.slug, self.hobbits.slug],
+        )
+        self.assertEqual(res.data['books'][0]['review_count'], 2)
+        self.assertIn('public', res['Cache-Control'])
+        self.assertEqual(res.data['debounce_ms'], 150)
+
+    def test_authors_and_approved_genres(self):
+        """Test author prefixes and that pending genres are hidden."""
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'th'})
+
+        self.assertEqual(
+            [genre['name'] for genre in res.data['genres']], ['Thriller'],
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'fr'})
+
+        self.assertEqual(
+            res.data['authors'],
+            [{'author': 'Frank Herbert', 'book_count': 1, 'review_count': 1}],
+        )
+
+    def test_genres_ranked_by_review_count(self):
+        """Test matching genres come back most reviewed first."""
+        for name in ('Thermal', 'Theatre'):
+            genre = Genre.objects.create(name=name, is_approved=True)
+            if name == 'Theatre':
+                self.hobbit.genres.add(genre)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'the'})
+
+        self.assertEqual(
+            [genre['name'] for genre in res.data['genres']],
+            ['Theatre', 'Thermal'],
+        )
+        self.assertEqual(res.data['genres'][0]['review_count'], 2)
+
+    def test_short_query_returns_nothing(self):
+        """Test queries under the minimum length skip the database."""
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': 't'})
+
+        self.assertEqual(res.data['books'], [])
+        self.assertEqual(res.data['min_length'], 2)
+
+    def test_results_are_cached(self):
+        """Test a repeated prefix is served from the cache."""
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'dun'})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': ' DUN '})
+
+        self.assertEqual(res.data['books'][0]['title'], 'Dune')
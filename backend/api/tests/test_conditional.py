@@ -0,0 +1,176 @@
+"""
+Tests for conditional GETs on the public read endpoints.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core_db.models import Book, Genre, ReviewPost
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling of books, reviews and genres."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.genre = Genre.objects.create(name='Fantasy', is_approved=True)
+        self.book = Book.objects.create(
+            title='The Hobbit', author='J.R.R. Tolkien',
+        )
+        self.book.genres.add(self.genre)
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        self.review = ReviewPost.objects.create(
+            reviewer=self.user, book=self.book,
+            review_content='Lovely.', rating=5,
+        )
+        self.book_url = reverse('api:book-detail', args=[self.book.slug])
+
+    def test_book_detail_sets_cache_headers(self):
+        """Test a book response carries validators and caching headers."""
+        res = self.client.get(self.book_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['genres'][0]['name'], 'Fantasy')
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('public', res['Cache-Control'])
+        self.assertIn('max-age=60', res['Cache-Control'])
+        self.assertIn('Accept', res['Vary'])
+
+    def test_matching_etag_returns_304_with_one_query(self):
+        """Test a matching If-None-Match is answered from one query."""
+        etag = self.client.get(self.book_url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_if_modified_since_returns_304(self):
+        """Test an unchanged book is not sent again to If-Modified-Since."""
+        last_modified = self.client.get(self.book_url)['Last-Modified']
+
+        res = self.client.get(
+            self.book_url, HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_genre_change_invalidates_book_etag(self):
+        """Test adding or editing a genre changes the book's ETag."""
+        etag = self.client.get(self.book_url)['ETag']
+
+        self.book.genres.add(Genre.objects.create(name='Classics'))
+        res = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        self.genre.name = 'High Fantasy'
+        self.genre.save()
+        res = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['genres'][0]['name'], 'High Fantasy')
+
+    def test_new_review_invalidates_book_etag(self):
+        """Test the review count bump also bumps the book's version."""
+        etag = self.client.get(self.book_url)['ETag']
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='pass',
+        )
+        ReviewPost.objects.create(
+            reviewer=other, book=self.book, review_content='Meh.', rating=3,
+        )
+
+        res = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['review_count'], 2)
+
+    def test_review_detail_conditional(self):
+        """Test review pages validate against the review and its book."""
+        url = reverse('api:review-detail', args=[self.review.slug])
+        res = self.client.get(url)
+        self.assertEqual(res.data['book'], self.book.slug)
+        self.assertEqual(res.data['review_content'], 'Lovely.')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_genre_list_changes_when_genre_approved(self):
+        """Test approving a genre changes the list's ETag."""
+        url = reverse('api:genre-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        Genre.objects.create(name='Horror', is_approved=True)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+
+    def test_genre_count_refresh_changes_list_not_books(self):
+        """Test refreshed genre counts change the list's ETag only."""
+        url = reverse('api:genre-list')
+        list_etag = self.client.get(url)['ETag']
+        book_etag = self.client.get(self.book_url)['ETag']
+
+        # The review from setUp is only counted by the batched refresh.
+        self.assertEqual(Genre.objects.refresh_counts([self.genre.pk]), 1)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', res)
+        res = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=book_etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_resource_is_404(self):
+        """Test unknown slugs are 404 without a cacheable response."""
+        res = self.client.get(reverse('api:book-detail', args=['nope']))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('public', res.get('Cache-Control', ''))
+
+
+class ReviewListTests(TestCase):
+    """Test the review feed serves excerpts without full bodies."""
+
+    def setUp(self):
+        self.client = APIClient()
+        book = Book.objects.create(title='Emma', author='Jane Austen')
+        for i in range(3):
+            user = get_user_model().objects.create_user(
+                email=f'reader{i}@example.com', password='pass',
+            )
+            ReviewPost.objects.create(
+                reviewer=user, book=book,
+                review_content='Long ' * 500, rating=4,
+            )
+
+    def test_feed_uses_excerpts(self):
+        """Test feed entries carry the excerpt and reading time only."""
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse('api:review-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        entry = res.data['results'][0]
+        self.assertNotIn('review_content', entry)
+        self.assertLessEqual(len(entry['review_excerpt']), 200)
+        self.assertEqual(entry['reading_time'], 3)
+
+    def test_feed_pages_by_id(self):
+        """Test `before` continues where the last page stopped."""
+        pks = sorted(ReviewPost.objects.values_list('pk', flat=True))
+
+        res = self.client.get(reverse('api:review-list'), {'before': pks[1]})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['next_before'], pks[0])
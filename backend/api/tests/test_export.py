@@ -0,0 +1,67 @@
+"""
+Tests for the export API.
+"""
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core_db.models import Book
+
+
+def export_url(dataset, fmt, gz=False):
+    kwargs = {'dataset': dataset, 'fmt': fmt}
+    if gz:
+        kwargs['gz'] = '.gz'
+    return reverse('api:export', kwargs=kwargs)
+
+
+class ExportApiTests(TestCase):
+    """Test the streaming export endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='Django@123',
+        )
+        Book.objects.create(title='Dune', author='Frank Herbert')
+
+    def test_export_requires_staff(self):
+        """Test non-staff users cannot export."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='Django@123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(export_url('books', 'csv'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_books_csv(self):
+        """Test the CSV export is streamed as a download."""
+        self.client.force_authenticate(self.admin_user)
+
+        res = self.client.get(export_url('books', 'csv'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertIn('books.csv', res['Content-Disposition'])
+        body = b''.join(res.streaming_content).decode()
+        self.assertIn('Dune,Frank Herbert', body)
+
+    def test_export_books_gzipped_jsonl(self):
+        """Test the gzip variant decompresses to JSON Lines."""
+        self.client.force_authenticate(self.admin_user)
+
+        res = self.client.get(export_url('books', 'jsonl', gz=True))
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        body = gzip.decompress(b''.join(res.streaming_content)).decode()
+        book = json.loads(body.splitlines()[0])
+        self.assertEqual(book['title'], 'Dune')
@@ -0,0 +1,230 @@
+"""
+Tests for the instance-free list serializers and the orjson renderer.
+"""
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.fast_serializers import Nested, ValuesSerializer
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    BookSerializer,
+    BookValuesSerializer,
+    ReviewPostListSerializer,
+    ReviewPostListValuesSerializer,
+)
+from core_db.models import Book, Genre, ReviewPost
+
+
+class ValuesSerializerTests(TestCase):
+    """Test the fast serializers agree with their ModelSerializers."""
+
+    def setUp(self):
+        self.fantasy = Genre.objects.create(name='Fantasy', is_approved=True)
+        self.epic = Genre.objects.create(name='Epic', is_approved=True)
+        pending = Genre.objects.create(name='Grimdark')
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass', first_name='Ann',
+        )
+        for i in range(5):
+            book = Book.objects.create(title=f'Book {i}', author='Anon')
+            book.genres.add(self.fantasy, pending)
+            if i % 2:
+                book.genres.add(self.epic)
+            ReviewPost.objects.create(
+                reviewer=self.user, book=book,
+                review_content='Words ' * 50, rating=i % 5 + 1,
+            )
+
+    def test_review_list_matches_model_serializer(self):
+        """Test review rows equal ReviewPostListSerializer output."""
+        queryset = ReviewPost.objects.order_by('-pk')
+        expected = ReviewPostListSerializer(
+            queryset.select_related('book', 'reviewer'), many=True,
+        ).data
+
+        with self.assertNumQueries(1):
+            serializer = ReviewPostListValuesSerializer(queryset)
+            data = serializer.data
+
+        self.assertEqual(json.loads(json.dumps(data)), expected)
+        self.assertEqual(
+            serializer.pks, list(queryset.values_list('pk', flat=True)),
+        )
+
+    def test_book_list_matches_model_serializer(self):
+        """Test genres come from one extra query and only approved ones."""
+        queryset = Book.objects.order_by('pk')
+        expected = BookSerializer(queryset.prefetch_related(Prefetch(
+            'genres',
+            queryset=Genre.objects.filter(is_approved=True).order_by('name'),
+        )), many=True).data
+
+        with self.assertNumQueries(2):
+            data = BookValuesSerializer(queryset).data
+
+        self.assertEqual(json.loads(json.dumps(data)), expected)
+        self.assertEqual(
+            [genre['name'] for genre in data[1]['genres']],
+            ['Epic', 'Fantasy'],
+        )
+
+    def test_nested_to_one(self):
+        """Test a Nested relation is read from the same query."""
+        class ReviewerSerializer(ValuesSerializer):
+            model = get_user_model()
+            fields = ['slug', 'first_name']
+
+        class ReviewSerializer(ValuesSerializer):
+            model = ReviewPost
+            fields = ['slug', 'reviewer']
+            sources = {'reviewer': Nested(ReviewerSerializer, 'reviewer')}
+
+        with self.assertNumQueries(1):
+            data = ReviewSerializer(ReviewPost.objects.all()[:1]).data
+
+        self.assertEqual(
+            data[0]['reviewer'],
+            {'slug': self.user.slug, 'first_name': 'Ann'},
+        )
+
+    def test_plan_compiled_once_per_class(self):
+        """Test the plan is cached on the class that declares it."""
+        self.assertIs(
+            ReviewPostListValuesSerializer.plan(),
+            ReviewPostListValuesSerializer.plan(),
+        )
+
+        class Subclass(ReviewPostListValuesSerializer):
+            fields = ['slug']
+
+        self.assertEqual(Subclass.plan()[0], ('slug',))
+
+    def test_file_fields_rejected(self):
+        """Test fields needing a request are refused when compiling."""
+        class ImageSerializer(ValuesSerializer):
+            model = ReviewPost
+            fields = ['review_image']
+
+        with self.assertRaises(ImproperlyConfigured):
+            ImageSerializer.plan()
+
+    def test_list_endpoints(self):
+        """Test the review and book lists page with `before`."""
+        client = APIClient()
+
+        res = client.get(reverse('api:review-list'))
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(res['Content-Type'], 'application/json')
+
+        top = Book.objects.get(title='Book 2')
+        Book.objects.filter(pk=top.pk).update(review_count=3)
+        res = client.get(reverse('api:book-list'))
+        self.assertEqual(res.data['results'][0]['title'], 'Book 2')
+        res = client.get(reverse('api:book-list'), {'before': top.pk})
+        self.assertEqual(len(res.data['results']), 4)
+        self.assertNotIn(
+            'Book 2', [book['title'] for book in res.data['results']],
+        )
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the orjson renderer produces what JSONRenderer would."""
+
+    def test_same_json_as_stock_renderer(self):
+        """Test output parses to the same data as the stock renderer's."""
+        data = {
+            'name': 'Café', 'price': Decimal('1.50'), 'items': [1, 2],
+            'nested': {1: None},
+        }
+        fast = FastJSONRenderer().render(data)
+
+        self.assertEqual(
+            json.loads(fast), json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_indent_falls_back_to_stock_renderer(self):
+        """Test indented output is left to JSONRenderer."""
+        rendered = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2',
+        )
+
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+
+class BookListFilterTests(TestCase):
+    """Test the genre filters of the book list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        fantasy = Genre.objects.create(name='Fantasy', is_approved=True)
+        epic = Genre.objects.create(name='Epic', is_approved=True)
+        pending = Genre.objects.create(name='Grimdark')
+        Book.objects.create(title='Both', author='A').genres.add(
+            fantasy, epic,
+        )
+        Book.objects.create(title='One', author='B').genres.add(fantasy)
+        Book.objects.create(title='Hidden', author='C').genres.add(pending)
+
+    def titles(self, **params):
+        res = self.client.get(reverse('api:book-list'), params)
+        return sorted(book['title'] for book in res.data['results'])
+
+    def test_unapproved_only_books_hidden(self):
+        """Test books with only pending genres are not listed."""
+        self.assertEqual(self.titles(), ['Both', 'One'])
+
+    def test_reviews_of_hidden_books_hidden(self):
+        """Test reviews of books with only pending genres are not served."""
+        user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        for book in Book.objects.all():
+            ReviewPost.objects.create(
+                reviewer=user, book=book, review_content='...', rating=3,
+            )
+        hidden = ReviewPost.objects.get(book__title='Hidden')
+
+        res = self.client.get(reverse('api:review-list'))
+        self.assertEqual(
+            sorted(review['slug'] for review in res.data['results']),
+            sorted(ReviewPost.objects.exclude(
+                pk=hidden.pk,
+            ).values_list('slug', flat=True)),
+        )
+        res = self.client.get(
+            reverse('api:review-detail', args=[hidden.slug]),
+        )
+        self.assertEqual(res.status_code, 404)
+
+    def test_filter_any_and_all(self):
+        """Test repeated genre params match any, or all with match=all."""
+        self.assertEqual(
+            self.titles(genre=['fantasy', 'epic']), ['Both', 'One'],
+        )
+        self.assertEqual(
+            self.titles(genre=['fantasy', 'epic'], match='all'), ['Both'],
+        )
+
+    def test_unknown_or_pending_genre(self):
+        """Test unknown and pending genres match nothing."""
+        self.assertEqual(self.titles(genre=['grimdark']), [])
+        self.assertEqual(
+            self.titles(genre=['fantasy', 'nope'], match='all'), [],
+        )
+
+    def test_genre_list_has_counts(self):
+        """Test the genre list carries the stored counts."""
+        res = self.client.get(reverse('api:genre-list'))
+
+        self.assertEqual(
+            [(g['name'], g['book_count']) for g in res.data],
+            [('Epic', 1), ('Fantasy', 2)],
+        )
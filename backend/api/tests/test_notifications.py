@@ -0,0 +1,68 @@
+"""
+Tests for the notification inbox API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core_db import tasks
+from core_db.models import Book, Reaction, ReviewPost, Task
+
+NOTIFICATIONS_URL = reverse('api:notifications')
+MARK_READ_URL = reverse('api:notifications-read')
+
+
+class NotificationApiTests(TestCase):
+    """Test listing notifications and marking them read."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user(
+            email='author@example.com', password='pass',
+        )
+        fan = User.objects.create_user(email='fan@example.com', password='x')
+        review = ReviewPost.objects.create(
+            reviewer=self.author,
+            book=Book.objects.create(title='Emma', author='Jane Austen'),
+            review_content='Witty.',
+            rating=4,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(
+                user=fan, review_post=review, reaction_type='LIKE',
+            )
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_login_required(self):
+        res = APIClient().get(NOTIFICATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_and_mark_read(self):
+        """Test the inbox lists notifications and clears the unread count."""
+        res = self.client.get(NOTIFICATIONS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['unread'], 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+        res = self.client.post(MARK_READ_URL, {}, format='json')
+        self.assertEqual(res.data['marked'], 1)
+        self.assertEqual(res.data['unread'], 0)
+
+        res = self.client.get(NOTIFICATIONS_URL, {'unread': '1'})
+        self.assertEqual(res.data['results'], [])
+
+    def test_mark_read_rejects_bad_ids(self):
+        """Test ids other than a list of integers get a 400."""
+        for body in [{'ids': 5}, {'ids': 'all'}, {'ids': [1, 'x']}, [1]]:
+            with self.subTest(body=body):
+                res = self.client.post(MARK_READ_URL, body, format='json')
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(NOTIFICATIONS_URL).data['unread'], 1)
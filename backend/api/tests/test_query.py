@@ -0,0 +1,213 @@
+"""
+Tests for the GraphQL-style query endpoint and its data loaders.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import query
+from core_db.models import Book, Comment, Genre, Reaction, ReviewPost
+
+QUERY_URL = reverse('api:query')
+
+CARDS = '''
+query Cards($limit: Int) {
+  reviews(limit: $limit) {
+    slug rating excerpt
+    book { title author genres { name slug } }
+    reviewer { slug first_name }
+    reactions { like love total }
+    comments(limit: 3) { content user { slug } }
+  }
+}
+'''
+
+
+@override_settings(RATE_LIMITS={})
+class QueryTests(TestCase):
+    """Test queries resolve through batched loaders within limits.
+
+    The endpoint's throttle is tested with the others in test_ratelimit.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        Genre.objects.create(name='Fantasy', is_approved=True)
+        Genre.objects.create(name='Grimdark')
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='pass',
+                first_name=f'User {i}',
+            )
+            for i in range(5)
+        ]
+        self.commenters = [
+            get_user_model().objects.create_user(
+                email=f'commenter{i}@example.com', password='pass',
+            )
+            for i in range(4)
+        ]
+
+    def make_reviews(self, count):
+        reviews = []
+        for i in range(count):
+            book = Book.objects.create(title=f'Book {i}', author='Anon')
+            book.genres.add(*Genre.objects.all())
+            review = ReviewPost.objects.create(
+                reviewer=self.users[i % 5], book=book,
+                review_content=f'Review number {i}.', rating=i % 5 + 1,
+            )
+            for j in range(4):
+                Comment.objects.create(
+                    user=self.commenters[j], review_post=review,
+                    content=f'Comment {j}',
+                )
+            Reaction.objects.create(
+                user=self.users[0], review_post=review,
+                reaction_type=Reaction.ReactionTypes.LIKE,
+            )
+            reviews.append(review)
+        return reviews
+
+    def post(self, text, variables=None):
+        return self.client.post(
+            QUERY_URL, {'query': text, 'variables': variables},
+            format='json',
+        )
+
+    def test_card_shape(self):
+        """Test a card has its book, reviewer, reactions and comments."""
+        review, = self.make_reviews(1)
+
+        response = self.post(CARDS, {'limit': 10})
+
+        self.assertEqual(response.status_code, 200)
+        card, = response.json()['data']['reviews']
+        self.assertEqual(card['slug'], review.slug)
+        self.assertEqual(card['book']['title'], 'Book 0')
+        self.assertEqual(
+            card['book']['genres'], [{'name': 'Fantasy', 'slug': 'fantasy'}],
+        )
+        self.assertEqual(card['reviewer']['first_name'], 'User 0')
+        self.assertEqual(card['reactions'], {'like': 1, 'love': 0, 'total': 1})
+        self.assertEqual(
+            [comment['content'] for comment in card['comments']],
+            ['Comment 3', 'Comment 2', 'Comment 1'],
+        )
+        self.assertEqual(card['comments'][0]['user'], {
+            'slug': self.commenters[3].slug,
+        })
+
+    def test_query_count_constant(self):
+        """Test 50 cards take as many queries as 1 card."""
+        self.make_reviews(50)
+
+        # Reviews, books, genres, reviewers, reactions, comments and
+        # comment authors.
+        with self.assertNumQueries(7):
+            data = query.execute(CARDS, {'limit': 1})
+        self.assertEqual(len(data['reviews']), 1)
+
+        with self.assertNumQueries(7):
+            data = query.execute(CARDS, {'limit': 50})
+        self.assertEqual(len(data['reviews']), 50)
+        self.assertTrue(all(
+            len(card['comments']) == 3 and card['book']['genres']
+            for card in data['reviews']
+        ))
+
+    def test_single_objects_and_aliases(self):
+        """Test root lookups by slug, missing rows and aliased fields."""
+        review, = self.make_reviews(1)
+
+        data = query.execute('''{
+          review(slug: "%s") {
+            title
+            latest: comments(limit: 1) { content }
+            oldest_first: comments(limit: 10) { id }
+          }
+          book(slug: "missing") { title }
+        }''' % review.slug)
+
+        self.assertEqual(
+            data['review']['latest'], [{'content': 'Comment 3'}],
+        )
+        self.assertEqual(len(data['review']['oldest_first']), 4)
+        self.assertIsNone(data['book'])
+
+    def test_depth_limit(self):
+        """Test queries nested past MAX_DEPTH are refused."""
+        text = '{ reviews { book { genres { name } } } }'
+        query.execute(text)
+
+        with mock.patch.object(query, 'MAX_DEPTH', 2):
+            with self.assertRaisesMessage(query.QueryError, 'deeper'):
+                query.execute(text)
+
+    def test_deep_nesting_refused_while_parsing(self):
+        """Test absurdly nested queries get a 400, not a RecursionError."""
+        response = self.post('{a' * 2000 + '}' * 2000)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('deeper', response.json()['errors'][0]['message'])
+
+    def test_cost_limit(self):
+        """Test queries that could return too many objects are refused."""
+        response = self.post('''{
+          reviews(limit: 50) {
+            comments(limit: 10) { user { slug } }
+            book { genres { name } }
+          }
+        }''')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('the limit is', response.json()['errors'][0]['message'])
+
+    def test_invalid_queries(self):
+        """Test malformed queries and bad fields or arguments get a 400."""
+        invalid = [
+            '{ reviews { slug }',
+            '{ users { slug } }',
+            '{ reviews { password } }',
+            '{ reviews { book } }',
+            '{ reviews { slug { name } } }',
+            '{ reviews(limit: 500) { slug } }',
+            '{ reviews(limit: "ten") { slug } }',
+            '{ reviews(sort: 1) { slug } }',
+            '{ review { slug } }',
+            '{ reviews(limit: $missing) { slug } }',
+            None,
+        ]
+        for text in invalid:
+            with self.subTest(text=text):
+                response = self.post(text)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('errors', response.json())
+
+    def test_hides_deleted_rows(self):
+        """Test soft-deleted reviews are left out."""
+        first, second = self.make_reviews(2)
+        ReviewPost.objects.filter(pk=first.pk).update(
+            deleted_at=timezone.now(),
+        )
+
+        data = query.execute('{ reviews { slug } }')
+
+        self.assertEqual(data['reviews'], [{'slug': second.slug}])
+
+    def test_hides_reviews_of_hidden_books(self):
+        """Test reviews of books with only pending genres are left out."""
+        first, second = self.make_reviews(2)
+        first.book.genres.remove(Genre.objects.get(name='Fantasy'))
+
+        data = query.execute(
+            '{ reviews { slug } review(slug: $slug) { slug } }',
+            {'slug': first.slug},
+        )
+
+        self.assertEqual(data['reviews'], [{'slug': second.slug}])
+        self.assertIsNone(data['review'])
@@ -0,0 +1,150 @@
+"""
+Tests for token-bucket rate limiting.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from backend import metrics, ratelimit
+
+
+class TokenBucketStoreTests(TestCase):
+    """Test both bucket stores refill and drain the same way."""
+
+    def check_store(self, store):
+        with patch('time.monotonic') as monotonic, \
+                patch('time.time') as wall:
+            monotonic.return_value = wall.return_value = 1000.0
+            waits = [store.consume('k', 2, 1.0) for _ in range(3)]
+            self.assertEqual(waits, [0.0, 0.0, 1.0])
+
+            monotonic.return_value = wall.return_value = 1001.5
+            self.assertEqual(store.consume('k', 2, 1.0), 0.0)
+            self.assertEqual(store.consume('other', 2, 1.0), 0.0)
+
+    def test_local_store(self):
+        self.check_store(ratelimit.LocalTokenBucketStore())
+
+    def test_cache_store(self):
+        self.check_store(ratelimit.CacheTokenBucketStore())
+
+    def test_local_store_prunes_each_scope_at_its_own_rate(self):
+        """Test a fast scope filling the store keeps slow drained buckets."""
+        store = ratelimit.LocalTokenBucketStore()
+        store.max_keys = 3
+        with patch('time.monotonic') as monotonic:
+            monotonic.return_value = 1000.0
+            for _ in range(5):
+                store.consume('login:ip:1', 5, 5 / 60)
+
+            monotonic.return_value = 1001.0
+            for i in range(4):
+                store.consume(f'search:ip:{i}', 20, 20.0)
+
+            self.assertIn('login:ip:1', store._buckets)
+            self.assertGreater(store.consume('login:ip:1', 5, 5 / 60), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('5/min'), (5, 5 / 60))
+        self.assertEqual(ratelimit.parse_rate('20/sec'), (20, 20))
+
+
+@override_settings(RATE_LIMITS={
+    'login': '2/min', 'search': '2/min', 'query': '2/min',
+})
+class RateLimitTests(TestCase):
+    """Test throttled requests are refused with Retry-After."""
+
+    def setUp(self):
+        ratelimit.reset_store()
+        metrics.reset()
+
+    def tearDown(self):
+        ratelimit.reset_store()
+
+    def test_admin_login_is_limited_per_ip(self):
+        """Test the middleware limits POSTs to the admin login."""
+        url = reverse('admin:login')
+        data = {'username': 'nobody@example.com', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, data).status_code, 200)
+
+        res = self.client.post(url, data)
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res['Retry-After'], '30')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_forwarded_for_does_not_reset_bucket(self):
+        """Test a rotating X-Forwarded-For is not trusted without proxies."""
+        url = reverse('admin:login')
+        data = {'username': 'nobody@example.com', 'password': 'wrong'}
+        codes = [
+            self.client.post(
+                url, data, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}',
+            ).status_code
+            for i in range(4)
+        ]
+
+        self.assertEqual(codes, [200, 200, 429, 429])
+
+    def test_search_throttle(self):
+        """Test DRF views throttle through the same buckets."""
+        client = APIClient()
+        url = reverse('api:autocomplete')
+        for _ in range(2):
+            res = client.get(url, {'q': 'x'})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = client.get(url, {'q': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+    def test_query_throttle(self):
+        """Test the query endpoint has a bucket of its own."""
+        client = APIClient()
+        url = reverse('api:query')
+        body = {'query': '{ reviews { slug } }'}
+        for _ in range(2):
+            res = client.post(url, body, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = client.post(url, body, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = client.get(reverse('api:autocomplete'), {'q': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_authenticated_users_get_own_bucket(self):
+        """Test users are keyed on their account rather than their IP."""
+        client = APIClient()
+        url = reverse('api:autocomplete')
+        for _ in range(2):
+            client.get(url, {'q': 'x'})
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='Django@123',
+        )
+        client.force_authenticate(user)
+
+        res = client.get(url, {'q': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_throttled_requests_exported_as_metrics(self):
+        """Test throttles are counted and served on /metrics."""
+        url = reverse('api:autocomplete')
+        for _ in range(3):
+            self.client.get(url, {'q': 'x'})
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(
+            'ratelimit_throttled_total{scope="search"} 1',
+            res.content.decode(),
+        )
@@ -0,0 +1,34 @@
+"""
+URL mappings for the API.
+"""
+from django.urls import path, re_path
+
+from api import views
+
+app_name = 'api'
+
+urlpatterns = [
+    re_path(
+        r'^export/(?P<dataset>reviews|books)\.(?P<fmt>csv|jsonl)'
+        r'(?P<gz>\.gz)?$',
+        views.export,
+        name='export',
+    ),
+    path('autocomplete/', views.suggest, name='autocomplete'),
+    path('books/', views.book_list, name='book-list'),
+    path('books/<slug:slug>/', views.book_detail, name='book-detail'),
+    path('reviews/', views.review_list, name='review-list'),
+    path('reviews/<slug:slug>/', views.review_detail, name='review-detail'),
+    path('genres/', views.genre_list, name='genre-list'),
+    path('query/', views.run_query, name='query'),
+    path('token/', views.obtain_token, name='token'),
+    path('me/', views.me, name='me'),
+    path(
+        'notifications/', views.notification_list, name='notifications',
+    ),
+    path(
+        'notifications/read/',
+        views.notification_mark_read,
+        name='notifications-read',
+    ),
+]
@@ -0,0 +1,315 @@
+"""
+Views for the API.
+"""
+from django.contrib.auth import authenticate, get_user_model
+from django.db.models import Count, Max, Prefetch, Q, Sum
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    throttle_classes,
+)
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from api import autocomplete, query
+from api.authentication import issue_token
+from api.conditional import conditional
+from api.serializers import (
+    BookSerializer,
+    BookValuesSerializer,
+    GenreListSerializer,
+    ReviewPostListValuesSerializer,
+    ReviewPostSerializer,
+)
+from backend.ratelimit import LoginThrottle, QueryThrottle, SearchThrottle
+from core_db import exports, notifications, purge
+from core_db.models import Book, Genre, ReviewPost
+
+BOOK_PAGE_SIZE = 50
+REVIEW_PAGE_SIZE = 20
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export(request, dataset, fmt, gz=None):
+    """Stream a full export of reviews or books as a file download."""
+    rows, fields = exports.DATASETS[dataset]
+    compress = bool(gz)
+    response = StreamingHttpResponse(
+        exports.export_stream(rows(), fields, fmt=fmt, compress=compress),
+        content_type=(
+            'application/gzip' if compress else exports.CONTENT_TYPES[fmt]
+        ),
+    )
+    filename = f'{dataset}.{fmt}{".gz" if compress else ""}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@throttle_classes([SearchThrottle])
+def suggest(request):
+    """Type-ahead suggestions for the "review a book" form."""
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        limit = 10
+    query = request.query_params.get('q', '')
+
+    response = Response({
+        'query': query,
+        'min_length': autocomplete.MIN_LENGTH,
+        'debounce_ms': autocomplete.DEBOUNCE_MS,
+        **autocomplete.suggest(query, limit),
+    })
+    patch_cache_control(
+        response, public=True, max_age=autocomplete.CACHE_TIMEOUT,
+    )
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([])
+@throttle_classes([LoginThrottle])
+def obtain_token(request):
+    """Exchange an email and password for a signed API token.
+
+    Unlike a session login this writes nothing: no session row and no
+    last_login update.
+    """
+    user = authenticate(
+        request,
+        email=request.data.get('email'),
+        password=request.data.get('password'),
+    )
+    if user is None:
+        return Response(
+            {'detail': 'Invalid credentials.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({'token': issue_token(user)})
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def me(request):
+    """The authenticated user, served from the auth claims alone.
+
+    DELETE closes the account: it is hidden at once and its data purged
+    in the background.
+    """
+    user = request.user
+    if request.method == 'DELETE':
+        purge.soft_delete_user(get_user_model().objects.get(pk=user.pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({
+        'email': user.email,
+        'slug': user.slug,
+        'is_staff': user.is_staff,
+    })
+
+
+@api_view(['POST'])
+@throttle_classes([QueryThrottle])
+def run_query(request):
+    """Answer a GraphQL-style query; see api/query.py.
+
+    The body holds `query` and optionally `variables`. Invalid, too deep
+    or too costly queries get a 400 with the reasons in `errors`.
+    """
+    body = request.data
+    try:
+        if not isinstance(body, dict):
+            raise query.QueryError('The body must be an object.')
+        variables = body.get('variables')
+        if variables is not None and not isinstance(variables, dict):
+            raise query.QueryError('variables must be an object.')
+        data = query.execute(body.get('query'), variables)
+    except query.QueryError as exc:
+        return Response(
+            {'errors': [{'message': str(exc)}]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({'data': data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_list(request):
+    """The latest notifications of the user, with their counts."""
+    unread, total = notifications.counts(request.user)
+    unread_only = request.query_params.get('unread') == '1'
+    items = notifications.inbox(request.user, unread_only)[:50]
+    return Response({
+        'unread': unread,
+        'total': total,
+        'results': [
+            {
+                'id': item.pk,
+                'kind': item.kind,
+                'message': item.message,
+                'review': item.review_post.slug,
+                'actor_count': item.actor_count,
+                'is_read': item.is_read,
+                'updated_at': item.updated_at,
+            }
+            for item in items
+        ],
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def notification_mark_read(request):
+    """Mark the listed notification ids, or all of them, as read."""
+    try:
+        if not isinstance(request.data, dict):
+            raise ValueError('The body must be an object.')
+        marked = notifications.mark_read(
+            request.user, request.data.get('ids'),
+        )
+    except ValueError as exc:
+        return Response(
+            {'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST,
+        )
+    unread, total = notifications.counts(request.user)
+    return Response({'marked': marked, 'unread': unread, 'total': total})
+
+
+def approved_genres():
+    return Genre.objects.filter(is_approved=True).order_by('name')
+
+
+def book_version(request, slug):
+    row = Book.objects.filter(slug=slug).annotate(
+        genres_updated_at=Max('genres__updated_at'),
+    ).values_list('pk', 'updated_at', 'genres_updated_at').first()
+    if row is None:
+        return None
+    pk, updated_at, genres_updated_at = row
+    return f'book:{pk}', max(filter(None, [updated_at, genres_updated_at]))
+
+
+def review_version(request, slug):
+    row = ReviewPost.objects.exclude_unapproved_only().filter(
+        slug=slug,
+    ).values_list('pk', 'updated_at', 'book__updated_at').first()
+    if row is None:
+        return None
+    pk, updated_at, book_updated_at = row
+    return f'review:{pk}', max(updated_at, book_updated_at)
+
+
+def genre_list_version(request):
+    # The count catches genres that were deleted or unapproved. Refreshed
+    # counts leave updated_at alone, so their sums go in the key and the
+    # list has no Last-Modified.
+    summary = approved_genres().aggregate(
+        total=Count('id'), latest=Max('updated_at'),
+        books=Sum('book_count'), reviews=Sum('review_count'),
+    )
+    key = 'genres:{total}:{latest}:{books}:{reviews}'.format(**summary)
+    return key, None
+
+
+@conditional(book_version)
+@api_view(['GET'])
+def book_detail(request, slug):
+    """A book with its approved genres."""
+    queryset = Book.objects.prefetch_related(
+        Prefetch('genres', queryset=approved_genres()),
+    )
+    book = get_object_or_404(queryset, slug=slug)
+    return Response(BookSerializer(book).data)
+
+
+@conditional(review_version)
+@api_view(['GET'])
+def review_detail(request, slug):
+    """A single review with the book and reviewer it belongs to.
+
+    Reviews of books hidden by their genres are not found.
+    """
+    queryset = ReviewPost.objects.exclude_unapproved_only().select_related(
+        'book', 'reviewer',
+    ).with_content()
+    review = get_object_or_404(queryset, slug=slug)
+    return Response(ReviewPostSerializer(review).data)
+
+
+@api_view(['GET'])
+def review_list(request):
+    """Latest reviews, newest first, with excerpts instead of bodies.
+
+    Reviews of books whose genres are all unapproved are left out, as
+    the books are from book_list. Pass the last review's id as `before`
+    to get the next page.
+    """
+    queryset = ReviewPost.objects.exclude_unapproved_only().order_by('-pk')
+    book = request.query_params.get('book')
+    if book:
+        queryset = queryset.filter(book__slug=book)
+    before = request.query_params.get('before')
+    if before and before.isdigit():
+        queryset = queryset.filter(pk__lt=int(before))
+    serializer = ReviewPostListValuesSerializer(queryset[:REVIEW_PAGE_SIZE])
+    return Response({
+        'results': serializer.data,
+        'next_before': serializer.pks[-1] if serializer.pks else None,
+    })
+
+
+def filter_genres(queryset, slugs, match_all=False):
+    """Books in any, or all, of the approved genres named by `slugs`."""
+    slugs = set(slugs)
+    genre_ids = list(approved_genres().filter(slug__in=slugs).values_list(
+        'pk', flat=True,
+    ))
+    if not genre_ids or (match_all and len(genre_ids) < len(slugs)):
+        return queryset.none()
+    return queryset.in_genres(genre_ids, match_all=match_all)
+
+
+@api_view(['GET'])
+def book_list(request):
+    """Books with their approved genres, most reviewed first.
+
+    Books whose genres are all unapproved are left out. Repeat `genre`
+    to filter by several genre slugs, and pass `match=all` to only get
+    books in every one of them. Pass the last book's id as `before` to
+    get the next page.
+    """
+    queryset = Book.objects.exclude_unapproved_only()
+    genres = request.query_params.getlist('genre')
+    if genres:
+        queryset = filter_genres(
+            queryset, genres,
+            match_all=request.query_params.get('match') == 'all',
+        )
+    queryset = queryset.order_by('-review_count', '-pk')
+    before = request.query_params.get('before')
+    if before and before.isdigit():
+        last = Book.objects.filter(pk=int(before)).values_list(
+            'review_count', flat=True,
+        ).first()
+        if last is not None:
+            queryset = queryset.filter(
+                Q(review_count__lt=last)
+                | Q(review_count=last, pk__lt=int(before))
+            )
+    serializer = BookValuesSerializer(queryset[:BOOK_PAGE_SIZE])
+    return Response({
+        'results': serializer.data,
+        'next_before': serializer.pks[-1] if serializer.pks else None,
+    })
+
+
+@conditional(genre_list_version)
+@api_view(['GET'])
+def genre_list(request):
+    """All approved genres with their book and review counts."""
+    return Response(GenreListSerializer(approved_genres(), many=True).data)
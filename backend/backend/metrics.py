@@ -0,0 +1,78 @@
+"""
+Minimal in-process counters exported in the Prometheus text format.
+
+Counters live in the worker process that increments them; a scraper that
+hits several workers sees one sample per worker. Numbers shared between
+processes, such as those of background tasks, are read from the database
+at scrape time by collectors instead.
+"""
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+_lock = threading.Lock()
+_counters = {}
+_collectors = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in sorted(labels))
+    return '{' + pairs + '}'
+
+
+def increment(name, amount=1, **labels):
+    """Add `amount` to the counter `name` with the given labels."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def value(name, **labels):
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+def collector(func):
+    """Register `func` to yield gauge samples when the metrics are served.
+
+    `func` yields (name, labels, value) tuples, labels being a dict.
+    """
+    _collectors.append(func)
+    return func
+
+
+def render():
+    """Return every counter and collected gauge as Prometheus text."""
+    with _lock:
+        samples = [
+            (name, 'counter', labels, count)
+            for (name, labels), count in sorted(_counters.items())
+        ]
+    for func in _collectors:
+        samples.extend(
+            (name, 'gauge', tuple(sorted(labels.items())), gauge)
+            for name, labels, gauge in func()
+        )
+    lines = []
+    seen = set()
+    for name, kind, labels, count in samples:
+        if name not in seen:
+            lines.append(f'# TYPE {name} {kind}')
+            seen.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Serve the counters to staff users and INTERNAL_IPS."""
+    internal = request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    if not internal and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4')
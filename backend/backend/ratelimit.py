@@ -0,0 +1,214 @@
+"""
+Token-bucket rate limiting for the API and the admin.
+
+Limits are set per scope in settings.RATE_LIMITS as "<tokens>/<period>",
+e.g. "5/min": a bucket holds up to 5 tokens and refills at 5 per minute.
+Requests are keyed on the user when authenticated and on the client IP
+otherwise. The IP is REMOTE_ADDR unless REST_FRAMEWORK['NUM_PROXIES']
+says how many proxies' X-Forwarded-For entries to trust.
+
+Bucket state lives in the store named by settings.RATE_LIMIT_STORE:
+LocalTokenBucketStore keeps it in the worker process, while
+CacheTokenBucketStore shares it between workers through the default
+cache.
+"""
+import math
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from backend import metrics
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Turn "10/min" into (capacity, tokens refilled per second)."""
+    tokens, period = rate.split('/')
+    capacity = int(tokens)
+    return capacity, capacity / PERIODS[period.strip()[0]]
+
+
+def _refill(tokens, updated, capacity, refill_rate, now):
+    return min(capacity, tokens + (now - updated) * refill_rate)
+
+
+def _take(tokens, capacity, refill_rate, cost):
+    """Return (tokens left, seconds to wait) after trying to take `cost`."""
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / refill_rate
+
+
+class LocalTokenBucketStore:
+    """Buckets kept in this process, guarded by a lock."""
+    max_keys = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(
+                key, (capacity, now, capacity, refill_rate),
+            )
+            tokens = _refill(tokens, updated, capacity, refill_rate, now)
+            tokens, wait = _take(tokens, capacity, refill_rate, cost)
+            self._buckets[key] = (tokens, now, capacity, refill_rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no information. Each
+        # is judged by the rate of its own scope.
+        buckets = self._buckets.items()
+        self._buckets = {
+            key: (tokens, updated, capacity, refill_rate)
+            for key, (tokens, updated, capacity, refill_rate) in buckets
+            if _refill(tokens, updated, capacity, refill_rate, now) < capacity
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheTokenBucketStore:
+    """Buckets kept in the Django cache, shared by all workers.
+
+    Each read-modify-write holds a short lock taken with cache.add(), which
+    is atomic on every backend. If the lock cannot be had the request is
+    let through rather than stalled.
+    """
+    lock_timeout = 1
+    lock_attempts = 20
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        bucket_key = f'ratelimit:{key}'
+        lock_key = f'{bucket_key}:lock'
+        token = uuid.uuid4().hex
+        for _ in range(self.lock_attempts):
+            if cache.add(lock_key, token, self.lock_timeout):
+                break
+            time.sleep(0.005)
+        else:
+            return 0.0
+
+        try:
+            now = time.time()
+            tokens, updated = cache.get(bucket_key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, refill_rate, now)
+            tokens, wait = _take(tokens, capacity, refill_rate, cost)
+            timeout = math.ceil(capacity / refill_rate) + 1
+            cache.set(bucket_key, (tokens, now), timeout)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        return wait
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.RATE_LIMIT_STORE)()
+    return _store
+
+
+def reset_store():
+    global _store
+    _store = None
+
+
+def client_key(request, ident):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{ident}'
+
+
+def check(scope, key):
+    """Take a token for `key` in `scope`; return seconds to wait, or 0."""
+    rate = settings.RATE_LIMITS.get(scope)
+    if rate is None:
+        return 0.0
+    capacity, refill_rate = parse_rate(rate)
+    wait = get_store().consume(f'{scope}:{key}', capacity, refill_rate)
+    if wait:
+        metrics.increment('ratelimit_throttled_total', scope=scope)
+    return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle drawing from the token bucket of `scope`.
+
+    The scope is taken from the class, or from the view's throttle_scope.
+    """
+    scope = None
+    wait_seconds = 0.0
+
+    def allow_request(self, request, view):
+        scope = self.scope or getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+        key = client_key(request, self.get_ident(request))
+        self.wait_seconds = check(scope, key)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = 'search'
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class QueryThrottle(TokenBucketThrottle):
+    scope = 'query'
+
+
+class RateLimitMiddleware:
+    """Apply settings.RATE_LIMIT_RULES to requests outside of DRF.
+
+    Each rule is (scope, HTTP method, path regex). Must come after
+    AuthenticationMiddleware so requests can be keyed on the user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = [
+            (scope, method, re.compile(pattern))
+            for scope, method, pattern in settings.RATE_LIMIT_RULES
+        ]
+        self.ident = BaseThrottle()
+
+    def __call__(self, request):
+        for scope, method, pattern in self.rules:
+            if request.method != method or not pattern.match(request.path):
+                continue
+            key = client_key(request, self.ident.get_ident(request))
+            wait = check(scope, key)
+            if wait:
+                response = HttpResponse(
+                    'Too many requests.', status=429,
+                    content_type='text/plain',
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+        return self.get_response(request)
@@ -38,7 +38,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'core_db',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -47,6 +49,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -137,3 +140,121 @@ MEDIA_URL = '/media/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core_db.User'
+
+# Sessions are read from the cache and only fall back to the database on
+# a miss. Set to django.contrib.sessions.backends.signed_cookies to skip
+# the database entirely.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db',
+)
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    # Uses orjson when installed, the standard json module otherwise.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Proxies in front of the app whose X-Forwarded-For entries are
+    # trusted. With 0, clients are identified (and rate limited, see
+    # backend/ratelimit.py) by REMOTE_ADDR and the header is ignored.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Lifetime of signed API tokens, and of the user claims cached to
+# authenticate them. See api/authentication.py.
+API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE', 24 * 3600))
+API_USER_CLAIMS_TIMEOUT = int(os.environ.get('API_USER_CLAIMS_TIMEOUT', 30))
+
+# Number of rows each admin bulk action transaction touches.
+BULK_ACTION_CHUNK_SIZE = int(os.environ.get('BULK_ACTION_CHUNK_SIZE', 500))
+
+INTERNAL_IPS = ['127.0.0.1']
+
+# Background tasks, see core_db/tasks.py. Failed tasks are retried after
+# TASK_RETRY_BACKOFF * 2**(attempts - 1) seconds, capped at
+# TASK_RETRY_BACKOFF_MAX. Workers refresh the heartbeat of a running task
+# every TASK_HEARTBEAT_INTERVAL seconds; tasks without one for
+# TASK_STALE_AFTER seconds are assumed lost with their worker and queued
+# again, or marked FAILED if out of attempts. Bulk action jobs with no
+# progress for as long are taken over by the next worker. Finished tasks
+# are deleted TASK_RETENTION seconds after they finish.
+TASK_RETRY_BACKOFF = int(os.environ.get('TASK_RETRY_BACKOFF', 10))
+TASK_RETRY_BACKOFF_MAX = int(os.environ.get('TASK_RETRY_BACKOFF_MAX', 3600))
+TASK_STALE_AFTER = int(os.environ.get('TASK_STALE_AFTER', 600))
+TASK_HEARTBEAT_INTERVAL = int(os.environ.get('TASK_HEARTBEAT_INTERVAL', 60))
+TASK_RETENTION = int(os.environ.get('TASK_RETENTION', 7 * 24 * 3600))
+
+# Notifications, see core_db/notifications.py. Reactions and comments on a
+# review are coalesced into one notification per NOTIFICATION_WINDOW
+# seconds. Digests are sent NOTIFICATION_DIGEST_BATCH_SIZE users at a time.
+NOTIFICATION_WINDOW = int(os.environ.get('NOTIFICATION_WINDOW', 900))
+NOTIFICATION_DIGEST_BATCH_SIZE = int(
+    os.environ.get('NOTIFICATION_DIGEST_BATCH_SIZE', 200)
+)
+
+# Genre review counts are refreshed in batches, at most once every
+# GENRE_COUNT_INTERVAL seconds, see core_db/genre_counts.py.
+GENRE_COUNT_INTERVAL = int(os.environ.get('GENRE_COUNT_INTERVAL', 300))
+
+# Near-duplicate reviews, see core_db/duplicates.py. A review whose body
+# is at least REVIEW_DUPLICATE_THRESHOLD alike (estimated Jaccard
+# similarity of its word shingles) to an earlier one is flagged, or with
+# 'reject' refused. 'off' skips the check but keeps indexing.
+REVIEW_DUPLICATE_ACTION = os.environ.get('REVIEW_DUPLICATE_ACTION', 'flag')
+REVIEW_DUPLICATE_THRESHOLD = float(
+    os.environ.get('REVIEW_DUPLICATE_THRESHOLD', 0.8)
+)
+
+# Change stream, see core_db/changes.py. Changes older than
+# CHANGE_RETENTION seconds are pruned by `stream_changes --prune`.
+CHANGE_RETENTION = int(os.environ.get('CHANGE_RETENTION', 7 * 24 * 3600))
+
+# Pre-rendered book and review pages, see core_db/static_site.py. Links in
+# the pages and sitemaps are prefixed with STATIC_SITE_BASE_URL.
+STATIC_SITE_ROOT = os.environ.get('STATIC_SITE_ROOT', BASE_DIR / 'site')
+STATIC_SITE_BASE_URL = os.environ.get('STATIC_SITE_BASE_URL', '')
+
+
+# Email
+# Defaults to a local SMTP stand-in such as `python -m aiosmtpd -n -l
+# localhost:1025`.
+
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend',
+)
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+DEFAULT_FROM_EMAIL = os.environ.get(
+    'DEFAULT_FROM_EMAIL', 'Bookworm <noreply@localhost>',
+)
+
+
+# Rate limiting
+# Token buckets per scope, "<tokens>/<sec|min|hour|day>". See
+# backend/ratelimit.py. Use backend.ratelimit.CacheTokenBucketStore to
+# share buckets between worker processes through the cache.
+
+RATE_LIMIT_STORE = os.environ.get(
+    'RATE_LIMIT_STORE', 'backend.ratelimit.LocalTokenBucketStore',
+)
+
+RATE_LIMITS = {
+    'login': '5/min',
+    'review_create': '10/hour',
+    'comment': '30/min',
+    'reaction': '60/min',
+    'search': '20/sec',
+    'query': '10/sec',
+}
+
+# Rate limits for requests that don't go through DRF views.
+RATE_LIMIT_RULES = [
+    ('login', 'POST', r'^/admin/login/'),
+    ('review_create', 'POST', r'^/admin/core_db/reviewpost/add/'),
+    ('comment', 'POST', r'^/admin/core_db/comment/add/'),
+    ('reaction', 'POST', r'^/admin/core_db/reaction/add/'),
+]
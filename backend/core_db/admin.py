@@ -1,11 +1,194 @@
+import datetime
+
+from django.conf import settings
 from django.contrib import admin
+from django import forms
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Genre, Book, ReviewPost, Reaction, Comment
+from django.db import models
+from django.utils import timezone
+
+from . import bulk_actions, duplicates, purge
+from .models import (
+    User, Genre, Book, BookGenre, ReviewPost, ReviewSignature, Reaction,
+    Comment, BulkActionJob, Task,
+)
+from .paginators import EstimatedCountPaginator
+
+
+# --- HELPERS FOR LARGE CHANGELISTS ---
+class IndexedDatesQuerySet(models.QuerySet):
+    """QuerySet whose date drill-down only probes the date index.
+
+    The admin date hierarchy asks for the distinct years, months or days
+    of the filtered rows, which Postgres answers with a full scan. Here
+    the bounds come from MIN/MAX and each candidate bucket is checked with
+    an EXISTS range probe instead.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None,
+                  is_dst=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo, is_dst)
+
+        bounds = self.aggregate(
+            first=models.Min(field_name),
+            last=models.Max(field_name),
+        )
+        if bounds['first'] is None:
+            return []
+
+        tz = tzinfo or timezone.get_current_timezone()
+        if timezone.is_aware(bounds['first']):
+            first = timezone.localtime(bounds['first'], tz)
+            last = timezone.localtime(bounds['last'], tz)
+        else:
+            first, last = bounds['first'], bounds['last']
+
+        buckets = []
+        start = _truncate(first, kind)
+        while start.date() <= last.date():
+            end = _next_bucket(start, kind)
+            lookup = {
+                f'{field_name}__gte': _make_aware(start, tz),
+                f'{field_name}__lt': _make_aware(end, tz),
+            }
+            if self.filter(**lookup).exists():
+                buckets.append(_make_aware(start, tz))
+            start = end
+
+        if order == 'DESC':
+            buckets.reverse()
+        return buckets
+
+
+def _truncate(value, kind):
+    if kind == 'year':
+        return datetime.datetime(value.year, 1, 1)
+    if kind == 'month':
+        return datetime.datetime(value.year, value.month, 1)
+    return datetime.datetime(value.year, value.month, value.day)
+
+
+def _next_bucket(value, kind):
+    if kind == 'year':
+        return value.replace(year=value.year + 1)
+    if kind == 'month':
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    return value + datetime.timedelta(days=1)
+
+
+def _make_aware(value, tz):
+    if settings.USE_TZ:
+        return timezone.make_aware(value, tz)
+    return value
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for tables that grow into the millions of rows."""
+    paginator = EstimatedCountPaginator
+    # Skip the extra unfiltered COUNT(*) behind "N total".
+    show_full_result_count = False
+
+    def get_actions(self, request):
+        """Drop the stock delete action, which deletes in one transaction."""
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+class SoftDeleteAdminMixin:
+    """Delete through `soft_delete`, leaving the cascade to a purge task.
+
+    The confirmation page lists only the selected objects, rather than
+    collecting every row the cascade would reach.
+    """
+    soft_delete = None
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        opts = self.model._meta
+        return (
+            [str(obj) for obj in objs],
+            {opts.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+
+class RatingListFilter(admin.SimpleListFilter):
+    """Rating filter with fixed choices, so no SELECT DISTINCT is needed."""
+    title = 'rating'
+    parameter_name = 'rating'
+
+    def lookups(self, request, model_admin):
+        return [(str(stars), f'{stars} stars') for stars in range(1, 6)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(rating=self.value())
+        return queryset
+
+
+class GenreListFilter(admin.SimpleListFilter):
+    """Filter books by genre through a subquery instead of a DISTINCT join."""
+    title = 'genre'
+    parameter_name = 'genre'
+
+    def lookups(self, request, model_admin):
+        return Genre.objects.values_list('slug', 'name')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            book_ids = BookGenre.objects.filter(
+                genre__slug=self.value(),
+            ).values('book_id')
+            return queryset.filter(pk__in=book_ids)
+        return queryset
+
+
+class DuplicateListFilter(admin.SimpleListFilter):
+    """Reviews flagged as near-duplicates of an earlier one."""
+    title = 'near-duplicate'
+    parameter_name = 'duplicate'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Flagged')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            flagged = ReviewSignature.objects.filter(
+                duplicate_of__isnull=False,
+            ).values('review_post_id')
+            return queryset.filter(pk__in=flagged)
+        return queryset
+
+
+class ReviewPostForm(forms.ModelForm):
+    def clean_review_content(self):
+        # Surfaces REVIEW_DUPLICATE_ACTION = 'reject' as a form error. The
+        # check is kept on the instance for the pre_save signal to reuse.
+        content = self.cleaned_data['review_content']
+        self.instance._checked_content = (
+            content,
+            duplicates.find_duplicate(content, exclude=self.instance.pk),
+        )
+        return content
+
 
 # --- CUSTOM USER ADMIN ---
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(SoftDeleteAdminMixin, BaseUserAdmin):
     """Admin configuration for the custom email-based User model."""
+    soft_delete = staticmethod(purge.soft_delete_user)
     ordering = ['email']
     list_display = ['email', 'first_name', 'last_name', 'is_staff', 'is_active']
 
@@ -30,35 +213,131 @@ class UserAdmin(BaseUserAdmin):
 # --- GENRE ADMIN WITH APPROVAL ACTION ---
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
-    list_display = ('name', 'is_approved', 'slug')
+    list_display = ('name', 'is_approved', 'slug', 'book_count',
+                    'review_count')
     list_filter = ('is_approved',)
     search_fields = ('name',)
-    actions = ['approve_genres']
-
-    def approve_genres(self, request, queryset):
-        queryset.update(is_approved=True)
-    approve_genres.short_description = "Approve selected genres"
+    actions = [
+        bulk_actions.admin_action('approve_genres', 'Approve selected genres'),
+    ]
 
 
 # --- BOOK ADMIN ---
+class BookGenreInline(admin.TabularInline):
+    # Book.genres has its own through model, so it is edited here.
+    model = BookGenre
+    autocomplete_fields = ('genre',)
+    extra = 1
+
+
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdmin):
     list_display = ('title', 'author', 'slug')
     search_fields = ('title', 'author')
     # Helps you filter books by genre quickly
-    list_filter = ('genres',)
+    list_filter = (GenreListFilter,)
+    inlines = (BookGenreInline,)
+    actions = [
+        bulk_actions.admin_action(
+            'delete_books',
+            'Delete selected books',
+            permissions=('delete',),
+        ),
+    ]
 
 
 # --- REVIEW POST ADMIN ---
 @admin.register(ReviewPost)
-class ReviewPostAdmin(admin.ModelAdmin):
-    list_display = ('review_title', 'book', 'reviewer', 'rating', 'review_date')
-    list_filter = ('rating', 'review_date')
+class ReviewPostAdmin(SoftDeleteAdminMixin, LargeTableAdmin):
+    soft_delete = staticmethod(purge.soft_delete_review)
+    form = ReviewPostForm
+    list_display = (
+        'review_title', 'book', 'reviewer', 'rating', 'review_date',
+    )
+    list_select_related = ('book', 'reviewer')
+    list_filter = (RatingListFilter, DuplicateListFilter, 'review_date')
+    # Backed by the (review_date, id) index, see IndexedDatesQuerySet
+    date_hierarchy = 'review_date'
+    ordering = ('-review_date', '-pk')
     # Use double underscore (__) to search fields in related models
     search_fields = ('review_title', 'book__title', 'reviewer__email')
     readonly_fields = ('slug', 'review_date')
+    autocomplete_fields = ('book',)
+    raw_id_fields = ('reviewer',)
+    actions = [
+        bulk_actions.admin_action(
+            'delete_reviews',
+            'Delete selected reviews',
+            permissions=('delete',),
+        ),
+    ]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            model=queryset.model,
+            query=queryset.query,
+            using=queryset.db,
+        )
+
+
+# --- INTERACTION ADMINS ---
+@admin.register(Reaction)
+class ReactionAdmin(LargeTableAdmin):
+    list_display = ('user', 'review_post', 'reaction_type')
+    list_select_related = ('user', 'review_post')
+    list_filter = ('reaction_type',)
+    raw_id_fields = ('user', 'review_post')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('user', 'review_post', 'created_at')
+    list_select_related = ('user', 'review_post')
+    list_filter = ('created_at',)
+    ordering = ('-created_at', '-pk')
+    raw_id_fields = ('user', 'review_post')
+    readonly_fields = ('created_at',)
+    actions = [
+        bulk_actions.admin_action(
+            'delete_comments',
+            'Delete selected comments',
+            permissions=('delete',),
+        ),
+    ]
+
 
+# --- BULK ACTION PROGRESS ---
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'action', 'content_type', 'status', 'processed', 'total',
+        'created_by', 'updated_at',
+    )
+    list_select_related = ('content_type', 'created_by')
+    list_filter = ('status',)
+    readonly_fields = (
+        'action', 'content_type', 'status', 'total', 'processed', 'last_pk',
+        'error', 'created_by', 'created_at', 'updated_at',
+    )
+    exclude = ('query',)
+
+    def has_add_permission(self, request):
+        return False
+
+
+# --- BACKGROUND TASKS ---
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'status', 'attempts', 'max_attempts', 'run_at', 'updated_at',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name', 'kwargs', 'status', 'idempotency_key', 'attempts',
+        'max_attempts', 'run_at', 'started_at', 'heartbeat_at',
+        'finished_at', 'last_error', 'created_at', 'updated_at',
+    )
 
-# --- SIMPLE REGISTRATIONS FOR INTERACTIONS ---
-admin.site.register(Reaction)
-admin.site.register(Comment)
\ No newline at end of file
+    def has_add_permission(self, request):
+        return False
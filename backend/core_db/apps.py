@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreDbConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core_db'
+
+    def ready(self):
+        # Importing the modules registers their signal handlers and tasks.
+        from . import bulk_actions, purge, signals  # noqa: F401
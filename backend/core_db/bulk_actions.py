@@ -0,0 +1,204 @@
+"""
+Chunked bulk actions for the admin.
+
+An action is a function that receives a queryset limited to one chunk of
+primary keys. Chunks are walked by keyset pagination over the pk and each
+one runs in its own short transaction, so locks are only ever held on a
+bounded number of rows. Deletes go through QuerySet.delete() per chunk,
+which keeps pre/post_delete signals firing. Background jobs run only as
+run_bulk_action_job tasks, under the claim and retry rules of
+core_db.tasks.
+
+Reviews are soft-deleted (see core_db.purge), so the unbounded delete of
+a review's interactions happens in the purge task, in chunks of its own.
+"""
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from . import tasks
+from .models import BulkActionJob
+from .paginators import EstimatedCountPaginator
+
+registry = {}
+
+
+def register(name):
+    """Register a chunk handler under `name`."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def get_chunk_size():
+    return getattr(settings, 'BULK_ACTION_CHUNK_SIZE', 500)
+
+
+def iter_pk_chunks(queryset, chunk_size, start_after=None):
+    """Yield ascending lists of at most `chunk_size` pks of the queryset."""
+    queryset = queryset.order_by('pk')
+    last_pk = start_after
+    while True:
+        page = queryset
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def run_chunks(name, queryset, chunk_size=None, job=None):
+    """Apply the registered action to the queryset chunk by chunk."""
+    handler = registry[name]
+    manager = queryset.model._default_manager
+    start_after = job.last_pk if job else None
+
+    processed = 0
+    chunks = iter_pk_chunks(
+        queryset, chunk_size or get_chunk_size(), start_after,
+    )
+    for pks in chunks:
+        with transaction.atomic():
+            handler(manager.filter(pk__in=pks))
+            if job is not None:
+                job.processed += len(pks)
+                job.last_pk = pks[-1]
+                job.save(update_fields=['processed', 'last_pk', 'updated_at'])
+        processed += len(pks)
+    return processed
+
+
+def delete_in_chunks(queryset, chunk_size=None):
+    """Delete the queryset's rows a chunk of pks at a time."""
+    manager = queryset.model._base_manager
+    deleted = 0
+    for pks in iter_pk_chunks(queryset, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            deleted += manager.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def create_job(name, queryset, user=None):
+    """Record a background run of the action and queue it as a task."""
+    job = BulkActionJob.objects.create(
+        action=name,
+        content_type=ContentType.objects.get_for_model(queryset.model),
+        query=pickle.dumps(queryset.query),
+        total=EstimatedCountPaginator(queryset, 1).count,
+        created_by=user,
+    )
+    tasks.enqueue(
+        'run_bulk_action_job',
+        idempotency_key=f'bulk-action-job:{job.pk}',
+        job_id=job.pk,
+    )
+    return job
+
+
+def job_queryset(job):
+    """Rebuild the selection stored on the job."""
+    queryset = job.content_type.model_class()._default_manager.all()
+    queryset.query = pickle.loads(job.query)
+    return queryset
+
+
+def run_job(job, chunk_size=None):
+    """Run (or resume) a background job, recording progress as it goes."""
+    job.status = BulkActionJob.Status.RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+    try:
+        run_chunks(job.action, job_queryset(job), chunk_size, job=job)
+    except Exception as exc:
+        job.status = BulkActionJob.Status.FAILED
+        job.error = repr(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    job.status = BulkActionJob.Status.DONE
+    job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def stale_running():
+    """Match RUNNING jobs with no progress for TASK_STALE_AFTER seconds.
+
+    A running job saves after every chunk, so such a job's worker died.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_STALE_AFTER)
+    return Q(status=BulkActionJob.Status.RUNNING, updated_at__lt=cutoff)
+
+
+@tasks.task('run_bulk_action_job', max_attempts=3)
+def run_bulk_action_job(job_id):
+    """Run a job unless another worker has it; retries resume from last_pk.
+
+    A job left RUNNING by a dead worker is taken over once it is stale.
+    """
+    claimed = BulkActionJob.objects.filter(
+        Q(status__in=[
+            BulkActionJob.Status.PENDING, BulkActionJob.Status.FAILED,
+        ]) | stale_running(),
+        pk=job_id,
+    ).update(status=BulkActionJob.Status.RUNNING, updated_at=Now())
+    if claimed:
+        run_job(BulkActionJob.objects.get(pk=job_id))
+    elif BulkActionJob.objects.filter(
+        pk=job_id, status=BulkActionJob.Status.RUNNING,
+    ).exists():
+        # Its worker may have died after the last chunk; look again once
+        # the job would be stale.
+        tasks.enqueue(
+            'run_bulk_action_job',
+            delay=timedelta(seconds=settings.TASK_STALE_AFTER),
+            job_id=job_id,
+        )
+
+
+def admin_action(name, description, permissions=('change',)):
+    """Build a ModelAdmin action running the registered handler.
+
+    A hand-picked selection is at most one changelist page and runs
+    inline. "Select all N matching" hands the filtered queryset, still
+    unevaluated, to a background job.
+    """
+    def action(modeladmin, request, queryset):
+        if request.POST.get('select_across') != '1':
+            count = run_chunks(name, queryset)
+            modeladmin.message_user(
+                request, f'{description}: {count} processed.',
+                messages.SUCCESS,
+            )
+            return
+
+        job = create_job(name, queryset, user=request.user)
+        modeladmin.message_user(
+            request,
+            f'{description}: queued as job #{job.pk} '
+            f'(about {job.total} rows).',
+            messages.INFO,
+        )
+
+    action.__name__ = name
+    action.short_description = description
+    action.allowed_permissions = permissions
+    return action
+
+
+@register('approve_genres')
+def approve_genres(queryset):
+    queryset.update(is_approved=True, updated_at=Now())
+
+
+@register('delete_comments')
+def delete_comments(queryset):
+    queryset.delete()
@@ -0,0 +1,114 @@
+"""
+Transactional outbox of writes to books, genres, reviews, reactions and
+comments.
+
+Triggers added by migrations 0020 and 0021 append a Change row for every
+inserted, updated or deleted row of those tables in the writing
+transaction, so save(), QuerySet.update() and delete(), bulk_create() and
+raw SQL are all recorded, and a rolled back write leaves nothing. Adding
+or removing a book's genre is recorded as an update of the book, and
+adding or removing a comment as an update of its review. A change only
+names the model, operation and row id; consumers read the current row
+themselves.
+
+Changes are read in (txid, id) order and a position is that pair. Ids
+alone are not enough: a transaction can take a lower id and commit after
+a higher one has been read. Only changes of transactions older than every
+running one are returned, so a position never skips a change that is
+still to commit; a long-running transaction holds the stream back until
+it ends.
+
+Consumers keep their position in ChangeConsumer and advance it once the
+handler has returned, so every change is handled at least once. Handlers
+run outside any transaction of consume()'s own: a transaction held open
+around them would hold back every other reader of the stream, and vacuum,
+for as long as they run. prune() drops changes older than
+CHANGE_RETENTION seconds.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .bulk_actions import delete_in_chunks
+from .models import Change, ChangeConsumer
+
+START = (0, 0)
+
+
+def parse_position(value):
+    """Parse a "txid:id" position."""
+    txid, _, change_id = value.partition(':')
+    return int(txid), int(change_id or 0)
+
+
+def format_position(position):
+    return '%d:%d' % position
+
+
+def committed():
+    """Changes of transactions that have all finished."""
+    return Change.objects.filter(txid__lt=RawSQL(
+        'txid_snapshot_xmin(txid_current_snapshot())', [],
+    ))
+
+
+def read(after=START, limit=500):
+    """Return up to `limit` changes after the position `after`."""
+    txid, change_id = after
+    return list(
+        committed()
+        .filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=change_id))
+        .order_by('txid', 'id')[:limit]
+    )
+
+
+def consume(name, handler, limit=500):
+    """Pass the consumer's next batch of changes to `handler`.
+
+    A session advisory lock on the name, which needs no transaction,
+    keeps a consumer to one process at a time; if another process holds
+    it this returns 0 at once. The position only moves on once the
+    handler returns, by a compare-and-set on the position the batch was
+    read from. Returns the number of changes handled.
+    """
+    ChangeConsumer.objects.get_or_create(name=name)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_try_advisory_lock(hashtext(%s))',
+            [f'change-consumer:{name}'],
+        )
+        if not cursor.fetchone()[0]:
+            return 0
+        try:
+            consumer = ChangeConsumer.objects.get(name=name)
+            batch = read(consumer.position, limit)
+            if batch:
+                handler(batch)
+                last_txid, last_id = batch[-1].position
+                ChangeConsumer.objects.filter(
+                    name=name,
+                    last_txid=consumer.last_txid,
+                    last_id=consumer.last_id,
+                ).update(
+                    last_txid=last_txid, last_id=last_id,
+                    updated_at=timezone.now(),
+                )
+        finally:
+            cursor.execute(
+                'SELECT pg_advisory_unlock(hashtext(%s))',
+                [f'change-consumer:{name}'],
+            )
+    return len(batch)
+
+
+def prune(retention=None, chunk_size=None):
+    """Delete changes older than `retention` seconds; return how many."""
+    retention = retention or settings.CHANGE_RETENTION
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    return delete_in_chunks(
+        Change.objects.filter(created_at__lt=cutoff), chunk_size,
+    )
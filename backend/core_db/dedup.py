@@ -0,0 +1,147 @@
+"""
+Normalized keys and near-duplicate detection for books.
+"""
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import CharField, Count, F, Func, Value
+
+from . import purge
+from .models import Book, ReviewPost
+
+
+MAX_BLOCK_SIZE = 100
+
+
+def similarity(key_a, key_b):
+    return SequenceMatcher(None, key_a, key_b).ratio()
+
+
+def iter_blocks(part):
+    """Yield lists of (pk, dedup_key) sharing one part of their key.
+
+    `part` is 1 for the normalized title and 2 for the author. Books are
+    streamed ordered by that part, so every block is contiguous and only
+    one block is held in memory at a time.
+    """
+    rows = Book.objects.annotate(
+        block=Func(F('dedup_key'), Value('|'), Value(part),
+                   function='split_part', output_field=CharField()),
+    ).order_by('block', 'dedup_key', 'pk').values_list(
+        'pk', 'dedup_key', 'block',
+    )
+    block, block_key = [], None
+    for pk, key, part_key in rows.iterator(chunk_size=5000):
+        if part_key != block_key and block:
+            yield block
+            block = []
+        block_key = part_key
+        block.append((pk, key))
+    if block:
+        yield block
+
+
+def similar_pairs(block, threshold, max_block_size=MAX_BLOCK_SIZE):
+    """Yield the pairs of pks in a block whose keys are similar enough.
+
+    The block is in key order and each key is compared with the next
+    max_block_size - 1 only, so a block of a prolific author costs
+    comparisons linear in its size rather than quadratic.
+    """
+    for i, (pk_a, key_a) in enumerate(block):
+        for pk_b, key_b in block[i + 1:i + max_block_size]:
+            if key_a == key_b:
+                yield pk_a, pk_b
+                continue
+            matcher = SequenceMatcher(None, key_a, key_b)
+            # The quick ratios are upper bounds of ratio(), and cheap.
+            if (matcher.real_quick_ratio() >= threshold
+                    and matcher.quick_ratio() >= threshold
+                    and matcher.ratio() >= threshold):
+                yield pk_a, pk_b
+
+
+def find_duplicate_groups(threshold=0.9, max_block_size=MAX_BLOCK_SIZE):
+    """Return groups of pks of books whose dedup keys are similar.
+
+    Only books with the same normalized title or the same normalized
+    author are compared, so variants must agree on one of the two. Pairs
+    from both blockings are joined into groups with union-find.
+    """
+    parent = {}
+
+    def find(pk):
+        parent.setdefault(pk, pk)
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for part in (1, 2):
+        for block in iter_blocks(part):
+            for pk_a, pk_b in similar_pairs(block, threshold, max_block_size):
+                parent[find(pk_b)] = find(pk_a)
+
+    groups = {}
+    for pk in parent:
+        groups.setdefault(find(pk), []).append(pk)
+    return sorted(sorted(group) for group in groups.values())
+
+
+def pick_canonical(pks):
+    """Return the pk of the most reviewed book, oldest first on ties."""
+    counts = dict(
+        ReviewPost.objects.filter(book_id__in=pks)
+        .values_list('book_id')
+        .annotate(total=Count('id'))
+    )
+    return min(pks, key=lambda pk: (-counts.get(pk, 0), pk))
+
+
+@transaction.atomic
+def merge_books(canonical_pk, duplicate_pks):
+    """Fold the duplicate books into the canonical one.
+
+    Genres are unioned and reviews moved over in bulk. Where a reviewer
+    has reviewed more than one of the books, only their latest review is
+    kept live, to satisfy unique_live_review_per_user_per_book; the others
+    are soft-deleted and purged like any deleted review. Soft-deleted
+    reviews are moved too, so deleting the duplicates cascades to none.
+    """
+    book_ids = [canonical_pk, *duplicate_pks]
+    through = Book.genres.through
+
+    genre_ids = set(
+        through.objects.filter(book_id__in=duplicate_pks)
+        .values_list('genre_id', flat=True)
+    )
+    through.objects.bulk_create(
+        [through(book_id=canonical_pk, genre_id=pk) for pk in genre_ids],
+        ignore_conflicts=True,
+    )
+
+    reviews = ReviewPost.objects.filter(book_id__in=book_ids)
+    conflicting = (
+        reviews.values('reviewer_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .values('reviewer_id')
+    )
+    superseded = []
+    latest_seen = set()
+    rows = reviews.filter(reviewer_id__in=conflicting).order_by(
+        'reviewer_id', '-review_date', '-pk',
+    ).values_list('pk', 'reviewer_id')
+    for pk, reviewer_id in rows:
+        if reviewer_id in latest_seen:
+            superseded.append(pk)
+        latest_seen.add(reviewer_id)
+    for review in ReviewPost.objects.filter(pk__in=superseded):
+        purge.soft_delete_review(review)
+
+    moved = ReviewPost._base_manager.filter(
+        book_id__in=duplicate_pks,
+    ).update(book_id=canonical_pk)
+    Book.objects.filter(pk__in=duplicate_pks).delete()
+    Book.objects.refresh_review_counts([canonical_pk])
+    return moved, len(superseded)
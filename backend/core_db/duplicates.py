@@ -0,0 +1,256 @@
+"""
+Near-duplicate review detection with MinHash and LSH banding.
+
+A review body is reduced to the set of its normalized three-word
+shingles and summarised by a MinHash signature of NUM_PERM 32-bit values:
+the share of positions two signatures agree on estimates the Jaccard
+similarity of their shingle sets. The signature is cut into BANDS bands
+of ROWS values and each band hashed to one SignatureBucket key. Two
+reviews share a bucket with high probability once they are about half
+alike, so the candidates for a new review are the reviews found under
+its BANDS keys, one index lookup, and only those are compared: at most
+MAX_CANDIDATES of them, those sharing the most bands first. Flagged
+reviews are not put in buckets, so a review copied a thousand times
+is still compared with the original only.
+
+Reviews at least REVIEW_DUPLICATE_THRESHOLD alike to an earlier one are
+flagged on their ReviewSignature, or with REVIEW_DUPLICATE_ACTION =
+'reject' refused with DuplicateReview. Bodies shorter than MIN_WORDS
+are not indexed; short reviews like "Loved it!" repeat legitimately.
+"""
+import hashlib
+import random
+import struct
+import zlib
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ReviewSignature, SignatureBucket
+from .normalization import normalize_text
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_WORDS = 10
+MAX_CANDIDATES = 100
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+# Fixed seed: stored signatures are only comparable with the same hashes.
+_random = random.Random(20240601)
+PERMUTATIONS = [
+    (_random.randrange(1, _PRIME), _random.randrange(_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+# The permutations as uint64 columns, for hashing every shingle at once.
+# a * x would overflow 64 bits, so a is split in its high 29 and low 32
+# bits and each partial product reduced modulo _PRIME on its own.
+_A_HIGH = np.array([[a >> 32] for a, _ in PERMUTATIONS], dtype=np.uint64)
+_A_LOW = np.array([[a & _MASK] for a, _ in PERMUTATIONS], dtype=np.uint64)
+_B = np.array([[b] for _, b in PERMUTATIONS], dtype=np.uint64)
+_P = np.uint64(_PRIME)
+
+
+class DuplicateReview(ValidationError):
+    pass
+
+
+def shingles(text):
+    """Return the hashed word shingles of `text`, empty if too short."""
+    words = normalize_text(text).split()
+    if len(words) < MIN_WORDS:
+        return set()
+    return {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode())
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _mod_prime(values):
+    """Reduce uint64 `values` modulo _PRIME, using 2**61 = 1 (mod _PRIME)."""
+    values = (values & _P) + (values >> np.uint64(61))
+    return np.where(values >= _P, values - _P, values)
+
+
+def signature(text):
+    """Return the MinHash signature of `text` as bytes, or None.
+
+    Position i is min((a * x + b) % _PRIME) & _MASK over the shingle
+    hashes x, a and b being PERMUTATIONS[i], computed for all positions
+    and shingles in one pass over a NUM_PERM x shingles array.
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    # a_high * x * 2**32, with a_high * x = hi * 2**29 + lo, is
+    # hi * 2**61 + lo * 2**32 = hi + lo * 2**32 (mod _PRIME).
+    high = _A_HIGH * x
+    high = (high >> np.uint64(29)) + (
+        (high & np.uint64((1 << 29) - 1)) << np.uint64(32)
+    )
+    values = _mod_prime(_mod_prime(_A_LOW * x) + high + _B)
+    return (values.min(axis=1) & np.uint64(_MASK)).astype(
+        np.uint32,
+    ).tobytes()
+
+
+def band_keys(sig):
+    """Return the BANDS bucket keys of a signature."""
+    step = ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                struct.pack('<H', band) + sig[band * step:(band + 1) * step],
+                digest_size=8,
+            ).digest(),
+            'little',
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig, other):
+    """Estimate the Jaccard similarity of two signatures."""
+    left, right = array('I', sig), array('I', other)
+    return sum(a == b for a, b in zip(left, right)) / NUM_PERM
+
+
+def _candidates(keys, exclude=(), limit=MAX_CANDIDATES):
+    """Signatures of live, unflagged reviews sharing a bucket with any of
+    `keys`, at most `limit` of them."""
+    review_ids = SignatureBucket.objects.filter(key__in=keys).exclude(
+        review_post_id__in=exclude,
+    ).values('review_post_id').annotate(
+        shared=Count('key'),
+    ).order_by('-shared', '-review_post_id').values(
+        'review_post_id',
+    )[:limit]
+    return dict(
+        ReviewSignature.objects.filter(
+            review_post_id__in=review_ids,
+            review_post__deleted_at__isnull=True,
+            duplicate_of__isnull=True,
+        ).values_list('review_post_id', 'signature')
+    )
+
+
+def best_match(sig, candidates):
+    """Return (review id, similarity) of the closest candidate over the
+    threshold, or None."""
+    threshold = settings.REVIEW_DUPLICATE_THRESHOLD
+    best = None
+    for review_id, other in candidates.items():
+        score = similarity(sig, bytes(other))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (review_id, score)
+    return best
+
+
+def find_duplicate(text, exclude=None):
+    """Return (signature, match) for a review body about to be saved.
+
+    `match` is the (review id, similarity) of the closest earlier review,
+    or None. With REVIEW_DUPLICATE_ACTION = 'reject' a match raises
+    DuplicateReview instead.
+    """
+    sig = signature(text)
+    if sig is None or settings.REVIEW_DUPLICATE_ACTION == 'off':
+        return sig, None
+    exclude = [exclude] if exclude is not None else []
+    match = best_match(sig, _candidates(band_keys(sig), exclude))
+    if match is not None and settings.REVIEW_DUPLICATE_ACTION == 'reject':
+        raise DuplicateReview(
+            'This review is nearly identical to one already posted.',
+            code='duplicate',
+        )
+    return sig, match
+
+
+@transaction.atomic
+def store(review_id, sig, match=None):
+    """Index a review under its signature, replacing any older one."""
+    SignatureBucket.objects.filter(review_post_id=review_id).delete()
+    if sig is None:
+        ReviewSignature.objects.filter(review_post_id=review_id).delete()
+        return
+    ReviewSignature.objects.update_or_create(
+        review_post_id=review_id,
+        defaults={
+            'signature': sig,
+            'duplicate_of_id': match[0] if match else None,
+            'similarity': match[1] if match else None,
+        },
+    )
+    if match is None:
+        SignatureBucket.objects.bulk_create(
+            SignatureBucket(key=key, review_post_id=review_id)
+            for key in band_keys(sig)
+        )
+
+
+@transaction.atomic
+def index_batch(rows):
+    """Index (review id, body) pairs in bulk, flagging but never rejecting.
+
+    Candidates for the whole batch come from one bucket query, and each
+    review is also compared with the earlier ones of the batch, so a batch
+    costs a fixed number of queries. Returns the number flagged.
+    """
+    signatures = {}
+    for review_id, text in rows:
+        sig = signature(text)
+        if sig is not None:
+            signatures[review_id] = sig
+    if not signatures:
+        return 0
+    keys = {
+        review_id: band_keys(sig) for review_id, sig in signatures.items()
+    }
+    existing = _candidates(
+        [key for band in keys.values() for key in band], signatures,
+        limit=MAX_CANDIDATES * len(signatures),
+    )
+    by_key = {}
+    for review_id, other in existing.items():
+        for key in band_keys(bytes(other)):
+            by_key.setdefault(key, {})[review_id] = other
+
+    flagged = 0
+    results = []
+    for review_id in sorted(signatures):
+        sig = signatures[review_id]
+        candidates = {}
+        for key in keys[review_id]:
+            candidates.update(by_key.get(key, {}))
+        match = best_match(sig, candidates)
+        results.append(ReviewSignature(
+            review_post_id=review_id,
+            signature=sig,
+            duplicate_of_id=match[0] if match else None,
+            similarity=match[1] if match else None,
+        ))
+        if match is not None:
+            flagged += 1
+            del keys[review_id]
+            continue
+        for key in keys[review_id]:
+            by_key.setdefault(key, {})[review_id] = sig
+
+    SignatureBucket.objects.filter(review_post_id__in=signatures).delete()
+    ReviewSignature.objects.filter(review_post_id__in=signatures).delete()
+    ReviewSignature.objects.bulk_create(results)
+    SignatureBucket.objects.bulk_create(
+        SignatureBucket(key=key, review_post_id=review_id)
+        for review_id, band in keys.items()
+        for key in band
+    )
+    return flagged
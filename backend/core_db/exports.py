@@ -0,0 +1,156 @@
+"""
+Streaming exports of reviews and the book catalog.
+
+Rows are read through server-side cursors and handed on one batch at a
+time, so memory stays flat no matter how many rows are exported. Genres
+are fetched with one query per batch instead of one per book.
+"""
+import csv
+import json
+import zlib
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book, ReviewPost
+
+REVIEW_FIELDS = [
+    'id', 'slug', 'review_title', 'rating', 'review_date',
+    'review_content', 'reviewer_id', 'reviewer_slug', 'book_id',
+    'book_slug', 'book_title', 'book_author', 'book_genres',
+]
+BOOK_FIELDS = ['id', 'slug', 'title', 'author', 'genres']
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items from the iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def genre_names_by_book(book_ids):
+    """Map each book id to its genre names with a single query."""
+    names = {}
+    links = Book.genres.through.objects.filter(
+        book_id__in=set(book_ids),
+    ).values_list('book_id', 'genre__name')
+    for book_id, name in links:
+        names.setdefault(book_id, []).append(name)
+    return names
+
+
+def review_rows(queryset=None, chunk_size=2000):
+    """Yield one dict per review, joined with its reviewer and book."""
+    if queryset is None:
+        queryset = ReviewPost.objects.all()
+    queryset = queryset.select_related('reviewer', 'book').defer(None)
+    queryset = queryset.order_by('pk')
+
+    for batch in batched(queryset.iterator(chunk_size=chunk_size),
+                         chunk_size):
+        genres = genre_names_by_book(review.book_id for review in batch)
+        for review in batch:
+            yield {
+                'id': review.pk,
+                'slug': review.slug,
+                'review_title': review.review_title,
+                'rating': review.rating,
+                'review_date': review.review_date,
+                'review_content': review.review_content,
+                'reviewer_id': review.reviewer_id,
+                'reviewer_slug': review.reviewer.slug,
+                'book_id': review.book_id,
+                'book_slug': review.book.slug,
+                'book_title': review.book.title,
+                'book_author': review.book.author,
+                'book_genres': genres.get(review.book_id, []),
+            }
+
+
+def book_rows(queryset=None, chunk_size=2000):
+    """Yield one dict per book with its genre names."""
+    if queryset is None:
+        queryset = Book.objects.all()
+    queryset = queryset.order_by('pk')
+
+    for batch in batched(queryset.iterator(chunk_size=chunk_size),
+                         chunk_size):
+        genres = genre_names_by_book(book.pk for book in batch)
+        for book in batch:
+            yield {
+                'id': book.pk,
+                'slug': book.slug,
+                'title': book.title,
+                'author': book.author,
+                'genres': genres.get(book.pk, []),
+            }
+
+
+class _Echo:
+    """File-like object whose write() hands back what it was given."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            '|'.join(value) if isinstance(value, list) else value
+            for value in (row[field] for field in fields)
+        ])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def buffered(lines, size=64 * 1024):
+    """Join lines into pieces of roughly `size` characters."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzipped(chunks):
+    """Compress a stream of text chunks into a gzip byte stream."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(rows, fields, fmt='csv', compress=False):
+    """Encode rows as CSV or JSON Lines, optionally gzip compressed."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    lines = csv_lines(rows, fields) if fmt == 'csv' else jsonl_lines(rows)
+    chunks = buffered(lines)
+    return gzipped(chunks) if compress else chunks
+
+
+DATASETS = {
+    'reviews': (review_rows, REVIEW_FIELDS),
+    'books': (book_rows, BOOK_FIELDS),
+}
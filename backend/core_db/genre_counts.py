@@ -0,0 +1,44 @@
+"""
+Genre review counts, refreshed in batches off the review write path.
+
+A genre's review_count sums the review_count of its books. Adding the
+change of every review write to each of the book's genres would send the
+reviews of a whole genre through one row, so review writes only update
+their book and call schedule_refresh(). That queues one refresh task per
+GENRE_COUNT_INTERVAL seconds, which recomputes the genres in chunks and
+writes only those whose counts are off. Genre.review_count therefore lags
+the reviews by up to GENRE_COUNT_INTERVAL seconds.
+
+Book counts change with the links, which are few and written one at a
+time, so the BookGenre signal handlers adjust those straight away.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import tasks
+from .bulk_actions import get_chunk_size, iter_pk_chunks
+from .models import Genre
+
+
+def schedule_refresh():
+    """Queue the refresh of the current interval, unless it is queued."""
+    size = settings.GENRE_COUNT_INTERVAL
+    epoch = int(timezone.now().timestamp()) // size * size
+    start = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+    due = start + timedelta(seconds=size)
+    return tasks.enqueue(
+        'refresh_genre_counts',
+        idempotency_key=f'genre-counts:{start.isoformat()}',
+        delay=max(due - timezone.now(), timedelta()),
+    )
+
+
+@tasks.task('refresh_genre_counts')
+def refresh_genre_counts(chunk_size=None):
+    """Recompute the counts of every genre, a chunk at a time."""
+    refreshed = 0
+    for pks in iter_pk_chunks(Genre.objects, chunk_size or get_chunk_size()):
+        refreshed += Genre.objects.refresh_counts(pks)
+    return refreshed
@@ -0,0 +1,55 @@
+"""
+Shared implementation of the export_* commands.
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core_db import exports
+
+
+class ExportCommand(BaseCommand):
+    """Stream one exports.DATASETS entry to a file or stdout."""
+    dataset = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=exports.FORMATS, default='csv',
+            dest='fmt',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Compress the output with gzip.',
+        )
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='File to write to, "-" for stdout.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rows, fields = exports.DATASETS[self.dataset]
+        stream = exports.export_stream(
+            rows(chunk_size=options['chunk_size']),
+            fields,
+            fmt=options['fmt'],
+            compress=options['gzip'],
+        )
+
+        if options['output'] == '-':
+            if options['gzip']:
+                for chunk in stream:
+                    sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.flush()
+            else:
+                for chunk in stream:
+                    self.stdout.write(chunk, ending='')
+            return
+
+        mode = 'wb' if options['gzip'] else 'w'
+        encoding = None if options['gzip'] else 'utf-8'
+        with open(options['output'], mode, encoding=encoding) as output:
+            for chunk in stream:
+                output.write(chunk)
+        self.stderr.write(f'Exported {self.dataset} to {options["output"]}')
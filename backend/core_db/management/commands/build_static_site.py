@@ -0,0 +1,43 @@
+"""
+Django command to render the static book and review pages.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core_db import static_site
+
+
+class Command(BaseCommand):
+    """Render every page, or only those changed since the last build."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Processes rendering a full build in parallel.',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only re-render pages touched by changes since the last '
+                 'build.',
+        )
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='With --incremental, keep polling for new changes.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if not options['incremental']:
+            pages = static_site.build_all(options['processes'])
+            self.stdout.write(f'Rendered {pages} pages.')
+            return
+        while True:
+            count = static_site.build_changes()
+            if count:
+                self.stdout.write(f'Applied {count} changes.')
+            if not options['follow']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,10 @@
+"""
+Django command to export the book catalog as CSV or JSON Lines.
+"""
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    """Export books with their genres."""
+    help = 'Stream all books to CSV or JSON Lines.'
+    dataset = 'books'
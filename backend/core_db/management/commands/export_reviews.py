@@ -0,0 +1,10 @@
+"""
+Django command to export every review as CSV or JSON Lines.
+"""
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    """Export reviews joined with their reviewer, book and genres."""
+    help = 'Stream all reviews to CSV or JSON Lines.'
+    dataset = 'reviews'
@@ -0,0 +1,43 @@
+"""
+Django command to index existing reviews for near-duplicate checks.
+"""
+from django.core.management.base import BaseCommand
+
+from core_db import duplicates
+from core_db.models import ReviewPost, ReviewSignature
+
+
+class Command(BaseCommand):
+    """Compute MinHash signatures of reviews in batches, in id order."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-index reviews that already have a signature.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        reviews = ReviewPost.objects.order_by('pk')
+        if not options['all']:
+            reviews = reviews.exclude(
+                pk__in=ReviewSignature.objects.values('review_post_id'),
+            )
+        indexed = flagged = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                reviews.filter(pk__gt=last_pk)
+                .values_list('pk', 'review_content')[:options['batch_size']]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            flagged += duplicates.index_batch(rows)
+            indexed += len(rows)
+            self.stdout.write(f'Indexed {indexed} reviews...')
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} reviews, {flagged} flagged as '
+            f'near-duplicates.'
+        ))
@@ -0,0 +1,58 @@
+"""
+Django command to flag migrations that would lock large tables.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.migrations.loader import MigrationLoader
+
+from core_db.migration_lint import MIGRATION_LINT_BASELINE, lint_migration
+
+
+class Command(BaseCommand):
+    """Report unsafe operations in the project's migrations."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='*',
+            help='Apps to check; defaults to the apps of this project.',
+        )
+        parser.add_argument(
+            '--include-baseline', action='store_true',
+            help='Also check migrations in MIGRATION_LINT_BASELINE.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        app_labels = options['app_label'] or [
+            config.label for config in apps.get_app_configs()
+            if config.path.startswith(str(settings.BASE_DIR))
+        ]
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+
+        problems = []
+        checked = 0
+        for key in sorted(loader.disk_migrations):
+            app_label, name = key
+            if app_label not in app_labels:
+                continue
+            label = f'{app_label}.{name}'
+            if (label in MIGRATION_LINT_BASELINE
+                    and not options['include_baseline']):
+                continue
+            checked += 1
+            state = loader.project_state(key, at_end=False)
+            problems += lint_migration(loader.disk_migrations[key], state)
+
+        for problem in problems:
+            self.stderr.write(
+                f'{problem.migration}: {problem.operation}\n'
+                f'    {problem.message}'
+            )
+        if problems:
+            raise CommandError(
+                f'{len(problems)} unsafe operations in {checked} migrations.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} migrations checked, no unsafe operations.'
+        ))
@@ -0,0 +1,52 @@
+"""
+Django command to maintain time-partitioned tables.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core_db import partitions
+
+
+class Command(BaseCommand):
+    """Create upcoming partitions and detach or drop expired ones."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', dest='tables',
+            help='Only maintain this table (repeatable).',
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Number of future partitions to keep created.',
+        )
+        parser.add_argument(
+            '--retain', type=int, default=None,
+            help='Detach partitions older than this many intervals.',
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Drop detached partitions instead of keeping them.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        tables = options['tables'] or list(partitions.PARTITIONED_TABLES)
+        unknown = set(tables) - set(partitions.PARTITIONED_TABLES)
+        if unknown:
+            raise CommandError(
+                f'Not a partitioned table: {", ".join(sorted(unknown))}'
+            )
+
+        for table in tables:
+            for name in partitions.ensure_partitions(table, options['ahead']):
+                self.stdout.write(f'Created partition {name}')
+
+            if options['retain'] is None:
+                continue
+            detached = partitions.detach_old_partitions(
+                table, options['retain'], drop=options['drop'],
+            )
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            for name in detached:
+                self.stdout.write(f'{verb} partition {name}')
+
+        self.stdout.write(self.style.SUCCESS('Partitions up to date.'))
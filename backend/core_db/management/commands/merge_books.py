@@ -0,0 +1,53 @@
+"""
+Django command to find and merge duplicate books.
+"""
+from django.core.management.base import BaseCommand
+
+from core_db import dedup
+from core_db.models import Book
+
+
+class Command(BaseCommand):
+    """Merge books whose normalized title and author (nearly) match."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Merge the groups found instead of only listing them.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.9,
+            help='Minimum similarity (0-1) of two dedup keys.',
+        )
+        parser.add_argument(
+            '--max-block-size', type=int, default=dedup.MAX_BLOCK_SIZE,
+            help='Compare each book with at most this many others of the '
+                 'same title or author.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        groups = dedup.find_duplicate_groups(
+            options['threshold'], options['max_block_size'],
+        )
+        merged = 0
+        for group in groups:
+            canonical = dedup.pick_canonical(group)
+            duplicates = [pk for pk in group if pk != canonical]
+            titles = dict(
+                Book.objects.filter(pk__in=group).values_list('pk', 'slug')
+            )
+            self.stdout.write(
+                f'{titles[canonical]} <- '
+                + ', '.join(titles[pk] for pk in duplicates)
+            )
+            if options['apply']:
+                moved, dropped = dedup.merge_books(canonical, duplicates)
+                self.stdout.write(
+                    f'  moved {moved} reviews, deleted {dropped} '
+                    'superseded reviews'
+                )
+            merged += len(duplicates)
+
+        verb = 'Merged' if options['apply'] else 'Found'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {merged} duplicates.'))
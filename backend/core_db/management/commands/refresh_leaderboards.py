@@ -0,0 +1,31 @@
+"""
+Django command to refresh the materialized leaderboards.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core_db.models import AuthorLeaderboard, GenreLeaderboard
+
+LEADERBOARDS = (GenreLeaderboard, AuthorLeaderboard)
+
+
+class Command(BaseCommand):
+    """Refresh the genre and author leaderboard views."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking', action='store_true',
+            help='Refresh without CONCURRENTLY (locks out readers).',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        # CONCURRENTLY keeps the views readable while they are rebuilt; it
+        # needs the unique index each view is created with.
+        mode = '' if options['blocking'] else ' CONCURRENTLY'
+        with connection.cursor() as cursor:
+            for model in LEADERBOARDS:
+                table = model._meta.db_table
+                cursor.execute(f'REFRESH MATERIALIZED VIEW{mode} {table}')
+                self.stdout.write(f'Refreshed {table}')
+        self.stdout.write(self.style.SUCCESS('Leaderboards refreshed.'))
@@ -0,0 +1,84 @@
+"""
+Django command to run background task workers.
+"""
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core_db import tasks
+
+
+def _work(options):
+    return tasks.work(
+        burst=options['burst'],
+        poll_interval=options['poll_interval'],
+        max_tasks=options['max_tasks'],
+    )
+
+
+def _work_in_child(options, results):
+    try:
+        results.put(_work(options))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Claim and run queued tasks in one or more worker processes."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Number of worker processes; 1 runs in this process.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no task is due.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--max-tasks', type=int, default=None,
+            help='Exit after each worker has run this many tasks.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        started = time.monotonic()
+        if options['processes'] <= 1:
+            processed = _work(options)
+        else:
+            processed = self.run_processes(options)
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {processed} tasks in {elapsed:.1f}s ({rate:.1f}/s).'
+        ))
+
+    def run_processes(self, options):
+        # Forked children must not share the parent's connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=_work_in_child, args=(options, results),
+            )
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            raise
+
+        processed = 0
+        while not results.empty():
+            processed += results.get()
+        return processed
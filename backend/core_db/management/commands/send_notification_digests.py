@@ -0,0 +1,21 @@
+"""
+Django command to email notification digests.
+"""
+from django.core.management.base import BaseCommand
+
+from core_db import notifications
+
+
+class Command(BaseCommand):
+    """Send each user one email listing their new notifications."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Users per SMTP connection.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        sent = notifications.send_digests(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digests.'))
@@ -0,0 +1,79 @@
+"""
+Django command to follow the change stream of core_db writes.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core_db import changes
+
+
+class Command(BaseCommand):
+    """Print changes as JSON lines, from a position or a consumer's."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer',
+            help='Resume from, and advance, this consumer\'s position.',
+        )
+        parser.add_argument(
+            '--after', default='0:0',
+            help='Position "txid:id" to start after, without a consumer.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help='Only print changes of this model; may be repeated.',
+        )
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='Keep polling for new changes.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Delete changes past CHANGE_RETENTION and exit.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['prune']:
+            deleted = changes.prune()
+            self.stdout.write(f'Pruned {deleted} changes.')
+            return
+
+        try:
+            position = changes.parse_position(options['after'])
+        except ValueError:
+            raise CommandError('--after must look like "txid:id".')
+        models = set(options['models'] or [])
+
+        def write(batch):
+            for change in batch:
+                if models and change.model not in models:
+                    continue
+                self.stdout.write(json.dumps({
+                    'position': changes.format_position(change.position),
+                    'model': change.model,
+                    'op': change.op,
+                    'id': change.row_id,
+                    'at': change.created_at.isoformat(),
+                }))
+
+        while True:
+            if options['consumer']:
+                count = changes.consume(
+                    options['consumer'], write, options['batch_size'],
+                )
+            else:
+                batch = changes.read(position, options['batch_size'])
+                write(batch)
+                if batch:
+                    position = batch[-1].position
+                count = len(batch)
+            if count:
+                continue
+            if not options['follow']:
+                return
+            time.sleep(options['poll_interval'])
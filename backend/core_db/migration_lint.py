@@ -0,0 +1,173 @@
+"""
+Checks that flag migration operations which lock large tables.
+
+lint_migration() returns a Problem for every operation that would hold
+an ACCESS EXCLUSIVE or SHARE lock while scanning or rewriting an existing
+table, and names the core_db.migration_ops operation to use instead.
+Operations on tables created earlier in the same migration are fine,
+since nothing else can be using them yet.
+
+Migrations written before these checks existed are listed in
+MIGRATION_LINT_BASELINE and skipped.
+"""
+import re
+from collections import namedtuple
+
+from django.db import migrations
+from django.db.models import CheckConstraint, ForeignKey, UniqueConstraint
+
+from . import migration_ops
+
+Problem = namedtuple('Problem', ['migration', 'operation', 'message'])
+
+CREATE_INDEX = re.compile(
+    r'\bCREATE\s+(UNIQUE\s+)?INDEX\b(?!\s+CONCURRENTLY)', re.IGNORECASE,
+)
+ADD_CONSTRAINT = re.compile(
+    r'\bADD\s+CONSTRAINT\b(?![^;]*\b(NOT\s+VALID|USING\s+INDEX)\b)',
+    re.IGNORECASE,
+)
+# Written before these checks and already applied everywhere.
+MIGRATION_LINT_BASELINE = frozenset([
+    'core_db.0001_initial',
+    'core_db.0002_auto_20251216_1727',
+    'core_db.0003_alter_reviewpost_book',
+    'core_db.0004_user_image_url',
+    'core_db.0005_genre_is_approved',
+    'core_db.0006_auto_20260126_1723',
+])
+
+# Field options that never reach the database schema. Django keeps
+# column defaults in Python, so `default` is one of them.
+NON_SCHEMA_ATTRS = (
+    'blank', 'choices', 'default', 'editable', 'error_messages',
+    'help_text', 'limit_choices_to', 'on_delete', 'related_name',
+    'related_query_name', 'upload_to', 'validators', 'verbose_name',
+)
+
+SAFE_OPERATIONS = (
+    migration_ops.AddConstraintNotValid,
+    migration_ops.AddIndexConcurrently,
+    migration_ops.AddUniqueConstraintConcurrently,
+    migration_ops.BatchedBackfill,
+    migration_ops.RemoveIndexConcurrently,
+    migration_ops.ValidateConstraint,
+)
+
+
+def _sql_text(sql):
+    if isinstance(sql, (list, tuple)):
+        return ';'.join(
+            item[0] if isinstance(item, (list, tuple)) else item
+            for item in sql
+        )
+    return sql or ''
+
+
+def _alters_schema(operation, state, app_label):
+    """Whether an AlterField changes the column rather than Python only."""
+    if state is None:
+        return True
+    model_state = state.models.get((app_label, operation.model_name_lower))
+    if model_state is None or operation.name not in model_state.fields:
+        return True
+    _, old_path, old_args, old_kwargs = (
+        model_state.fields[operation.name].deconstruct()
+    )
+    _, new_path, new_args, new_kwargs = operation.field.deconstruct()
+    for attr in NON_SCHEMA_ATTRS:
+        old_kwargs.pop(attr, None)
+        new_kwargs.pop(attr, None)
+    return (old_path, old_args, old_kwargs) != (new_path, new_args, new_kwargs)
+
+
+def check_operation(operation, created, atomic, state=None, app_label=None):
+    """Return the reason `operation` is unsafe, or None.
+
+    `created` holds the lowercased names of models created earlier in the
+    same migration and `state` is the project state just before the
+    operation, if known.
+    """
+    if isinstance(operation, SAFE_OPERATIONS):
+        return None
+    model_name = getattr(operation, 'model_name', None)
+    if model_name is not None and model_name.lower() in created:
+        return None
+
+    if isinstance(operation, migrations.AddIndex):
+        return 'AddIndex blocks writes; use AddIndexConcurrently.'
+    if isinstance(operation, migrations.AddConstraint):
+        if isinstance(operation.constraint, UniqueConstraint):
+            return (
+                'AddConstraint scans the table under lock; use '
+                'AddUniqueConstraintConcurrently.'
+            )
+        if isinstance(operation.constraint, CheckConstraint):
+            return (
+                'AddConstraint scans the table under lock; use '
+                'AddConstraintNotValid and ValidateConstraint.'
+            )
+    if isinstance(operation, migrations.AlterUniqueTogether):
+        return (
+            'unique_together is added under lock; use a UniqueConstraint '
+            'with AddUniqueConstraintConcurrently.'
+        )
+    if isinstance(operation, migrations.AlterIndexTogether):
+        return 'index_together blocks writes; use AddIndexConcurrently.'
+    if isinstance(operation, migrations.AddField):
+        field = operation.field
+        if isinstance(field, ForeignKey) and field.db_constraint:
+            return (
+                'AddField with a foreign key validates it under lock; add it '
+                'with db_constraint=False, then AddConstraintNotValid.'
+            )
+        if field.db_index or field.unique:
+            return (
+                'AddField builds its index under lock; add the field '
+                'without db_index/unique and use AddIndexConcurrently.'
+            )
+    if isinstance(operation, migrations.AlterField) and _alters_schema(
+        operation, state, app_label,
+    ):
+        return (
+            'AlterField may rewrite the table or rebuild indexes under '
+            'lock; add a new field and backfill it instead.'
+        )
+    if isinstance(operation, migrations.RunSQL):
+        sql = _sql_text(operation.sql)
+        if CREATE_INDEX.search(sql):
+            return 'RunSQL creates an index without CONCURRENTLY.'
+        if ADD_CONSTRAINT.search(sql):
+            return 'RunSQL adds a constraint without NOT VALID.'
+    if isinstance(operation, migrations.RunPython) and atomic:
+        return (
+            'RunPython in an atomic migration holds its locks until the '
+            'end; use BatchedBackfill or set atomic = False.'
+        )
+    return None
+
+
+def lint_migration(migration, state=None):
+    """Return the Problems of one migration.
+
+    `state` is the project state before the migration; without it every
+    AlterField is reported.
+    """
+    problems = []
+    created = set()
+    label = f'{migration.app_label}.{migration.name}'
+    for operation in migration.operations:
+        if isinstance(operation, migrations.CreateModel):
+            created.add(operation.name.lower())
+        else:
+            message = check_operation(
+                operation, created, migration.atomic, state,
+                migration.app_label,
+            )
+            if message:
+                problems.append(
+                    Problem(label, operation.describe(), message),
+                )
+        if state is not None:
+            operation.state_forwards(migration.app_label, state)
+    return problems
@@ -0,0 +1,292 @@
+"""
+Migration operations that keep large tables writable while they run.
+
+Plain AddIndex, AddConstraint and foreign key AddField take an ACCESS
+EXCLUSIVE (or SHARE) lock and scan the whole table inside it. The
+operations here split that work so the long part runs without blocking
+writes:
+
+* AddIndexConcurrently builds the index with CREATE INDEX CONCURRENTLY.
+* AddUniqueConstraintConcurrently builds a unique index concurrently and
+  then attaches it as the constraint, which is instant.
+* AddConstraintNotValid adds a check or foreign key constraint as NOT
+  VALID, so it only applies to new writes, and ValidateConstraint checks
+  the existing rows later under a lock that still allows writes.
+* BatchedBackfill updates existing rows in short transactions, pausing
+  between batches so replicas and autovacuum keep up.
+
+Every operation except the constraint pair must run in a migration with
+atomic = False. See core_db/migration_lint.py for the check that new
+migrations use them.
+"""
+import time
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    NotInTransactionMixin,
+    RemoveIndexConcurrently,
+)
+from django.db import transaction
+from django.db.migrations.operations import AddConstraint
+from django.db.migrations.operations.base import Operation
+from django.db.models import ForeignKey
+
+__all__ = [
+    'AddConstraintNotValid',
+    'AddIndexConcurrently',
+    'AddUniqueConstraintConcurrently',
+    'BatchedBackfill',
+    'RemoveIndexConcurrently',
+    'ValidateConstraint',
+]
+
+
+class AddUniqueConstraintConcurrently(NotInTransactionMixin, AddConstraint):
+    """Add a UniqueConstraint backed by a concurrently built index."""
+    atomic = False
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        quote = schema_editor.quote_name
+        table = quote(model._meta.db_table)
+        name = quote(self.constraint.name)
+        columns = ', '.join(
+            quote(model._meta.get_field(field).column)
+            for field in self.constraint.fields
+        )
+        condition = ''
+        if self.constraint.condition is not None:
+            condition = ' WHERE ' + self.constraint._get_condition_sql(
+                model, schema_editor,
+            )
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} ({columns}){condition}'
+        )
+        if condition:
+            # Partial unique indexes cannot back a table constraint.
+            return
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} '
+            f'UNIQUE USING INDEX {name}'
+        )
+
+    def describe(self):
+        return (
+            f'Concurrently create constraint {self.constraint.name} on '
+            f'model {self.model_name}'
+        )
+
+
+class AddConstraintNotValid(AddConstraint):
+    """Add a check constraint, or the FK of `field`, without validating.
+
+    For a foreign key, add the field with db_constraint=False first, then
+    pass its name as `field` instead of a constraint.
+    """
+
+    def __init__(self, model_name, constraint=None, field=None, name=None):
+        if (constraint is None) == (field is None):
+            raise ValueError('Pass exactly one of constraint and field.')
+        self.field = field
+        self.fk_name = name
+        super().__init__(model_name, constraint)
+
+    def deconstruct(self):
+        kwargs = {'model_name': self.model_name}
+        if self.constraint is not None:
+            kwargs['constraint'] = self.constraint
+        else:
+            kwargs['field'] = self.field
+            kwargs['name'] = self.fk_name
+        return self.__class__.__name__, [], kwargs
+
+    @property
+    def constraint_name(self):
+        if self.constraint is not None:
+            return self.constraint.name
+        return self.fk_name or f'{self.model_name}_{self.field}_fk'
+
+    def state_forwards(self, app_label, state):
+        # The foreign key field already carries its state.
+        if self.constraint is not None:
+            super().state_forwards(app_label, state)
+
+    def state_backwards(self, app_label, state):
+        if self.constraint is not None:
+            super().state_backwards(app_label, state)
+
+    def _sql(self, model, schema_editor):
+        if self.constraint is not None:
+            check = self.constraint._get_check_sql(model, schema_editor)
+            return f'CHECK ({check})'
+        field = model._meta.get_field(self.field)
+        if not isinstance(field, ForeignKey):
+            raise ValueError(f'{self.field} is not a foreign key.')
+        target = field.target_field
+        quote = schema_editor.quote_name
+        return (
+            f'FOREIGN KEY ({quote(field.column)}) REFERENCES '
+            f'{quote(target.model._meta.db_table)} ({quote(target.column)}) '
+            f'DEFERRABLE INITIALLY DEFERRED'
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'ALTER TABLE {quote(model._meta.db_table)} ADD CONSTRAINT '
+            f'{quote(self.constraint_name)} '
+            f'{self._sql(model, schema_editor)} NOT VALID'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'ALTER TABLE {quote(model._meta.db_table)} DROP CONSTRAINT '
+            f'{quote(self.constraint_name)}'
+        )
+
+    def describe(self):
+        return (
+            f'Create constraint {self.constraint_name} on model '
+            f'{self.model_name} without validating existing rows'
+        )
+
+    @property
+    def migration_name_fragment(self):
+        return f'{self.model_name.lower()}_{self.constraint_name.lower()}'
+
+
+class ValidateConstraint(Operation):
+    """Check existing rows against a NOT VALID constraint.
+
+    Holds SHARE UPDATE EXCLUSIVE, which lets reads and writes carry on.
+    """
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, model_name, name):
+        self.model_name = model_name
+        self.name = name
+
+    def deconstruct(self):
+        return self.__class__.__name__, [], {
+            'model_name': self.model_name, 'name': self.name,
+        }
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'ALTER TABLE {quote(model._meta.db_table)} '
+            f'VALIDATE CONSTRAINT {quote(self.name)}'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        pass
+
+    def describe(self):
+        return f'Validate constraint {self.name} on model {self.model_name}'
+
+
+class BatchedBackfill(NotInTransactionMixin, Operation):
+    """Set columns of existing rows in batches of `batch_size` pks.
+
+    `values` maps field names to values or expressions, as for
+    QuerySet.update(). Only rows matching `where` (a Q object) are
+    touched, and each batch commits on its own, `pause` seconds apart.
+    """
+    reduces_to_sql = False
+    reversible = True
+    atomic = False
+
+    def __init__(self, model_name, values, where=None, batch_size=1000,
+                 pause=0.1):
+        self.model_name = model_name
+        self.values = values
+        self.where = where
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def deconstruct(self):
+        kwargs = {'model_name': self.model_name, 'values': self.values}
+        if self.where is not None:
+            kwargs['where'] = self.where
+        if self.batch_size != 1000:
+            kwargs['batch_size'] = self.batch_size
+        if self.pause != 0.1:
+            kwargs['pause'] = self.pause
+        return self.__class__.__name__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        queryset = model._base_manager.using(schema_editor.connection.alias)
+        if self.where is not None:
+            queryset = queryset.filter(self.where)
+        backfill(queryset, self.values, self.batch_size, self.pause)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        pass
+
+    def describe(self):
+        return (
+            f'Backfill {", ".join(self.values)} of model {self.model_name} '
+            f'in batches of {self.batch_size}'
+        )
+
+
+def backfill(queryset, values, batch_size=1000, pause=0.1):
+    """Update the queryset's rows in pk order, one batch per transaction.
+
+    Also usable from RunPython in a non-atomic migration. Returns the
+    number of rows updated.
+    """
+    queryset = queryset.order_by('pk')
+    updated = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk,
+        )
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return updated
+        with transaction.atomic(using=queryset.db):
+            updated += queryset.model._base_manager.using(
+                queryset.db,
+            ).filter(pk__in=pks).update(**values)
+        last_pk = pks[-1]
+        if pause:
+            time.sleep(pause)
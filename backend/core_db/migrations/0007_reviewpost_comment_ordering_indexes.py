@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 03:58
+
+from django.db import migrations, models
+
+from core_db.migration_ops import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0006_auto_20260126_1723'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reviewpost',
+            index=models.Index(fields=['review_date', 'id'], name='reviewpost_date_id_idx'),
+        ),
+    ]
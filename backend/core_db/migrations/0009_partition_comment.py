@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from core_db.partitions import partition_table, unpartition_table
+
+
+def partition_comments(apps, schema_editor):
+    partition_table(schema_editor, 'core_db_comment')
+
+
+def unpartition_comments(apps, schema_editor):
+    unpartition_table(schema_editor, 'core_db_comment')
+
+
+class Migration(migrations.Migration):
+
+    # partition_table() copies the rows in batches of their own.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0008_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_comments, unpartition_comments),
+    ]
@@ -0,0 +1,123 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+GENRE_LEADERBOARD_SQL = [
+    """
+    CREATE MATERIALIZED VIEW core_db_genreleaderboard AS
+    SELECT
+        row_number() OVER (ORDER BY bg.genre_id, bg.book_id) AS id,
+        bg.genre_id,
+        bg.book_id,
+        COUNT(r.id) AS review_count,
+        AVG(r.rating)::double precision AS average_rating,
+        COUNT(r.id) FILTER (
+            WHERE r.review_date >= now() - interval '30 days'
+        ) AS recent_review_count,
+        MAX(r.review_date) AS last_reviewed_at
+    FROM core_db_book_genres bg
+    JOIN core_db_reviewpost r ON r.book_id = bg.book_id
+    GROUP BY bg.genre_id, bg.book_id
+    """,
+    """
+    CREATE UNIQUE INDEX CONCURRENTLY genreleaderboard_genre_book_uniq
+        ON core_db_genreleaderboard (genre_id, book_id)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY genreleaderboard_rating_idx
+        ON core_db_genreleaderboard (genre_id, average_rating DESC, review_count DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY genreleaderboard_count_idx
+        ON core_db_genreleaderboard (genre_id, review_count DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY genreleaderboard_recent_idx
+        ON core_db_genreleaderboard (genre_id, recent_review_count DESC)
+    """,
+]
+
+AUTHOR_LEADERBOARD_SQL = [
+    """
+    CREATE MATERIALIZED VIEW core_db_authorleaderboard AS
+    SELECT
+        b.author,
+        COUNT(DISTINCT b.id) AS book_count,
+        COUNT(r.id) AS review_count,
+        AVG(r.rating)::double precision AS average_rating,
+        COUNT(r.id) FILTER (
+            WHERE r.review_date >= now() - interval '30 days'
+        ) AS recent_review_count,
+        MAX(r.review_date) AS last_reviewed_at
+    FROM core_db_book b
+    JOIN core_db_reviewpost r ON r.book_id = b.id
+    GROUP BY b.author
+    """,
+    """
+    CREATE UNIQUE INDEX CONCURRENTLY authorleaderboard_author_uniq
+        ON core_db_authorleaderboard (author)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY authorleaderboard_rating_idx
+        ON core_db_authorleaderboard (average_rating DESC, review_count DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY authorleaderboard_count_idx
+        ON core_db_authorleaderboard (review_count DESC)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY authorleaderboard_recent_idx
+        ON core_db_authorleaderboard (recent_review_count DESC)
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    # Each index is built CONCURRENTLY, in a statement of its own.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0009_partition_comment'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            GENRE_LEADERBOARD_SQL,
+            'DROP MATERIALIZED VIEW core_db_genreleaderboard;',
+        ),
+        migrations.RunSQL(
+            AUTHOR_LEADERBOARD_SQL,
+            'DROP MATERIALIZED VIEW core_db_authorleaderboard;',
+        ),
+        migrations.CreateModel(
+            name='AuthorLeaderboard',
+            fields=[
+                ('author', models.CharField(max_length=150, primary_key=True, serialize=False)),
+                ('book_count', models.PositiveIntegerField()),
+                ('review_count', models.PositiveIntegerField()),
+                ('average_rating', models.FloatField()),
+                ('recent_review_count', models.PositiveIntegerField()),
+                ('last_reviewed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'core_db_authorleaderboard',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='GenreLeaderboard',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('review_count', models.PositiveIntegerField()),
+                ('average_rating', models.FloatField()),
+                ('recent_review_count', models.PositiveIntegerField()),
+                ('last_reviewed_at', models.DateTimeField()),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core_db.book')),
+                ('genre', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core_db.genre')),
+            ],
+            options={
+                'db_table': 'core_db_genreleaderboard',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+from core_db.migration_ops import AddIndexConcurrently
+from core_db.normalization import book_dedup_key
+
+
+def fill_dedup_keys(apps, schema_editor):
+    Book = apps.get_model('core_db', 'Book')
+    batch_size = 1000
+    last_pk = 0
+    while True:
+        books = list(
+            Book.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+        )
+        if not books:
+            return
+        for book in books:
+            book.dedup_key = book_dedup_key(book.title, book.author)
+        Book.objects.bulk_update(books, ['dedup_key'])
+        last_pk = books[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # bulk_update() commits each batch of fill_dedup_keys() on its own.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0010_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='dedup_key',
+            field=models.CharField(default='', editable=False, max_length=407),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_dedup_keys, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(fields=['dedup_key'], name='book_dedup_key_idx'),
+        ),
+    ]
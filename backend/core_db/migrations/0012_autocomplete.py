@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core_db.migration_ops import backfill
+
+
+def count_reviews(apps, schema_editor):
+    Book = apps.get_model('core_db', 'Book')
+    ReviewPost = apps.get_model('core_db', 'ReviewPost')
+    totals = ReviewPost.objects.filter(book=OuterRef('pk')).order_by().values(
+        'book',
+    ).annotate(total=Count('pk')).values('total')
+    backfill(
+        Book.objects.using(schema_editor.connection.alias),
+        {'review_count': Coalesce(Subquery(totals), 0)},
+    )
+
+
+class Migration(migrations.Migration):
+
+    # The counts are backfilled a batch at a time and the indexes built
+    # CONCURRENTLY, neither of which can run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0011_book_dedup_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+        # Prefix (LIKE 'abc%') indexes for the autocomplete endpoint.
+        migrations.RunSQL(
+            [
+                """
+                CREATE INDEX CONCURRENTLY book_title_prefix_idx
+                    ON core_db_book (lower(title) text_pattern_ops)
+                """,
+                """
+                CREATE INDEX CONCURRENTLY book_author_prefix_idx
+                    ON core_db_book (lower(author) text_pattern_ops)
+                """,
+                """
+                CREATE INDEX CONCURRENTLY genre_name_prefix_idx
+                    ON core_db_genre (lower(name) text_pattern_ops)
+                """,
+            ],
+            [
+                'DROP INDEX CONCURRENTLY book_title_prefix_idx',
+                'DROP INDEX CONCURRENTLY book_author_prefix_idx',
+                'DROP INDEX CONCURRENTLY genre_name_prefix_idx',
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+from core_db.normalization import make_excerpt, reading_time
+
+
+def fill_excerpts(apps, schema_editor):
+    ReviewPost = apps.get_model('core_db', 'ReviewPost')
+    batch_size = 1000
+    last_pk = 0
+    while True:
+        reviews = list(
+            ReviewPost.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'review_content')[:batch_size]
+        )
+        if not reviews:
+            return
+        for review in reviews:
+            review.review_excerpt = make_excerpt(review.review_content)
+            review.content_length = len(review.review_content)
+            review.reading_time = reading_time(review.review_content)
+        ReviewPost.objects.bulk_update(
+            reviews, ['review_excerpt', 'content_length', 'reading_time'],
+        )
+        last_pk = reviews[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # bulk_update() commits each batch of fill_excerpts() on its own.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0015_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewpost',
+            name='review_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='reviewpost',
+            name='content_length',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reviewpost',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, help_text='Minutes'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_db', '0016_reviewpost_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewpost',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,97 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core_db.migration_ops import AddIndexConcurrently, backfill
+
+# Created for the auto-generated through table by 0001_initial; both are
+# covered by the leading column of a composite index once (genre, book)
+# exists.
+FK_INDEXES = [
+    ('core_db_book_genres_book_id_f53b9a74', 'book_id'),
+    ('core_db_book_genres_genre_id_ab4c4018', 'genre_id'),
+]
+
+
+def fill_genre_counts(apps, schema_editor):
+    Genre = apps.get_model('core_db', 'Genre')
+    BookGenre = apps.get_model('core_db', 'BookGenre')
+    links = BookGenre.objects.filter(genre=OuterRef('pk')).order_by()
+    links = links.values('genre')
+    backfill(Genre.objects.all(), {
+        'book_count': Coalesce(Subquery(
+            links.annotate(total=Count('pk')).values('total'),
+        ), 0),
+        'review_count': Coalesce(Subquery(
+            links.annotate(total=Sum('book__review_count')).values('total'),
+        ), 0),
+    }, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0017_soft_delete'),
+    ]
+
+    operations = [
+        # Book.genres keeps its table; only Django's view of it changes.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name='BookGenre',
+                fields=[
+                    ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                    ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core_db.book')),
+                    ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core_db.genre')),
+                ],
+                options={
+                    'db_table': 'core_db_book_genres',
+                    'unique_together': {('book', 'genre')},
+                },
+            ),
+            migrations.AlterField(
+                model_name='book',
+                name='genres',
+                field=models.ManyToManyField(blank=True, related_name='books', through='core_db.BookGenre', to='core_db.Genre'),
+            ),
+        ]),
+        AddIndexConcurrently(
+            model_name='bookgenre',
+            index=models.Index(fields=['genre', 'book'], name='bookgenre_genre_book_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'DROP INDEX CONCURRENTLY IF EXISTS {name}',
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                    f'ON core_db_book_genres ({column})',
+                )
+                for name, column in FK_INDEXES
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='bookgenre',
+                    name='book',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core_db.book'),
+                ),
+                migrations.AlterField(
+                    model_name='bookgenre',
+                    name='genre',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core_db.genre'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_genre_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_db', '0018_bookgenre'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignatureBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('review_post', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core_db.reviewpost')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReviewSignature',
+            fields=[
+                ('review_post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core_db.reviewpost')),
+                ('signature', models.BinaryField()),
+                ('similarity', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('duplicate_of', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core_db.reviewpost')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='signaturebucket',
+            index=models.Index(fields=['key', 'review_post'], name='signaturebucket_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signaturebucket',
+            index=models.Index(fields=['review_post'], name='signaturebucket_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsignature',
+            index=models.Index(condition=models.Q(('duplicate_of__isnull', False)), fields=['duplicate_of'], name='reviewsignature_flagged_idx'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 3.2.25 on 2026-10-19 04:45
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+RECORD_CHANGE_SQL = """
+CREATE FUNCTION core_db_record_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed_id bigint;
+BEGIN
+    -- TG_ARGV: model label, then optionally the column holding the id
+    -- and the operation to record instead of TG_OP.
+    IF TG_OP = 'DELETE' THEN
+        changed_id := (to_jsonb(OLD) ->> coalesce(TG_ARGV[1], 'id'))::bigint;
+    ELSE
+        changed_id := (to_jsonb(NEW) ->> coalesce(TG_ARGV[1], 'id'))::bigint;
+    END IF;
+    INSERT INTO core_db_change (txid, model, op, row_id, created_at)
+    VALUES (
+        txid_current(), TG_ARGV[0], coalesce(TG_ARGV[2], left(TG_OP, 1)),
+        changed_id, now()
+    );
+    RETURN NULL;
+END;
+$$;
+"""
+
+# (table, model label). Updates that change nothing are not recorded.
+TRACKED_TABLES = [
+    ('core_db_book', 'book'),
+    ('core_db_genre', 'genre'),
+    ('core_db_reviewpost', 'reviewpost'),
+    ('core_db_reaction', 'reaction'),
+    ('core_db_comment', 'comment'),
+]
+
+
+def trigger_sql():
+    statements = [RECORD_CHANGE_SQL]
+    for table, label in TRACKED_TABLES:
+        statements.append(
+            f"CREATE TRIGGER {table}_changes AFTER INSERT OR DELETE "
+            f"ON {table} FOR EACH ROW "
+            f"EXECUTE FUNCTION core_db_record_change('{label}')"
+        )
+        statements.append(
+            f"CREATE TRIGGER {table}_updates AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) "
+            f"EXECUTE FUNCTION core_db_record_change('{label}')"
+        )
+    # Adding or removing a genre is an update of the book.
+    statements.append(
+        "CREATE TRIGGER core_db_book_genres_changes AFTER INSERT OR DELETE "
+        "ON core_db_book_genres FOR EACH ROW "
+        "EXECUTE FUNCTION core_db_record_change('book', 'book_id', 'U')"
+    )
+    return statements
+
+
+def drop_trigger_sql():
+    statements = [
+        f'DROP TRIGGER IF EXISTS {table}_{kind} ON {table}'
+        for table, _ in TRACKED_TABLES
+        for kind in ('changes', 'updates')
+    ]
+    statements.append(
+        'DROP TRIGGER IF EXISTS core_db_book_genres_changes '
+        'ON core_db_book_genres'
+    )
+    statements.append('DROP FUNCTION IF EXISTS core_db_record_change()')
+    return statements
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_db', '0019_review_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField()),
+                ('model', models.CharField(max_length=32)),
+                ('op', models.CharField(choices=[('I', 'Insert'), ('U', 'Update'), ('D', 'Delete')], max_length=1)),
+                ('row_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeConsumer',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_txid', models.BigIntegerField(default=0)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['txid', 'id'], name='change_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='change_created_brin'),
+        ),
+        migrations.RunSQL(trigger_sql(), drop_trigger_sql()),
+    ]
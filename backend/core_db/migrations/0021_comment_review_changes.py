@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_db', '0020_change_outbox'),
+    ]
+
+    operations = [
+        # A comment written or deleted is also an update of its review,
+        # so consumers of reviews need not map deleted comment ids.
+        migrations.RunSQL(
+            "CREATE TRIGGER core_db_comment_review_changes "
+            "AFTER INSERT OR DELETE ON core_db_comment FOR EACH ROW "
+            "EXECUTE FUNCTION "
+            "core_db_record_change('reviewpost', 'review_post_id', 'U')",
+            'DROP TRIGGER IF EXISTS core_db_comment_review_changes '
+            'ON core_db_comment',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+from core_db.migration_ops import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0021_comment_review_changes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(fields=['-review_count', '-id'], name='book_review_count_id_idx'),
+        ),
+    ]
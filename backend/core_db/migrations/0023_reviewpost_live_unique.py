@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+from core_db.migration_ops import AddUniqueConstraintConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0022_book_review_count_index'),
+    ]
+
+    operations = [
+        # Built before the old constraint goes, so reviews stay unique.
+        AddUniqueConstraintConcurrently(
+            model_name='reviewpost',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('reviewer', 'book'), name='unique_live_review_per_user_per_book'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='reviewpost',
+            name='unique_review_per_user_per_book',
+        ),
+    ]
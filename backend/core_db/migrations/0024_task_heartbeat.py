@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:10
+
+from django.db import migrations, models
+
+from core_db.migration_ops import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0023_reviewpost_live_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'RUNNING')), fields=['heartbeat_at'], name='task_running_heartbeat_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['DONE', 'FAILED'])), fields=['finished_at'], name='task_finished_at_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # The index is built CONCURRENTLY, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0024_task_heartbeat'),
+    ]
+
+    operations = [
+        # Prefix (LIKE 'abc%') index for author autocomplete, which reads
+        # the one-row-per-author leaderboard instead of grouping books.
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY authorleaderboard_author_prefix_idx
+                ON core_db_authorleaderboard (lower(author) text_pattern_ops)
+            """,
+            'DROP INDEX CONCURRENTLY authorleaderboard_author_prefix_idx',
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.db import migrations
+
+GENRE_COLUMNS = """
+        bg.genre_id,
+        bg.book_id,
+        COUNT(r.id) AS review_count,
+        AVG(r.rating)::double precision AS average_rating,
+        COUNT(r.id) FILTER (
+            WHERE r.review_date >= now() - interval '30 days'
+        ) AS recent_review_count,
+        MAX(r.review_date) AS last_reviewed_at
+    FROM core_db_book_genres bg
+    JOIN core_db_reviewpost r ON r.book_id = bg.book_id
+"""
+
+AUTHOR_COLUMNS = """
+        b.author,
+        COUNT(DISTINCT b.id) AS book_count,
+        COUNT(r.id) AS review_count,
+        AVG(r.rating)::double precision AS average_rating,
+        COUNT(r.id) FILTER (
+            WHERE r.review_date >= now() - interval '30 days'
+        ) AS recent_review_count,
+        MAX(r.review_date) AS last_reviewed_at
+    FROM core_db_book b
+    JOIN core_db_reviewpost r ON r.book_id = b.id
+"""
+
+# The link id keeps a row's pk across refreshes, unlike row_number().
+GENRE_LEADERBOARD = f"""
+    SELECT
+        bg.id,{GENRE_COLUMNS}
+    WHERE r.deleted_at IS NULL
+    GROUP BY bg.id, bg.genre_id, bg.book_id
+"""
+OLD_GENRE_LEADERBOARD = f"""
+    SELECT
+        row_number() OVER (ORDER BY bg.genre_id, bg.book_id) AS id,{GENRE_COLUMNS}
+    GROUP BY bg.genre_id, bg.book_id
+"""
+AUTHOR_LEADERBOARD = f"""
+    SELECT{AUTHOR_COLUMNS}
+    WHERE r.deleted_at IS NULL
+    GROUP BY b.author
+"""
+OLD_AUTHOR_LEADERBOARD = f"""
+    SELECT{AUTHOR_COLUMNS}
+    GROUP BY b.author
+"""
+
+GENRE_INDEXES = [
+    ('genreleaderboard_genre_book_uniq', 'UNIQUE', '(genre_id, book_id)'),
+    ('genreleaderboard_rating_idx', '',
+     '(genre_id, average_rating DESC, review_count DESC)'),
+    ('genreleaderboard_count_idx', '', '(genre_id, review_count DESC)'),
+    ('genreleaderboard_recent_idx', '', '(genre_id, recent_review_count DESC)'),
+]
+AUTHOR_INDEXES = [
+    ('authorleaderboard_author_uniq', 'UNIQUE', '(author)'),
+    ('authorleaderboard_rating_idx', '',
+     '(average_rating DESC, review_count DESC)'),
+    ('authorleaderboard_count_idx', '', '(review_count DESC)'),
+    ('authorleaderboard_recent_idx', '', '(recent_review_count DESC)'),
+    ('authorleaderboard_author_prefix_idx', '',
+     '(lower(author) text_pattern_ops)'),
+]
+
+
+def replace_view(table, select, indexes):
+    """Build the view and its indexes aside, then swap it in at once.
+
+    Readers keep the old view until the last statement, which drops it and
+    renames the new one in a single transaction.
+    """
+    statements = [f'CREATE MATERIALIZED VIEW {table}_new AS {select}']
+    statements += [
+        f'CREATE {unique} INDEX CONCURRENTLY {name}_new '
+        f'ON {table}_new {columns}'
+        for name, unique, columns in indexes
+    ]
+    swap = [
+        f'DROP MATERIALIZED VIEW {table}',
+        f'ALTER MATERIALIZED VIEW {table}_new RENAME TO {table}',
+    ]
+    swap += [
+        f'ALTER INDEX {name}_new RENAME TO {name}'
+        for name, _, _ in indexes
+    ]
+    statements.append('BEGIN; ' + '; '.join(swap) + '; COMMIT;')
+    return statements
+
+
+class Migration(migrations.Migration):
+
+    # Each index is built CONCURRENTLY, in a statement of its own.
+    atomic = False
+
+    dependencies = [
+        ('core_db', '0025_authorleaderboard_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            replace_view(
+                'core_db_genreleaderboard', GENRE_LEADERBOARD, GENRE_INDEXES,
+            ),
+            replace_view(
+                'core_db_genreleaderboard', OLD_GENRE_LEADERBOARD,
+                GENRE_INDEXES,
+            ),
+        ),
+        migrations.RunSQL(
+            replace_view(
+                'core_db_authorleaderboard', AUTHOR_LEADERBOARD,
+                AUTHOR_INDEXES,
+            ),
+            replace_view(
+                'core_db_authorleaderboard', OLD_AUTHOR_LEADERBOARD,
+                AUTHOR_INDEXES,
+            ),
+        ),
+    ]
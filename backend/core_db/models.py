@@ -2,17 +2,28 @@
 Database models.
 """
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Now
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import BrinIndex
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from .normalization import book_dedup_key, make_excerpt, reading_time
+
 class UserManager(BaseUserManager):
+    def get_queryset(self):
+        """Hide soft-deleted users; see core_db.purge."""
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
     def create_user(self, email, password=None, **extra_fields):
         """Create, save and return a new user."""
         if not email:
@@ -55,6 +66,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_superuser = models.BooleanField(default=False)
     image_url = models.ImageField(upload_to='user_images/', blank=True, null=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     objects = UserManager()
     USERNAME_FIELD = 'email'
@@ -88,10 +100,55 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class GenreManager(models.Manager):
+    def refresh_counts(self, pks):
+        """Recompute book_count and review_count of the given genres.
+
+        Only genres whose counts are off are written. updated_at is left
+        alone: counts are not shown with a book, so they must not change
+        its version.
+        """
+        links = BookGenre.objects.filter(genre=OuterRef('pk')).order_by()
+        links = links.values('genre')
+        books = links.annotate(total=Count('pk')).values('total')
+        reviews = links.annotate(
+            total=Sum('book__review_count'),
+        ).values('total')
+        stale = self.filter(pk__in=pks).annotate(
+            new_book_count=Coalesce(Subquery(books), 0),
+            new_review_count=Coalesce(Subquery(reviews), 0),
+        ).exclude(
+            book_count=F('new_book_count'),
+            review_count=F('new_review_count'),
+        )
+        updated = 0
+        for pk, books, reviews in stale.values_list(
+            'pk', 'new_book_count', 'new_review_count',
+        ):
+            updated += self.filter(pk=pk).update(
+                book_count=books, review_count=reviews,
+            )
+        return updated
+
+    def adjust_counts(self, pk, books, reviews):
+        """Add a link's book and its reviews to a genre's counts."""
+        return self.filter(pk=pk).update(
+            book_count=Greatest(F('book_count') + books, 0),
+            review_count=Greatest(F('review_count') + reviews, 0),
+        )
+
+
 class Genre(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, max_length=50, blank=True)
     is_approved = models.BooleanField(default=False)
+    # Maintained by the BookGenre signal handlers in core_db.signals and
+    # by core_db.genre_counts; review_count sums the books' review_count.
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = GenreManager()
 
     def save(self, *args, **kwargs):
         if self.slug != slugify(self.name):
@@ -106,21 +163,111 @@ class Genre(models.Model):
     class Meta:
         ordering = ['name']
 
+
+def unapproved_only_book_ids():
+    """Ids of the books that have genres but no approved one."""
+    approved = BookGenre.objects.filter(
+        book_id=OuterRef('book_id'), genre__is_approved=True,
+    )
+    return BookGenre.objects.filter(
+        genre__is_approved=False,
+    ).exclude(Exists(approved)).values('book_id')
+
+
+class BookQuerySet(models.QuerySet):
+    def in_genres(self, genre_ids, match_all=False):
+        """Books in any of the genres, or in all of them with match_all.
+
+        Both read the (genre, book) index of BookGenre only: "any" is a
+        semi-join, and "all" keeps the books that have a link to every
+        genre, so neither joins the genres or needs DISTINCT.
+        """
+        genre_ids = set(genre_ids)
+        links = BookGenre.objects.filter(genre_id__in=genre_ids)
+        if match_all:
+            links = links.values('book_id').annotate(
+                matched=Count('genre_id'),
+            ).filter(matched=len(genre_ids))
+        return self.filter(pk__in=links.values('book_id'))
+
+    def exclude_unapproved_only(self):
+        """Leave out books that have genres but no approved one.
+
+        The excluded ids are worked out once per query from the links of
+        unapproved genres, which are few, rather than per book.
+        """
+        return self.exclude(pk__in=unapproved_only_book_ids())
+
+
+class BookManager(models.Manager.from_queryset(BookQuerySet)):
+    def find_duplicate(self, title, author):
+        """Return the book matching title/author up to normalization."""
+        return self.filter(dedup_key=book_dedup_key(title, author)).first()
+
+    def get_or_create_normalized(self, title, author, defaults=None):
+        """Reuse a book whose normalized title and author already exist."""
+        book = self.find_duplicate(title, author)
+        if book is not None:
+            return book, False
+        book = self.create(title=title, author=author, **(defaults or {}))
+        return book, True
+
+    def refresh_review_counts(self, pks):
+        """Recompute the denormalized review_count of the given books."""
+        counts = ReviewPost.objects.filter(book=OuterRef('pk')).order_by()
+        counts = counts.values('book').annotate(total=Count('pk'))
+        updated = self.filter(pk__in=pks).update(
+            review_count=Coalesce(Subquery(counts.values('total')), 0),
+            updated_at=Now(),
+        )
+        Genre.objects.refresh_counts(
+            BookGenre.objects.filter(book_id__in=pks).values('genre_id'),
+        )
+        return updated
+
+    def adjust_review_count(self, pk, delta):
+        """Add `delta` to the review_count of a book.
+
+        Its genres catch up in batches, see core_db.genre_counts.
+        """
+        self.filter(pk=pk).update(
+            review_count=Greatest(F('review_count') + delta, 0),
+            updated_at=Now(),
+        )
+
+
 class Book(models.Model):
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=150)
     slug = models.SlugField(unique=True, max_length=255, blank=True)
+    # Case, punctuation and diacritics folded "title|author".
+    dedup_key = models.CharField(max_length=407, editable=False)
+    # Maintained by the ReviewPost signal handlers in core_db.signals.
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     genres = models.ManyToManyField(
         'Genre',
+        through='BookGenre',
         related_name='books',
         blank=True
     )
 
+    objects = BookManager()
+
     class Meta:
         unique_together = ('title', 'author')
+        indexes = [
+            models.Index(fields=['dedup_key'], name='book_dedup_key_idx'),
+            # book_list's -review_count, -pk order.
+            models.Index(
+                fields=['-review_count', '-id'],
+                name='book_review_count_id_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
+        self.dedup_key = book_dedup_key(self.title, self.author)
         if not self.slug:
             base_slug = slugify(f'{self.title} {self.author}')
 
@@ -137,6 +284,77 @@ class Book(models.Model):
         return f'{self.title} by {self.author}'
 
 
+class BookGenre(models.Model):
+    """A book's genre; the table Django created for Book.genres."""
+    # Served by the unique (book, genre) and the (genre, book) indexes.
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, db_index=False)
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, db_index=False,
+    )
+
+    class Meta:
+        db_table = 'core_db_book_genres'
+        unique_together = ('book', 'genre')
+        indexes = [
+            models.Index(
+                fields=['genre', 'book'], name='bookgenre_genre_book_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id}: {self.genre_id}'
+
+
+class ReviewPostQuerySet(models.QuerySet):
+    def with_content(self):
+        """Load the full review bodies, deferred by default."""
+        return self.defer(None)
+
+    def exclude_unapproved_only(self):
+        """Leave out reviews of books hidden by their genres."""
+        return self.exclude(book_id__in=unapproved_only_book_ids())
+
+
+class LiveManager(models.Manager):
+    """Hides rows soft-deleted themselves or through a parent row.
+
+    `deleted_paths` lists the lookups to a deleted_at column that must be
+    NULL. Paths through a relation join its table into every default
+    query, so prefer hiding the rows themselves. Soft-deleted rows stay
+    reachable through _base_manager until core_db.purge removes them.
+    """
+    deleted_paths = ()
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{
+            f'{path}__isnull': True for path in self.deleted_paths
+        })
+
+
+class ReviewPostManager(LiveManager.from_queryset(ReviewPostQuerySet)):
+    """Leaves review_content out of every query unless asked for.
+
+    Listings only need review_excerpt; bodies can run to many kilobytes.
+    """
+    # Reviews of a soft-deleted user are soft-deleted along with them.
+    deleted_paths = ('deleted_at',)
+
+    def get_queryset(self):
+        return super().get_queryset().defer('review_content')
+
+
+class InteractionQuerySet(models.QuerySet):
+    def by_live_users(self):
+        """Leave out the interactions of soft-deleted users.
+
+        The default manager hides nothing, which keeps joins out of every
+        reaction and comment query. Interactions are read through reviews
+        the ReviewPost manager has already checked; this checks the other
+        side until purge_user deletes the rows.
+        """
+        return self.filter(user__deleted_at__isnull=True)
+
+
 class ReviewPost(models.Model):
     reviewer = models.ForeignKey('User',on_delete=models.CASCADE)
     review_title = models.CharField(max_length=150, blank=True, null=True)
@@ -147,14 +365,38 @@ class ReviewPost(models.Model):
         null=True,
     )
     review_content = models.TextField()
+    # Derived from review_content on save, for listings.
+    review_excerpt = models.CharField(
+        max_length=200, blank=True, editable=False,
+    )
+    content_length = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(
+        default=1, editable=False, help_text='Minutes',
+    )
     rating = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         help_text='Rating must be between 1 and 5 stars.'
     )
     review_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     slug = models.SlugField(unique=True, max_length=255, blank=True)
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    objects = ReviewPostManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets core_db.signals recount a review moved to another book.
+        instance._saved_book_id = instance.__dict__.get('book_id')
+        return instance
 
     def save(self, *args, **kwargs):
+        if 'review_content' not in self.get_deferred_fields():
+            self.review_excerpt = make_excerpt(self.review_content)
+            self.content_length = len(self.review_content)
+            self.reading_time = reading_time(self.review_content)
+
         if not self.slug:
             # 1. Fallback logic: Use review_title OR book.title
             title_to_slugify = self.review_title if self.review_title else f"Review of {self.book.title}"
@@ -165,7 +407,8 @@ class ReviewPost(models.Model):
             # 2. Collision detection
             final_slug = unique_slug_base
             counter = 1
-            while ReviewPost.objects.filter(slug=final_slug).exists():
+            # Soft-deleted reviews keep their slugs until purged.
+            while ReviewPost._base_manager.filter(slug=final_slug).exists():
                 final_slug = f'{unique_slug_base}-{counter}'
                 counter += 1
 
@@ -173,17 +416,88 @@ class ReviewPost(models.Model):
 
         super().save(*args, **kwargs)
 
+    def __str__(self):
+        return self.slug
+
     class Meta:
         ordering = ['-review_date']
         constraints = [
+            # A review soft-deleted, or superseded by merge_books, frees
+            # the reviewer to review the book again.
             models.UniqueConstraint(
                 fields=['reviewer', 'book'],
-                name='unique_review_per_user_per_book'
+                condition=models.Q(deleted_at__isnull=True),
+                name='unique_live_review_per_user_per_book',
             )
         ]
+        indexes = [
+            # Serves the default ordering and date-range filters.
+            models.Index(
+                fields=['review_date', 'id'],
+                name='reviewpost_date_id_idx',
+            ),
+        ]
 
 
 
+class ReviewSignature(models.Model):
+    """MinHash signature of a review body, see core_db.duplicates."""
+    review_post = models.OneToOneField(
+        ReviewPost,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    signature = models.BinaryField()
+    # The most similar earlier review, if it is a near-duplicate of one.
+    duplicate_of = models.ForeignKey(
+        ReviewPost,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='+',
+    )
+    similarity = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['duplicate_of'],
+                name='reviewsignature_flagged_idx',
+                condition=models.Q(duplicate_of__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f'Signature of review #{self.review_post_id}'
+
+
+class SignatureBucket(models.Model):
+    """One LSH band of a ReviewSignature, keyed by the hash of its rows."""
+    key = models.BigIntegerField()
+    review_post = models.ForeignKey(
+        ReviewPost,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='+',
+    )
+
+    class Meta:
+        indexes = [
+            # Index-only scans for candidate lookups.
+            models.Index(
+                fields=['key', 'review_post'],
+                name='signaturebucket_key_idx',
+            ),
+            models.Index(
+                fields=['review_post'],
+                name='signaturebucket_review_idx',
+            ),
+        ]
+
+
 class Reaction(models.Model):
     class ReactionTypes(models.TextChoices):
         LOVE = 'LOVE', 'Love'
@@ -192,12 +506,22 @@ class Reaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     review_post = models.ForeignKey(ReviewPost, on_delete=models.CASCADE, related_name='reactions')
     reaction_type = models.CharField(max_length=7, choices=ReactionTypes.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = InteractionQuerySet.as_manager()
 
     class Meta:
         # Crucial for APIs: prevents duplicate likes
         constraints = [
             models.UniqueConstraint(fields=['user', 'review_post'], name='unique_user_reaction')
         ]
+        indexes = [
+            # Serves the per-review counts of notification windows.
+            models.Index(
+                fields=['review_post', 'created_at'],
+                name='reaction_review_created_idx',
+            ),
+        ]
 
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -205,5 +529,300 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = InteractionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                name='comment_created_id_idx',
+            ),
+        ]
+
+
+class Notification(models.Model):
+    """Inbox entry coalescing one kind of event on a review per window."""
+    class Kinds(models.TextChoices):
+        REACTION = 'REACTION', 'Reaction'
+        COMMENT = 'COMMENT', 'Comment'
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='notifications',
+    )
+    review_post = models.ForeignKey(
+        ReviewPost, on_delete=models.CASCADE, related_name='+',
+    )
+    kind = models.CharField(max_length=8, choices=Kinds.choices)
+    window_start = models.DateTimeField()
+    actor_count = models.PositiveIntegerField(default=0)
+    last_actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+    )
+    is_read = models.BooleanField(default=False)
+    emailed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'review_post', 'kind', 'window_start'],
+                name='unique_notification_per_window',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipient', '-updated_at'],
+                name='notification_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+            models.Index(
+                fields=['recipient', 'id'],
+                name='notification_unemailed_idx',
+                condition=models.Q(emailed=False),
+            ),
+        ]
+
+    @property
+    def message(self):
+        verb = {
+            self.Kinds.REACTION: 'reacted to',
+            self.Kinds.COMMENT: 'commented on',
+        }[self.kind]
+        if self.actor_count == 1 and self.last_actor is not None:
+            who = self.last_actor.slug
+        else:
+            who = f'{self.actor_count} people'
+        return f'{who} {verb} your review "{self.review_post}"'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.message}'
+
+
+class NotificationCounter(models.Model):
+    """Per-user notification totals, kept in step with Notification rows."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+    )
+    unread = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+
+class BulkActionJob(models.Model):
+    """Progress record for an admin bulk action run in chunks."""
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    action = models.CharField(max_length=100)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    # Pickled Query of the selection, never the list of selected pks.
+    query = models.BinaryField()
+    status = models.CharField(
+        max_length=7,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    total = models.PositiveBigIntegerField(default=0)
+    processed = models.PositiveBigIntegerField(default=0)
+    last_pk = models.BigIntegerField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.action} ({self.get_status_display()})'
+
+
+class Task(models.Model):
+    """A unit of background work queued for core_db.tasks workers."""
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=7,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    # Enqueueing twice with the same key yields the same task.
+    idempotency_key = models.CharField(
+        max_length=255, unique=True, blank=True, null=True,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed by the worker while the task runs, see requeue_stale().
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Only queued tasks are ever polled; keep the index that small.
+            models.Index(
+                fields=['run_at', 'id'],
+                name='task_queued_run_at_idx',
+                condition=models.Q(status='QUEUED'),
+            ),
+            models.Index(
+                fields=['heartbeat_at'],
+                name='task_running_heartbeat_idx',
+                condition=models.Q(status='RUNNING'),
+            ),
+            # Pruned and counted for metrics by finished_at.
+            models.Index(
+                fields=['finished_at'],
+                name='task_finished_at_idx',
+                condition=models.Q(status__in=['DONE', 'FAILED']),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+
+class LeaderboardQuerySet(models.QuerySet):
+    def top_rated(self, min_reviews=1):
+        return self.filter(review_count__gte=min_reviews).order_by(
+            '-average_rating', '-review_count',
+        )
+
+    def most_reviewed(self):
+        return self.order_by('-review_count')
+
+    def trending(self):
+        """Most reviewed over the last 30 days (as of the last refresh)."""
+        return self.filter(recent_review_count__gt=0).order_by(
+            '-recent_review_count',
+        )
+
+
+class GenreLeaderboard(models.Model):
+    """Per-genre book ranking, read from a materialized view.
+
+    Refreshed by the refresh_leaderboards command. Rows are keyed on the
+    id of the BookGenre link, so a book keeps its pk across refreshes.
+    Both leaderboards only count live reviews.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    review_count = models.PositiveIntegerField()
+    average_rating = models.FloatField()
+    recent_review_count = models.PositiveIntegerField()
+    last_reviewed_at = models.DateTimeField()
+
+    objects = LeaderboardQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'core_db_genreleaderboard'
+
+
+class AuthorLeaderboard(models.Model):
+    """Per-author ranking, read from a materialized view.
+
+    Refreshed by the refresh_leaderboards command.
+    """
+    author = models.CharField(max_length=150, primary_key=True)
+    book_count = models.PositiveIntegerField()
+    review_count = models.PositiveIntegerField()
+    average_rating = models.FloatField()
+    recent_review_count = models.PositiveIntegerField()
+    last_reviewed_at = models.DateTimeField()
+
+    objects = LeaderboardQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'core_db_authorleaderboard'
+
+    def __str__(self):
+        return self.author
+
+
+class Change(models.Model):
+    """One write to a tracked table, appended by the outbox triggers.
+
+    See core_db.changes. Rows are only ever inserted by the database.
+    """
+    class Operations(models.TextChoices):
+        INSERT = 'I', 'Insert'
+        UPDATE = 'U', 'Update'
+        DELETE = 'D', 'Delete'
+
+    # Id of the writing transaction; changes are read in (txid, id) order.
+    txid = models.BigIntegerField()
+    model = models.CharField(max_length=32)
+    op = models.CharField(max_length=1, choices=Operations.choices)
+    row_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='change_position_idx'),
+            # Rows arrive in created_at order; a BRIN index serves pruning
+            # at a fraction of a btree's size and write cost.
+            BrinIndex(fields=['created_at'], name='change_created_brin'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_op_display()} {self.model} #{self.row_id}'
+
+    @property
+    def position(self):
+        return (self.txid, self.id)
+
+
+class ChangeConsumer(models.Model):
+    """How far a named consumer has read the change stream."""
+    name = models.CharField(max_length=100, primary_key=True)
+    last_txid = models.BigIntegerField(default=0)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} at {self.last_txid}:{self.last_id}'
+
+    @property
+    def position(self):
+        return (self.last_txid, self.last_id)
@@ -0,0 +1,42 @@
+"""
+Text normalization shared by models, migrations and commands.
+"""
+import re
+import unicodedata
+
+
+def normalize_text(value):
+    """Fold case, diacritics, punctuation and whitespace out of `value`.
+
+    Runs of single letters are joined so that "J.R.R.", "J. R. R." and
+    "JRR" all become "jrr".
+    """
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    value = re.sub(r"[.'’]", '', value.casefold())
+    value = ' '.join(re.sub(r'[\W_]+', ' ', value).split())
+    return re.sub(r'\b(\w) (?=\w\b)', r'\1', value)
+
+
+def book_dedup_key(title, author):
+    """Key under which spelling variants of the same book collide."""
+    return f'{normalize_text(title)}|{normalize_text(author)}'
+
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Cut `text` to at most `length` characters on a word boundary."""
+    text = ' '.join((text or '').split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1].rsplit(' ', 1)[0] or text[:length - 1]
+    return cut.rstrip(' .,;:') + '…'
+
+
+def reading_time(text):
+    """Whole minutes needed to read `text`, at least one."""
+    words = len((text or '').split())
+    return max(1, -(-words // WORDS_PER_MINUTE))
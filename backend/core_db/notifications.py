@@ -0,0 +1,219 @@
+"""
+Notifications for reviewers about reactions and comments on their reviews.
+
+Events are coalesced per review, kind and time window of
+NOTIFICATION_WINDOW seconds. The first event of a window queues one
+delivery task, due when the window closes; later events of the same window
+find that task by its idempotency key and write nothing. The task then
+counts the window's actors and writes a single inbox row ("42 people
+reacted to your review"), so a viral review costs one write per window
+rather than one per event.
+
+Read and unread totals are kept in NotificationCounter, so showing them is
+a primary key lookup however large the inbox grows. Deleting a
+notification, directly or by cascade from its review or recipient, takes
+it off the counter through a post_delete handler (see core_db.signals).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import tasks
+from .models import (
+    Comment,
+    Notification,
+    NotificationCounter,
+    Reaction,
+    ReviewPost,
+)
+
+EVENT_MODELS = {
+    Notification.Kinds.REACTION: Reaction,
+    Notification.Kinds.COMMENT: Comment,
+}
+
+
+def window_start(moment):
+    """Return the start of the notification window containing `moment`."""
+    size = settings.NOTIFICATION_WINDOW
+    epoch = int(moment.timestamp()) // size * size
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+def record_event(review_post, kind, actor_id, moment=None):
+    """Queue the delivery of the window an event falls in."""
+    if actor_id == review_post.reviewer_id:
+        return None
+    start = window_start(moment or timezone.now())
+    due = start + timedelta(seconds=settings.NOTIFICATION_WINDOW)
+    return tasks.enqueue(
+        'deliver_notification',
+        idempotency_key=(
+            f'notification:{review_post.pk}:{kind}:{start.isoformat()}'
+        ),
+        delay=max(due - timezone.now(), timedelta()),
+        review_post_id=review_post.pk,
+        kind=kind,
+        window_start=start.isoformat(),
+    )
+
+
+def _bump_counter(user_id, unread, total):
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        unread=F('unread') + unread, total=F('total') + total,
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(
+                    user_id=user_id, unread=unread, total=total,
+                )
+        except IntegrityError:
+            _bump_counter(user_id, unread, total)
+
+
+def uncount(notification):
+    """Take a deleted notification off its recipient's counter."""
+    NotificationCounter.objects.filter(
+        user_id=notification.recipient_id,
+    ).update(
+        unread=Greatest(F('unread') - int(not notification.is_read), 0),
+        total=Greatest(F('total') - 1, 0),
+    )
+
+
+@tasks.task('deliver_notification')
+@transaction.atomic
+def deliver_notification(review_post_id, kind, window_start):
+    """Write or refresh the inbox row of one review, kind and window."""
+    review_post = ReviewPost.objects.filter(pk=review_post_id).first()
+    if review_post is None:
+        return
+    start = datetime.fromisoformat(window_start)
+    end = start + timedelta(seconds=settings.NOTIFICATION_WINDOW)
+    events = EVENT_MODELS[kind].objects.filter(
+        review_post_id=review_post_id,
+        created_at__gte=start,
+        created_at__lt=end,
+    ).exclude(user_id=review_post.reviewer_id).order_by()
+    actors = events.values('user_id').distinct().count()
+    if not actors:
+        return
+    last_actor_id = events.order_by('-created_at').values_list(
+        'user_id', flat=True,
+    ).first()
+
+    locked = Notification.objects.select_for_update()
+    notification, created = locked.get_or_create(
+        recipient_id=review_post.reviewer_id,
+        review_post_id=review_post_id,
+        kind=kind,
+        window_start=start,
+        defaults={'actor_count': actors, 'last_actor_id': last_actor_id},
+    )
+    if created:
+        _bump_counter(review_post.reviewer_id, unread=1, total=1)
+    elif notification.actor_count != actors:
+        became_unread = notification.is_read
+        notification.actor_count = actors
+        notification.last_actor_id = last_actor_id
+        notification.is_read = False
+        notification.save()
+        if became_unread:
+            _bump_counter(review_post.reviewer_id, unread=1, total=0)
+
+
+def counts(user):
+    """Return (unread, total) for the user with a single lookup."""
+    counter = NotificationCounter.objects.filter(user=user).values_list(
+        'unread', 'total',
+    ).first()
+    return counter or (0, 0)
+
+
+def inbox(user, unread_only=False):
+    queryset = Notification.objects.filter(recipient=user).select_related(
+        'review_post', 'last_actor',
+    )
+    if unread_only:
+        queryset = queryset.filter(is_read=False)
+    return queryset
+
+
+@transaction.atomic
+def mark_read(user, ids=None):
+    """Mark the user's notifications, or only those in `ids`, as read.
+
+    Raises ValueError unless `ids` is None or a list of integers.
+    """
+    if ids is not None and (
+        not isinstance(ids, list)
+        or not all(type(pk) is int for pk in ids)
+    ):
+        raise ValueError('ids must be a list of notification ids.')
+    queryset = Notification.objects.filter(recipient=user, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    marked = queryset.update(is_read=True)
+    if marked:
+        NotificationCounter.objects.filter(user=user).update(
+            unread=Greatest(F('unread') - marked, 0),
+        )
+    return marked
+
+
+def digest_message(user, notifications):
+    lines = [f'- {notification.message}' for notification in notifications]
+    return EmailMessage(
+        subject=f'{len(notifications)} new notifications',
+        body='\n'.join(['Since your last digest:', '', *lines]),
+        to=[user.email],
+    )
+
+
+def send_digests(batch_size=None):
+    """Email every user their unread, not yet emailed notifications.
+
+    Recipients are walked in id order, batch_size users at a time. Each
+    batch is sent over one SMTP connection and marked as emailed.
+    Returns the number of emails sent.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE
+    pending = Notification.objects.filter(
+        emailed=False, is_read=False, recipient__deleted_at__isnull=True,
+    )
+    sent = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            pending.filter(recipient_id__gt=last_user_id)
+            .order_by('recipient_id')
+            .values_list('recipient_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not user_ids:
+            return sent
+        last_user_id = user_ids[-1]
+
+        by_user = {}
+        rows = pending.filter(recipient_id__in=user_ids).select_related(
+            'recipient', 'review_post', 'last_actor',
+        ).order_by('recipient_id', '-updated_at')
+        for notification in rows:
+            by_user.setdefault(notification.recipient, []).append(
+                notification,
+            )
+        messages = [
+            digest_message(user, notifications)
+            for user, notifications in by_user.items()
+        ]
+        with get_connection() as connection:
+            sent += connection.send_messages(messages) or 0
+        Notification.objects.filter(
+            pk__in=[n.pk for group in by_user.values() for n in group],
+        ).update(emailed=True)
@@ -0,0 +1,67 @@
+"""
+Paginators for very large tables.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_table_count(model, using='default'):
+    """Return the planner's row estimate for the model's table.
+
+    Partitioned tables keep their statistics on the partitions, so the
+    estimates of any child tables are summed in as well.
+    """
+    table = model._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+               OR c.oid IN (
+                   SELECT inhrelid FROM pg_inherits
+                   WHERE inhparent = %s::regclass
+               )
+            """,
+            [table, table],
+        )
+        return cursor.fetchone()[0]
+
+
+def estimated_query_count(queryset):
+    """Return the planner's row estimate for a filtered queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids COUNT(*) over millions of rows.
+
+    Small results are still counted exactly. Once the planner expects more
+    than `estimate_threshold` rows the estimate is used instead, read from
+    pg_class for an unfiltered table and from EXPLAIN otherwise.
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+
+        if queryset.query.has_filters():
+            estimate = estimated_query_count(queryset)
+        else:
+            estimate = estimated_table_count(queryset.model, queryset.db)
+
+        if estimate < self.estimate_threshold:
+            return super().count
+        return estimate
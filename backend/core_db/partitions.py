@@ -0,0 +1,384 @@
+"""
+PostgreSQL declarative range partitioning by timestamp.
+
+Only tables listed in PARTITIONED_TABLES are partitioned. A partitioned
+table's primary key and unique constraints must contain the partition key,
+and foreign keys may only point at unique constraints, so:
+
+* core_db_comment is partitioned by created_at. Nothing references it and
+  it carries no unique constraint, so only its primary key widens to
+  (id, created_at); Django still treats `id` as the primary key.
+* core_db_reviewpost stays a plain table. Reactions and comments hold
+  foreign keys to reviewpost.id, and unique_live_review_per_user_per_book
+  cannot be enforced once review_date has to be part of every unique key.
+* core_db_reaction has no timestamp to partition on, and
+  unique_user_reaction has the same problem.
+
+Partitions are named <table>_pYYYY (yearly) or <table>_pYYYY_MM (monthly)
+and each table keeps a <table>_default partition for rows outside them.
+"""
+import datetime
+import re
+from collections import namedtuple
+
+from django.db import connection, transaction
+
+PartitionSpec = namedtuple('PartitionSpec', ['column', 'interval'])
+
+PARTITIONED_TABLES = {
+    'core_db_comment': PartitionSpec(column='created_at', interval='month'),
+}
+
+INTERVALS = ('month', 'year')
+
+
+def bucket_start(value, interval):
+    """Return the first day of the month or year containing `value`."""
+    if interval == 'year':
+        return datetime.date(value.year, 1, 1)
+    return datetime.date(value.year, value.month, 1)
+
+
+def next_bucket(start, interval, step=1):
+    """Return the start of the bucket `step` intervals after `start`."""
+    if interval == 'year':
+        return start.replace(year=start.year + step)
+    month = start.year * 12 + start.month - 1 + step
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, start, interval):
+    if interval == 'year':
+        return f'{table}_p{start:%Y}'
+    return f'{table}_p{start:%Y_%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def parse_partition_name(table, name):
+    """Return the bucket start encoded in a partition name, or None."""
+    match = re.fullmatch(
+        rf'{re.escape(table)}_p(\d{{4}})(?:_(\d{{2}}))?', name,
+    )
+    if not match:
+        return None
+    return datetime.date(int(match[1]), int(match[2] or 1), 1)
+
+
+def list_partitions(cursor, table):
+    """Return {name: bucket start} for the table's dated partitions."""
+    cursor.execute(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        [table],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        start = parse_partition_name(table, name)
+        if start is not None:
+            partitions[name] = start
+    return partitions
+
+
+def _bound(value):
+    return f"'{value.isoformat()} 00:00:00+00'"
+
+
+def create_partition(cursor, table, start, interval, parent=None):
+    """Create the partition for the bucket starting at `start`.
+
+    Rows of that range already sitting in the default partition are moved
+    into the new partition first, since Postgres refuses to create it
+    otherwise. `parent` is the partitioned table if it is not yet named
+    `table`. Returns the partition name, or None if it already existed.
+    """
+    spec = PARTITIONED_TABLES[table]
+    parent = parent or table
+    name = partition_name(table, start, interval)
+    if name in list_partitions(cursor, parent):
+        return None
+
+    default = default_partition_name(table)
+    end = next_bucket(start, interval)
+    in_range = (
+        f'{spec.column} >= {_bound(start)} AND {spec.column} < {_bound(end)}'
+    )
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})')
+    has_rows = cursor.fetchone()[0]
+
+    if has_rows:
+        cursor.execute(f'ALTER TABLE {parent} DETACH PARTITION {default}')
+    cursor.execute(
+        f'CREATE TABLE {name} PARTITION OF {parent} '
+        f'FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})'
+    )
+    if has_rows:
+        cursor.execute(
+            f'INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}'
+        )
+        cursor.execute(f'DELETE FROM {default} WHERE {in_range}')
+        cursor.execute(
+            f'ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT'
+        )
+    return name
+
+
+def ensure_partitions(table, ahead=3, today=None):
+    """Create partitions from the current bucket to `ahead` buckets on."""
+    spec = PARTITIONED_TABLES[table]
+    start = bucket_start(today or datetime.date.today(), spec.interval)
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for step in range(ahead + 1):
+            bucket = next_bucket(start, spec.interval, step)
+            name = create_partition(cursor, table, bucket, spec.interval)
+            if name:
+                created.append(name)
+    return created
+
+
+def _drop_foreign_keys(cursor, table):
+    """Drop a table's foreign keys, e.g. those an archive keeps from its
+    parent, which would otherwise block deleting the rows they point at."""
+    cursor.execute(
+        """
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    names = [name for (name,) in cursor.fetchall()]
+    if names:
+        # ALTER TABLE refuses to run while checks of rows written earlier
+        # in the transaction are still deferred.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    for name in names:
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+
+
+def detach_old_partitions(table, retain, drop=False, today=None):
+    """Detach partitions ending before the last `retain` buckets.
+
+    Detached partitions stay behind as plain archive tables, without
+    foreign keys, unless `drop` is set.
+    """
+    spec = PARTITIONED_TABLES[table]
+    current = bucket_start(today or datetime.date.today(), spec.interval)
+    cutoff = next_bucket(current, spec.interval, -retain)
+    detached = []
+    with connection.cursor() as cursor:
+        partitions = list_partitions(cursor, table)
+        for name, start in sorted(partitions.items(), key=lambda p: p[1]):
+            if next_bucket(start, spec.interval) > cutoff:
+                continue
+            with transaction.atomic():
+                cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+                if drop:
+                    cursor.execute(f'DROP TABLE {name}')
+                else:
+                    _drop_foreign_keys(cursor, name)
+            detached.append(name)
+    return detached
+
+
+def _indexes(cursor, table):
+    """Return the (name, CREATE INDEX statement) pairs of a table."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _foreign_keys(cursor, table):
+    """Return the ALTER TABLE statements adding a table's foreign keys."""
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    return [
+        f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        for name, definition in cursor.fetchall()
+    ]
+
+
+def _triggers(cursor, table):
+    """Return the CREATE TRIGGER statements of a table."""
+    cursor.execute(
+        """
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal
+        """,
+        [table],
+    )
+    return [definition for (definition,) in cursor.fetchall()]
+
+
+def _table_ddl(cursor, table):
+    """Return the CREATE INDEX, foreign key and trigger DDL of a table."""
+    return [
+        definition for _, definition in _indexes(cursor, table)
+    ] + _foreign_keys(cursor, table) + _triggers(cursor, table)
+
+
+def _rebuild_table(schema_editor, table, create_sql, primary_key,
+                   prepare=None):
+    """Recreate `table` from `create_sql`, keeping its rows and DDL.
+
+    `create_sql` may refer to the original table as {old}. `prepare` is
+    called with a cursor and the old table name before rows are copied.
+    The table is locked throughout, so this is only fit for small tables.
+    """
+    old = f'{table}_old'
+    with schema_editor.connection.cursor() as cursor:
+        ddl = _table_ddl(cursor, table)
+        schema_editor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+        schema_editor.execute(create_sql.format(old=old))
+        # The id sequence would otherwise be dropped along with {old}.
+        schema_editor.execute(
+            f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id'
+        )
+        if prepare is not None:
+            prepare(cursor, old)
+
+    schema_editor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    schema_editor.execute(f'DROP TABLE {old} CASCADE')
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey '
+        f'PRIMARY KEY ({", ".join(primary_key)})'
+    )
+    for statement in ddl:
+        schema_editor.execute(statement)
+
+
+def _on_table(definition, table, new):
+    """Point a CREATE INDEX statement of `table` at `new`."""
+    return re.sub(
+        rf' ON (ONLY )?(\w+\.)?{re.escape(table)} ', f' ON {new} ',
+        definition, count=1,
+    )
+
+
+def partition_table(schema_editor, table, ahead=3, batch_size=1000):
+    """Convert a plain table into a range partitioned one while it is used.
+
+    The partitioned table is built next to the old one, with a trigger
+    copying every write on the old table over. Existing rows are then
+    copied in batches of `batch_size`, one transaction each, and the
+    tables are swapped in a last transaction that holds the lock only for
+    the renames and the table's own triggers. Must run outside a
+    transaction (atomic = False).
+    """
+    spec = PARTITIONED_TABLES[table]
+    new = f'{table}_new'
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        indexes = _indexes(cursor, table)
+        triggers = _triggers(cursor, table)
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(
+                f'CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE ({spec.column})'
+            )
+            cursor.execute(
+                f'ALTER TABLE {new} ADD CONSTRAINT {new}_pkey '
+                f'PRIMARY KEY (id, {spec.column})'
+            )
+            # Built on the empty table, so they cost nothing yet.
+            for name, definition in indexes:
+                cursor.execute(_on_table(
+                    definition.replace(f' {name} ON ', f' {name}_new ON ', 1),
+                    table, new,
+                ))
+            for statement in _foreign_keys(cursor, table):
+                cursor.execute(statement.replace(
+                    f'ALTER TABLE {table} ', f'ALTER TABLE {new} ', 1,
+                ))
+            cursor.execute(
+                f'CREATE TABLE {default_partition_name(table)} '
+                f'PARTITION OF {new} DEFAULT'
+            )
+            cursor.execute(f'SELECT MIN({spec.column}) FROM {table}')
+            first = cursor.fetchone()[0]
+            current = bucket_start(datetime.date.today(), spec.interval)
+            bucket = bucket_start(first or current, spec.interval)
+            while bucket <= next_bucket(current, spec.interval, ahead):
+                create_partition(cursor, table, bucket, spec.interval, new)
+                bucket = next_bucket(bucket, spec.interval)
+            cursor.execute(
+                f"""
+                CREATE FUNCTION {new}_mirror() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        DELETE FROM {new} WHERE id = OLD.id;
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO {new} VALUES (NEW.*);
+                    END IF;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+                """
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {new}_mirror AFTER INSERT OR UPDATE OR '
+                f'DELETE ON {table} FOR EACH ROW EXECUTE FUNCTION '
+                f'{new}_mirror()'
+            )
+
+        last_id = 0
+        while True:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(
+                    f'SELECT MAX(id) FROM (SELECT id FROM {table} '
+                    f'WHERE id > %s ORDER BY id LIMIT %s) batch',
+                    [last_id, batch_size],
+                )
+                upper = cursor.fetchone()[0]
+                if upper is None:
+                    break
+                # FOR SHARE waits for writes in flight, whose trigger
+                # then finds the copied row, and skips deleted rows.
+                cursor.execute(
+                    f'INSERT INTO {new} SELECT * FROM {table} '
+                    f'WHERE id > %s AND id <= %s FOR SHARE '
+                    f'ON CONFLICT DO NOTHING',
+                    [last_id, upper],
+                )
+            last_id = upper
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+            # The id sequence would otherwise be dropped along with it.
+            cursor.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {new}.id')
+            cursor.execute(f'DROP TABLE {table} CASCADE')
+            cursor.execute(f'DROP FUNCTION {new}_mirror()')
+            cursor.execute(f'ALTER TABLE {new} RENAME TO {table}')
+            cursor.execute(f'ALTER INDEX {new}_pkey RENAME TO {table}_pkey')
+            for name, _ in indexes:
+                cursor.execute(f'ALTER INDEX {name}_new RENAME TO {name}')
+            # Added last so they do not fire for the copied rows.
+            for statement in triggers:
+                cursor.execute(statement)
+
+
+def unpartition_table(schema_editor, table):
+    """Convert a partitioned table back into a plain table, under lock."""
+    _rebuild_table(
+        schema_editor,
+        table,
+        f'CREATE TABLE {table} (LIKE {{old}} INCLUDING DEFAULTS)',
+        ['id'],
+    )
@@ -0,0 +1,164 @@
+"""
+Soft deletion of users and reviews, with the cascade purged in background.
+
+Deleting a user or review outright cascades through every reaction and
+comment under it in one transaction. soft_delete_user() and
+soft_delete_review() instead stamp deleted_at, which the default managers
+filter on (see LiveManager), so the row disappears from reads at once,
+and with it the reactions and comments read through it. They then queue
+a purge task that deletes the dependent rows in chunks of
+BULK_ACTION_CHUNK_SIZE, one short transaction each, and finally the row
+itself.
+
+Book.review_count drops as soon as a review is soft-deleted, and
+Genre.review_count with the next batched refresh (see
+core_db.genre_counts). soft_delete_user() also soft-deletes the user's
+reviews, a chunk per transaction, correcting the counts of their books as
+it goes.
+
+Books have no soft deletion; the delete_books admin action queues a purge
+task per book that takes its reviews down the same way before the book.
+"""
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from . import bulk_actions, genre_counts, tasks
+from .bulk_actions import delete_in_chunks, get_chunk_size, iter_pk_chunks
+from .models import (
+    Book,
+    Comment,
+    Notification,
+    Reaction,
+    ReviewPost,
+    User,
+)
+
+
+def soft_delete_review(review):
+    """Hide a review now and queue the purge of it and its interactions."""
+    if review.deleted_at is not None:
+        return
+    with transaction.atomic():
+        review.deleted_at = timezone.now()
+        review.save(update_fields=['deleted_at', 'updated_at'])
+        Book.objects.adjust_review_count(review.book_id, -1)
+        genre_counts.schedule_refresh()
+        tasks.enqueue(
+            'purge_review',
+            idempotency_key=f'purge-review:{review.pk}',
+            review_id=review.pk,
+        )
+
+
+@bulk_actions.register('delete_reviews')
+def delete_reviews(queryset):
+    for review in queryset:
+        soft_delete_review(review)
+
+
+@bulk_actions.register('delete_books')
+def delete_books(queryset):
+    for pk in queryset.values_list('pk', flat=True):
+        tasks.enqueue(
+            'purge_book', idempotency_key=f'purge-book:{pk}', book_id=pk,
+        )
+
+
+def soft_delete_user(user):
+    """Deactivate and hide a user and their reviews now, and queue the
+    purge of their data."""
+    if user.deleted_at is not None:
+        return
+    with transaction.atomic():
+        user.deleted_at = timezone.now()
+        user.is_active = False
+        user.save(update_fields=['deleted_at', 'is_active'])
+        tasks.enqueue(
+            'purge_user',
+            idempotency_key=f'purge-user:{user.pk}',
+            user_id=user.pk,
+        )
+    hide_user_reviews(user.pk)
+
+
+def hide_user_reviews(user_id, chunk_size=None):
+    """Soft-delete a user's live reviews, one chunk per transaction.
+
+    The default ReviewPost manager only checks the review's own
+    deleted_at, so this is what takes them off reads.
+    """
+    live = ReviewPost._base_manager.filter(
+        reviewer_id=user_id, deleted_at__isnull=True,
+    )
+    for pks in iter_pk_chunks(live, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            chunk = ReviewPost._base_manager.filter(pk__in=pks)
+            book_ids = list(chunk.values_list('book_id', flat=True))
+            chunk.update(deleted_at=Now())
+            Book.objects.refresh_review_counts(book_ids)
+    genre_counts.schedule_refresh()
+
+
+@tasks.task('purge_review')
+def purge_review(review_id, chunk_size=None):
+    """Delete a soft-deleted review and everything hanging off it."""
+    if not ReviewPost._base_manager.filter(
+        pk=review_id, deleted_at__isnull=False,
+    ).exists():
+        return
+    delete_in_chunks(
+        Reaction._base_manager.filter(review_post_id=review_id), chunk_size,
+    )
+    delete_in_chunks(
+        Comment._base_manager.filter(review_post_id=review_id), chunk_size,
+    )
+    delete_in_chunks(
+        Notification.objects.filter(review_post_id=review_id), chunk_size,
+    )
+    ReviewPost._base_manager.filter(pk=review_id).delete()
+
+
+@tasks.task('purge_book')
+def purge_book(book_id, chunk_size=None):
+    """Delete a book's reviews and their interactions, then the book."""
+    chunk_size = chunk_size or get_chunk_size()
+    reviews = ReviewPost._base_manager.filter(book_id=book_id)
+    live = reviews.filter(deleted_at__isnull=True)
+    for pks in iter_pk_chunks(live, chunk_size):
+        ReviewPost._base_manager.filter(pk__in=pks).update(deleted_at=Now())
+    for pks in iter_pk_chunks(reviews, chunk_size):
+        for review_id in pks:
+            purge_review(review_id, chunk_size)
+    Book.objects.filter(pk=book_id).delete()
+    genre_counts.schedule_refresh()
+
+
+@tasks.task('purge_user')
+def purge_user(user_id, chunk_size=None):
+    """Delete a soft-deleted user's reviews, interactions and account."""
+    chunk_size = chunk_size or get_chunk_size()
+    if not User._base_manager.filter(
+        pk=user_id, deleted_at__isnull=False,
+    ).exists():
+        return
+
+    # Catches reviews written while the account was being deleted.
+    hide_user_reviews(user_id, chunk_size)
+    reviews = ReviewPost._base_manager.filter(reviewer_id=user_id)
+    for pks in iter_pk_chunks(reviews, chunk_size):
+        for review_id in pks:
+            purge_review(review_id, chunk_size)
+
+    delete_in_chunks(Reaction._base_manager.filter(user_id=user_id),
+                     chunk_size)
+    delete_in_chunks(Comment._base_manager.filter(user_id=user_id),
+                     chunk_size)
+    for pks in iter_pk_chunks(
+        Notification.objects.filter(last_actor_id=user_id), chunk_size,
+    ):
+        Notification.objects.filter(pk__in=pks).update(last_actor=None)
+    delete_in_chunks(
+        Notification.objects.filter(recipient_id=user_id), chunk_size,
+    )
+    User._base_manager.filter(pk=user_id).delete()
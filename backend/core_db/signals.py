@@ -0,0 +1,172 @@
+"""
+Signal handlers keeping denormalized columns in step, indexing review
+bodies for near-duplicate checks and notifying reviewers.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, Now
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import duplicates, genre_counts, notifications
+from .models import (
+    Book,
+    BookGenre,
+    Comment,
+    Genre,
+    Notification,
+    Reaction,
+    ReviewPost,
+)
+
+
+@receiver(pre_save, sender=ReviewPost)
+def check_duplicate_review(sender, instance, raw=False, update_fields=None,
+                           **kwargs):
+    """Sign the body and look for near-duplicates before writing it."""
+    if raw or 'review_content' in instance.get_deferred_fields():
+        return
+    if update_fields is not None and 'review_content' not in update_fields:
+        return
+    # The admin form checks the body while validating; don't sign it twice.
+    checked = instance.__dict__.pop('_checked_content', None)
+    if checked is not None and checked[0] == instance.review_content:
+        instance._duplicate_check = checked[1]
+        return
+    instance._duplicate_check = duplicates.find_duplicate(
+        instance.review_content, exclude=instance.pk,
+    )
+
+
+@receiver(post_save, sender=ReviewPost)
+def index_review_signature(sender, instance, created, raw=False,
+                           **kwargs):
+    check = instance.__dict__.pop('_duplicate_check', None)
+    if check is None or (created and check[0] is None):
+        return
+    duplicates.store(instance.pk, *check)
+
+
+@receiver(post_save, sender=ReviewPost)
+def count_review(sender, instance, created, raw=False, **kwargs):
+    """Count new reviews, and moved ones on both of their books."""
+    if raw:
+        return
+    saved_book_id = instance.__dict__.get('_saved_book_id')
+    instance._saved_book_id = instance.book_id
+    if created:
+        Book.objects.adjust_review_count(instance.book_id, 1)
+    elif (
+        saved_book_id is not None
+        and saved_book_id != instance.book_id
+        and instance.deleted_at is None
+    ):
+        Book.objects.adjust_review_count(saved_book_id, -1)
+        Book.objects.adjust_review_count(instance.book_id, 1)
+    else:
+        return
+    genre_counts.schedule_refresh()
+
+
+@receiver(post_delete, sender=ReviewPost)
+def uncount_deleted_review(sender, instance, **kwargs):
+    # Soft-deleted reviews were uncounted when they were hidden.
+    if instance.deleted_at is not None:
+        return
+    Book.objects.adjust_review_count(instance.book_id, -1)
+    genre_counts.schedule_refresh()
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def touch_books_on_genre_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Bump updated_at of books whose genre list changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    elif pk_set:
+        book_ids = pk_set
+    else:
+        return
+    Book.objects.filter(pk__in=book_ids).update(updated_at=Now())
+
+
+def _book_reviews(book_ids):
+    return Book.objects.filter(pk__in=book_ids).aggregate(
+        total=Coalesce(Sum('review_count'), 0),
+    )['total']
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def count_added_genre_books(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    # add() bulk-creates its links without post_save; removals and
+    # clear() delete them one by one and go through count_genre_books.
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        Genre.objects.adjust_counts(
+            instance.pk, len(pk_set), _book_reviews(pk_set),
+        )
+        return
+    reviews = _book_reviews([instance.pk])
+    for genre_id in pk_set:
+        Genre.objects.adjust_counts(genre_id, 1, reviews)
+
+
+@receiver(post_save, sender=BookGenre)
+def count_saved_genre_book(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        Genre.objects.adjust_counts(
+            instance.genre_id, 1, _book_reviews([instance.book_id]),
+        )
+    else:
+        # The link may have moved; the genre it left catches up with the
+        # next batched refresh.
+        Genre.objects.refresh_counts([instance.genre_id])
+        genre_counts.schedule_refresh()
+
+
+@receiver(post_delete, sender=BookGenre)
+def count_deleted_genre_book(sender, instance, **kwargs):
+    # A deleted book's links go before the book, so its count is there.
+    Genre.objects.adjust_counts(
+        instance.genre_id, -1, -_book_reviews([instance.book_id]),
+    )
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_notification(sender, instance, **kwargs):
+    notifications.uncount(instance)
+
+
+def _notify_reviewer(instance, kind):
+    transaction.on_commit(partial(
+        notifications.record_event,
+        instance.review_post,
+        kind,
+        instance.user_id,
+        instance.created_at,
+    ))
+
+
+@receiver(post_save, sender=Reaction)
+def notify_reaction(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _notify_reviewer(instance, Notification.Kinds.REACTION)
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _notify_reviewer(instance, Notification.Kinds.COMMENT)
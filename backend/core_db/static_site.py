@@ -0,0 +1,383 @@
+"""
+Pre-rendered pages of books and reviews for a web server to serve as is.
+
+Pages are written under STATIC_SITE_ROOT as
+
+* books/<id>/<slug>/index.html, for books not hidden by their genres,
+* reviews/<id>/<slug>/index.html, with the review's comments, for the
+  reviews of those books,
+* sitemaps/<books|reviews>-<n>.xml, the ids from n * SITEMAP_SIZE on,
+* sitemap.xml, the index of those.
+
+Every file is written to a temporary name and renamed into place, so the
+server never sees half a page. build_all() renders everything in chunks
+of CHUNK_SIZE across a process pool and moves the "static-site" consumer
+of the change stream (core_db.changes) to where the build started.
+apply_changes() then re-renders only the pages the changes since touch:
+a book's page when it, its genres or its reviews change, a review's page
+when it or its comments change, and the books of a genre when its name
+or approval changes. .genres.json keeps the genres as last rendered to
+tell those apart from count updates, and a book shown or hidden takes
+its reviews along. Sitemaps are only rewritten when one of their URLs is
+added, removed or renamed, as told by the pages on disk before and after,
+so their lastmod dates may be older than the pages. Review pages show
+their book's title, so a renamed book's reviews keep the old one until
+the next full build.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.template.loader import render_to_string
+
+from . import changes
+from .models import (
+    Book,
+    BookGenre,
+    ChangeConsumer,
+    Comment,
+    Genre,
+    ReviewPost,
+)
+
+CONSUMER = 'static-site'
+CHUNK_SIZE = 500
+SITEMAP_SIZE = 50000
+BOOK_REVIEWS = 20
+GENRES_FILE = '.genres.json'
+
+
+def site_root():
+    return Path(settings.STATIC_SITE_ROOT)
+
+
+def page_url(kind, pk, slug):
+    return f'/{kind}/{pk}/{slug}/'
+
+
+def write_file(path, content):
+    """Write `content` to `path` atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _write_page(kind, pk, slug, template, context):
+    """Write an object's page, dropping any left under an old slug."""
+    directory = site_root() / kind / str(pk)
+    if directory.is_dir():
+        for entry in directory.iterdir():
+            if entry.name != slug:
+                shutil.rmtree(entry, ignore_errors=True)
+    url = page_url(kind, pk, slug)
+    content = render_to_string(template, {
+        'base_url': settings.STATIC_SITE_BASE_URL, 'url': url, **context,
+    })
+    write_file(directory / slug / 'index.html', content)
+
+
+def _remove_pages(kind, pks):
+    for pk in pks:
+        shutil.rmtree(site_root() / kind / str(pk), ignore_errors=True)
+
+
+def listed_books():
+    return Book.objects.exclude_unapproved_only()
+
+
+def listed_reviews():
+    return ReviewPost.objects.exclude_unapproved_only()
+
+
+def render_books(book_ids):
+    """Render the pages of the given books; return how many were written."""
+    book_ids = set(book_ids)
+    books = listed_books().filter(pk__in=book_ids).prefetch_related(
+        Prefetch(
+            'genres',
+            queryset=Genre.objects.filter(is_approved=True).order_by('name'),
+        ),
+    )
+    latest = ReviewPost.objects.filter(
+        book_id=OuterRef('book_id'),
+    ).order_by('-pk').values('pk')[:BOOK_REVIEWS]
+    reviews = {}
+    rows = ReviewPost.objects.filter(
+        book_id__in=book_ids, pk__in=Subquery(latest),
+    ).select_related('reviewer').order_by('book_id', '-pk')
+    for review in rows:
+        review.url = page_url('reviews', review.pk, review.slug)
+        reviews.setdefault(review.book_id, []).append(review)
+
+    written = set()
+    for book in books:
+        _write_page('books', book.pk, book.slug, 'static_site/book.html', {
+            'book': book,
+            'genres': list(book.genres.all()),
+            'reviews': reviews.get(book.pk, []),
+        })
+        written.add(book.pk)
+    _remove_pages('books', book_ids - written)
+    return len(written)
+
+
+def render_reviews(review_ids):
+    """Render the pages of the given reviews; return how many were written."""
+    review_ids = set(review_ids)
+    reviews = listed_reviews().with_content().filter(
+        pk__in=review_ids,
+    ).select_related('book', 'reviewer')
+    comments = {}
+    rows = Comment.objects.by_live_users().filter(
+        review_post_id__in=review_ids,
+    ).select_related('user').order_by('created_at', 'pk')
+    for comment in rows:
+        comments.setdefault(comment.review_post_id, []).append(comment)
+
+    written = set()
+    for review in reviews:
+        _write_page(
+            'reviews', review.pk, review.slug, 'static_site/review.html', {
+                'review': review,
+                'book_url': page_url('books', review.book_id,
+                                     review.book.slug),
+                'comments': comments.get(review.pk, []),
+            },
+        )
+        written.add(review.pk)
+    _remove_pages('reviews', review_ids - written)
+    return len(written)
+
+
+SITEMAP_QUERYSETS = {
+    'books': listed_books,
+    'reviews': listed_reviews,
+}
+
+
+def render_sitemaps(kind, numbers):
+    """Render the numbered sitemaps of `kind`, removing empty ones."""
+    for number in numbers:
+        path = site_root() / 'sitemaps' / f'{kind}-{number}.xml'
+        rows = SITEMAP_QUERYSETS[kind]().filter(
+            pk__gte=number * SITEMAP_SIZE,
+            pk__lt=(number + 1) * SITEMAP_SIZE,
+        ).order_by('pk').values_list('pk', 'slug', 'updated_at')
+        urls = [
+            (page_url(kind, pk, slug), updated_at)
+            for pk, slug, updated_at in rows
+        ]
+        if not urls:
+            path.unlink(missing_ok=True)
+            continue
+        write_file(path, render_to_string('static_site/sitemap.xml', {
+            'base_url': settings.STATIC_SITE_BASE_URL, 'urls': urls,
+        }))
+
+
+def render_sitemap_index():
+    directory = site_root() / 'sitemaps'
+    names = sorted(
+        path.name for path in directory.glob('*.xml')
+    ) if directory.is_dir() else []
+    write_file(
+        site_root() / 'sitemap.xml',
+        render_to_string('static_site/sitemap_index.xml', {
+            'base_url': settings.STATIC_SITE_BASE_URL,
+            'sitemaps': [f'/sitemaps/{name}' for name in names],
+        }),
+    )
+
+
+def _genre_state(queryset):
+    return {
+        str(pk): [name, slug, is_approved]
+        for pk, name, slug, is_approved in queryset.values_list(
+            'pk', 'name', 'slug', 'is_approved',
+        )
+    }
+
+
+def changed_genre_books(genre_ids):
+    """Return the books of the genres renamed or (un)approved since the
+    last render, and remember the genres' current state."""
+    path = site_root() / GENRES_FILE
+    try:
+        rendered = json.loads(path.read_text())
+    except FileNotFoundError:
+        rendered = {}
+    current = _genre_state(Genre.objects.filter(pk__in=genre_ids))
+    changed = [
+        int(pk) for pk, state in current.items()
+        if rendered.get(pk) != state
+    ]
+    for pk in map(str, genre_ids):
+        # Deleted genres take their links along, which updates the books.
+        rendered.pop(pk, None)
+    rendered.update(current)
+    write_file(path, json.dumps(rendered))
+    return set(BookGenre.objects.filter(genre_id__in=changed).values_list(
+        'book_id', flat=True,
+    ))
+
+
+def _rendered_slugs(kind, pks):
+    """Map each pk to the slug its page is on disk under, or None."""
+    slugs = {}
+    for pk in pks:
+        directory = site_root() / kind / str(pk)
+        names = [
+            entry.name for entry in directory.iterdir()
+        ] if directory.is_dir() else []
+        slugs[pk] = names[0] if names else None
+    return slugs
+
+
+def _render_pages(kind, render, pks):
+    """Render pages; return the count and each pk's slug before and
+    after."""
+    before = _rendered_slugs(kind, pks)
+    pages = render(pks)
+    return pages, before, _rendered_slugs(kind, pks)
+
+
+def _moved(before, after):
+    return {pk for pk in before if before[pk] != after[pk]}
+
+
+def apply_changes(batch):
+    """Re-render the pages touched by a batch of changes."""
+    book_ids, review_ids, genre_ids = set(), set(), set()
+    for change in batch:
+        if change.model == 'book':
+            book_ids.add(change.row_id)
+        elif change.model == 'reviewpost':
+            review_ids.add(change.row_id)
+        elif change.model == 'genre':
+            genre_ids.add(change.row_id)
+    book_ids |= set(ReviewPost._base_manager.filter(
+        pk__in=review_ids,
+    ).values_list('book_id', flat=True))
+    if genre_ids:
+        book_ids |= changed_genre_books(genre_ids)
+
+    book_pages, before, after = _render_pages(
+        'books', render_books, book_ids,
+    )
+    moved_books = _moved(before, after)
+    toggled = [
+        pk for pk in moved_books if (before[pk] is None) != (after[pk] is None)
+    ]
+    if toggled:
+        review_ids |= set(ReviewPost._base_manager.filter(
+            book_id__in=toggled,
+        ).values_list('pk', flat=True))
+    review_pages, before, after = _render_pages(
+        'reviews', render_reviews, review_ids,
+    )
+    moved_reviews = _moved(before, after)
+
+    render_sitemaps('books', {pk // SITEMAP_SIZE for pk in moved_books})
+    render_sitemaps('reviews', {pk // SITEMAP_SIZE for pk in moved_reviews})
+    if moved_books or moved_reviews:
+        render_sitemap_index()
+    return book_pages + review_pages
+
+
+def build_changes(limit=CHUNK_SIZE):
+    """Apply pending changes in batches; return how many were read."""
+    total = 0
+    while True:
+        count = changes.consume(CONSUMER, apply_changes, limit)
+        total += count
+        if not count:
+            return total
+
+
+def _render_chunk(job):
+    func, ids = job
+    try:
+        return func(ids)
+    finally:
+        connections.close_all()
+
+
+def _chunks(ids, size):
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _remove_stale(kind, live_ids):
+    directory = site_root() / kind
+    if not directory.is_dir():
+        return
+    stale = [
+        entry.name for entry in directory.iterdir()
+        if entry.name.isdigit() and int(entry.name) not in live_ids
+    ]
+    _remove_pages(kind, stale)
+
+
+def build_all(processes=1):
+    """Render every page and sitemap; return the number of pages.
+
+    With `processes` > 1 the chunks are rendered by a pool of forked
+    processes.
+    """
+    last = changes.committed().order_by('-txid', '-id').first()
+    start = last.position if last is not None else changes.START
+
+    book_ids = list(listed_books().order_by('pk').values_list(
+        'pk', flat=True,
+    ))
+    review_ids = list(listed_reviews().order_by('pk').values_list(
+        'pk', flat=True,
+    ))
+    jobs = [
+        (render_books, chunk) for chunk in _chunks(book_ids, CHUNK_SIZE)
+    ] + [
+        (render_reviews, chunk)
+        for chunk in _chunks(review_ids, CHUNK_SIZE)
+    ]
+    if processes > 1:
+        # Forked children must not share the parent's connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('fork'),
+        ) as pool:
+            pages = sum(pool.map(_render_chunk, jobs))
+    else:
+        pages = sum(func(ids) for func, ids in jobs)
+
+    _remove_stale('books', set(book_ids))
+    _remove_stale('reviews', set(review_ids))
+    for kind, ids in (('books', book_ids), ('reviews', review_ids)):
+        last_number = ids[-1] // SITEMAP_SIZE if ids else -1
+        render_sitemaps(kind, range(last_number + 1))
+        for path in (site_root() / 'sitemaps').glob(f'{kind}-*.xml'):
+            if int(path.stem.split('-')[1]) > last_number:
+                path.unlink()
+    render_sitemap_index()
+    write_file(
+        site_root() / GENRES_FILE,
+        json.dumps(_genre_state(Genre.objects.all())),
+    )
+
+    ChangeConsumer.objects.update_or_create(
+        name=CONSUMER,
+        defaults={'last_txid': start[0], 'last_id': start[1]},
+    )
+    return pages
@@ -0,0 +1,268 @@
+"""
+Background tasks with PostgreSQL as the broker.
+
+A task is a registered function called with JSON keyword arguments. Tasks
+are rows of core_db_task: enqueue() inserts one, in the caller's
+transaction if there is one, so a task never runs for work that was rolled
+back. Workers claim the oldest due task with SELECT ... FOR UPDATE SKIP
+LOCKED, so any number of them can poll the table without blocking each
+other or running a task twice.
+
+A task that raises is retried with exponential backoff until it has been
+attempted max_attempts times, then left FAILED. Tasks may therefore run
+more than once and should be idempotent.
+
+While a task runs its worker refreshes heartbeat_at, so a task whose
+heartbeat stops is known to have lost its worker however long it runs.
+Finished tasks are kept for TASK_RETENTION seconds, then pruned by a task
+idle workers queue once an hour. Task metrics are read from the table, so
+they cover every worker process.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from backend import metrics
+
+from .models import Task
+
+registry = {}
+
+
+def task(name, max_attempts=5):
+    """Register a function as the task `name`."""
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, idempotency_key=None, delay=None, **kwargs):
+    """Queue the task `name` to be called with `kwargs`.
+
+    When `idempotency_key` is given and a task with that key exists
+    already, that task is returned instead of queueing another.
+    """
+    func = registry[name]
+    fields = {
+        'name': name,
+        'kwargs': kwargs,
+        'max_attempts': func.max_attempts,
+        'run_at': timezone.now() + (delay or timedelta()),
+    }
+    if idempotency_key is None:
+        queued = Task.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                queued, _ = Task.objects.get_or_create(
+                    idempotency_key=idempotency_key, defaults=fields,
+                )
+        except IntegrityError:
+            queued = Task.objects.get(idempotency_key=idempotency_key)
+    return queued
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a task that failed `attempts` times."""
+    base = settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1)
+    delay = min(base, settings.TASK_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_task():
+    """Lock the next due task for this worker and mark it RUNNING."""
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = (
+            Task.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Task.Status.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'pk')
+            .first()
+        )
+        if claimed is not None:
+            claimed.status = Task.Status.RUNNING
+            claimed.attempts += 1
+            claimed.started_at = now
+            claimed.heartbeat_at = now
+            claimed.save(update_fields=[
+                'status', 'attempts', 'started_at', 'heartbeat_at',
+                'updated_at',
+            ])
+    return claimed
+
+
+@contextmanager
+def heartbeat(claimed, interval=None):
+    """Refresh the heartbeat of `claimed` from a thread until exit."""
+    interval = interval or settings.TASK_HEARTBEAT_INTERVAL
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                Task.objects.filter(
+                    pk=claimed.pk, status=Task.Status.RUNNING,
+                ).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def requeue_stale(timeout=None):
+    """Put back tasks whose worker stopped sending heartbeats.
+
+    A lost run counts as an attempt, so tasks out of attempts are marked
+    FAILED instead. Returns how many tasks were queued again.
+    """
+    timeout = timeout or settings.TASK_STALE_AFTER
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.Status.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=timeout),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.Status.FAILED, finished_at=now, updated_at=now,
+        last_error='Worker lost while running the task.',
+    )
+    return stale.update(
+        status=Task.Status.QUEUED, run_at=now, updated_at=now,
+    )
+
+
+def run_task(claimed):
+    """Call the task's function and record the outcome."""
+    try:
+        with heartbeat(claimed):
+            registry[claimed.name](**claimed.kwargs)
+    except Exception as exc:
+        claimed.last_error = repr(exc)
+        if claimed.attempts < claimed.max_attempts:
+            claimed.status = Task.Status.QUEUED
+            claimed.run_at = timezone.now() + timedelta(
+                seconds=backoff(claimed.attempts),
+            )
+        else:
+            claimed.status = Task.Status.FAILED
+            claimed.finished_at = timezone.now()
+    else:
+        claimed.status = Task.Status.DONE
+        claimed.finished_at = timezone.now()
+    claimed.save(update_fields=[
+        'status', 'run_at', 'finished_at', 'last_error', 'updated_at',
+    ])
+    return claimed
+
+
+def schedule_prune():
+    """Queue the prune of the current hour, unless it is queued."""
+    epoch = int(timezone.now().timestamp()) // 3600 * 3600
+    start = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+    return enqueue(
+        'prune_tasks', idempotency_key=f'prune-tasks:{start.isoformat()}',
+    )
+
+
+@task('prune_tasks')
+def prune(retention=None, chunk_size=1000):
+    """Delete tasks finished more than `retention` seconds ago.
+
+    Rows go a chunk per statement, so pruning a backlog neither holds
+    long locks nor bloats one transaction. Returns how many were deleted.
+    """
+    retention = retention or settings.TASK_RETENTION
+    finished = Task.objects.filter(
+        status__in=[Task.Status.DONE, Task.Status.FAILED],
+        finished_at__lt=timezone.now() - timedelta(seconds=retention),
+    )
+    deleted = 0
+    while True:
+        pks = list(finished.order_by().values_list('pk', flat=True)[
+            :chunk_size
+        ])
+        if not pks:
+            return deleted
+        deleted += Task.objects.filter(pk__in=pks).delete()[0]
+
+
+@metrics.collector
+def task_metrics():
+    """Count tasks in the table, so the numbers hold for every worker."""
+    pending = (
+        Task.objects
+        .filter(status__in=[Task.Status.QUEUED, Task.Status.RUNNING])
+        .order_by()
+        .values_list('name', 'status')
+        .annotate(count=Count('pk'))
+    )
+    for name, status, count in pending:
+        yield 'tasks', {'task': name, 'status': status}, count
+
+    finished = list(
+        Task.objects
+        .filter(
+            status__in=[Task.Status.DONE, Task.Status.FAILED],
+            finished_at__gte=timezone.now() - timedelta(hours=1),
+        )
+        .order_by()
+        .values_list('name', 'status')
+        .annotate(
+            count=Count('pk'),
+            seconds=Sum(F('finished_at') - F('started_at')),
+        )
+    )
+    for name, status, count, _ in finished:
+        yield (
+            'tasks_finished_last_hour', {'task': name, 'status': status},
+            count,
+        )
+    for name, status, _, seconds in finished:
+        yield (
+            'tasks_run_seconds_last_hour', {'task': name, 'status': status},
+            seconds.total_seconds() if seconds else 0,
+        )
+
+
+def work(burst=False, poll_interval=1.0, max_tasks=None):
+    """Claim and run tasks; return how many ran.
+
+    With `burst` the loop ends as soon as no task is due, otherwise it
+    polls every `poll_interval` seconds until `max_tasks` have run, and
+    queues the hourly prune of finished tasks while idle.
+    """
+    processed = 0
+    while max_tasks is None or processed < max_tasks:
+        claimed = claim_task()
+        if claimed is None:
+            if requeue_stale():
+                continue
+            if burst:
+                break
+            schedule_prune()
+            time.sleep(poll_interval)
+            continue
+        run_task(claimed)
+        processed += 1
+    return processed
+
+
+def run_pending(max_tasks=None):
+    """Run every due task in this process, e.g. from tests."""
+    return work(burst=True, max_tasks=max_tasks)
@@ -1,7 +1,17 @@
+import datetime
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+
+from core_db.admin import IndexedDatesQuerySet
+from core_db.models import Book, Comment, Genre, Reaction, ReviewPost
+from core_db.paginators import EstimatedCountPaginator
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -17,4 +27,111 @@ class AdminSiteTests(TestCase):
         self.user = get_user_model().objects.create_user(
             email='user@example.com',
             password='Django@123',
-        )
\ No newline at end of file
+        )
+
+    def create_reviews(self, count):
+        """Create `count` reviews of distinct books by the sample user."""
+        genre = Genre.objects.create(name='Fantasy', is_approved=True)
+        reviews = []
+        for i in range(count):
+            book = Book.objects.create(title=f'Book {i}', author='Author')
+            book.genres.add(genre)
+            reviews.append(ReviewPost.objects.create(
+                reviewer=self.user,
+                book=book,
+                review_content='Great read.',
+                rating=i % 5 + 1,
+            ))
+        return reviews
+
+    def test_changelists_load(self):
+        """Test every core_db changelist renders."""
+        review = self.create_reviews(1)[0]
+        Reaction.objects.create(
+            user=self.user, review_post=review, reaction_type='LOVE',
+        )
+        Comment.objects.create(
+            user=self.user, review_post=review, content='Agreed!',
+        )
+
+        for model in ('user', 'genre', 'book', 'reviewpost',
+                      'reaction', 'comment'):
+            url = reverse(f'admin:core_db_{model}_changelist')
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, model)
+
+    def test_review_changelist_queries_do_not_grow_with_rows(self):
+        """Test reviewer and book are joined rather than loaded per row."""
+        url = reverse('admin:core_db_reviewpost_changelist')
+        self.create_reviews(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+
+        Book.objects.all().delete()
+        Genre.objects.all().delete()
+        self.create_reviews(10)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+
+        self.assertEqual(
+            len(few.captured_queries), len(many.captured_queries),
+        )
+
+    def test_rating_and_genre_filters(self):
+        """Test the fixed-choice rating and subquery genre filters."""
+        self.create_reviews(5)
+
+        url = reverse('admin:core_db_reviewpost_changelist')
+        res = self.client.get(url, {'rating': '3'})
+        self.assertEqual(res.context['cl'].result_count, 1)
+
+        url = reverse('admin:core_db_book_changelist')
+        res = self.client.get(url, {'genre': 'fantasy'})
+        self.assertEqual(res.context['cl'].result_count, 5)
+
+    def test_indexed_dates_match_distinct_dates(self):
+        """Test the probing date hierarchy matches Django's DISTINCT one."""
+        reviews = self.create_reviews(3)
+        dates = [
+            datetime.datetime(2024, 3, 5, 12),
+            datetime.datetime(2025, 1, 2, 8),
+            datetime.datetime(2025, 7, 30, 23),
+        ]
+        for review, date in zip(reviews, dates):
+            ReviewPost.objects.filter(pk=review.pk).update(
+                review_date=timezone.make_aware(date),
+            )
+
+        queryset = ReviewPost.objects.all()
+        indexed = IndexedDatesQuerySet(model=ReviewPost, query=queryset.query)
+        for kind in ('year', 'month', 'day'):
+            self.assertEqual(
+                list(indexed.datetimes('review_date', kind)),
+                list(queryset.datetimes('review_date', kind)),
+            )
+
+    def test_paginator_counts_small_tables_exactly(self):
+        """Test the estimated paginator falls back to COUNT for few rows."""
+        self.create_reviews(3)
+        paginator = EstimatedCountPaginator(ReviewPost.objects.all(), 2)
+        self.assertEqual(paginator.count, 3)
+
+        filtered = ReviewPost.objects.filter(rating__gte=2)
+        self.assertEqual(EstimatedCountPaginator(filtered, 2).count, 2)
+
+    def test_delete_reviews_action_soft_deletes(self):
+        """Test the review delete action hides rows rather than deleting."""
+        reviews = self.create_reviews(2)
+        url = reverse('admin:core_db_reviewpost_changelist')
+        res = self.client.post(url, {
+            'action': 'delete_reviews',
+            '_selected_action': [reviews[0].pk],
+        })
+
+        self.assertEqual(res.status_code, 302)
+        hidden = ReviewPost._base_manager.get(pk=reviews[0].pk)
+        self.assertIsNotNone(hidden.deleted_at)
+        self.assertEqual(
+            list(ReviewPost.objects.values_list('pk', flat=True)),
+            [reviews[1].pk],
+        )
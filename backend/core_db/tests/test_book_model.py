@@ -1,6 +1,13 @@
+import io
+
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.db.utils import IntegrityError
-from backend.core_db.models import Book
+from django.utils import timezone
+from core_db import dedup
+from core_db.models import Book, Genre, ReviewPost
+from core_db.normalization import book_dedup_key
 
 class BookModelTests(TestCase):
     """Test cases for the Book model."""
@@ -39,4 +46,149 @@ class BookModelTests(TestCase):
         with self.assertRaises(IntegrityError):
             Book.objects.create(title='Unique Book', author='Original Author')
 
-    # why do i need to  give the user access to create a manual slug?
\ No newline at end of file
+    # why do i need to  give the user access to create a manual slug?
+
+
+class BookDedupTests(TestCase):
+    """Test normalized duplicate detection and merging of books."""
+
+    def test_dedup_key_folds_spelling_variants(self):
+        """Test case, whitespace, punctuation and accents are folded."""
+        self.assertEqual(
+            book_dedup_key('The Hobbit', 'J.R.R. Tolkien'),
+            book_dedup_key('the hobbit ', 'JRR Tolkien'),
+        )
+        self.assertEqual(
+            book_dedup_key('Cien años de soledad', 'Gabriel García Márquez'),
+            'cien anos de soledad|gabriel garcia marquez',
+        )
+
+    def test_find_duplicate(self):
+        """Test a spelling variant finds the stored book."""
+        book = Book.objects.create(title='The Hobbit', author='J.R.R. Tolkien')
+
+        self.assertEqual(
+            Book.objects.find_duplicate('the  hobbit', 'J. R. R. Tolkien'),
+            book,
+        )
+        self.assertIsNone(Book.objects.find_duplicate('Dune', 'Tolkien'))
+
+    def test_get_or_create_normalized(self):
+        """Test variants reuse the existing book instead of a new slug."""
+        book, created = Book.objects.get_or_create_normalized(
+            'The Hobbit', 'J.R.R. Tolkien',
+        )
+        again, created_again = Book.objects.get_or_create_normalized(
+            'the hobbit ', 'JRR Tolkien',
+        )
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(book, again)
+
+    def test_merge_books_command(self):
+        """Test duplicates are merged with reviews, genres and conflicts."""
+        fantasy = Genre.objects.create(name='Fantasy')
+        classic = Genre.objects.create(name='Classic')
+        hobbit = Book.objects.create(title='The Hobbit', author='Tolkien')
+        variant = Book.objects.create(title='the hobbit ', author='TOLKIEN')
+        typo = Book.objects.create(title='The Hobit', author='Tolkien')
+        other = Book.objects.create(title='The Silmarillion', author='Tolkien')
+        hobbit.genres.add(fantasy)
+        variant.genres.add(classic)
+
+        users = [
+            get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='pass',
+            )
+            for i in range(3)
+        ]
+        for user, book in [(users[0], hobbit), (users[1], hobbit),
+                           (users[2], variant), (users[0], typo)]:
+            ReviewPost.objects.create(
+                reviewer=user, book=book, review_content='...', rating=4,
+            )
+
+        out = io.StringIO()
+        call_command('merge_books', '--apply', stdout=out)
+
+        self.assertIn('Merged 2 duplicates', out.getvalue())
+        self.assertEqual(
+            set(Book.objects.values_list('pk', flat=True)),
+            {hobbit.pk, other.pk},
+        )
+        self.assertEqual(set(hobbit.genres.all()), {fantasy, classic})
+        self.assertEqual(hobbit.reviews.count(), 3)
+        self.assertEqual(
+            ReviewPost.objects.filter(reviewer=users[0]).count(), 1,
+        )
+        # The superseded review is soft-deleted and purged, not dropped.
+        self.assertEqual(
+            ReviewPost._base_manager.filter(reviewer=users[0]).count(), 2,
+        )
+
+    def test_duplicate_groups_share_title_or_author(self):
+        """Test only books agreeing on title or author are compared."""
+        dune = Book.objects.create(title='Dune', author='Frank Herbert')
+        typo = Book.objects.create(title='Dune', author='Frank Herbrt')
+        Book.objects.create(title='Dunes', author='Frank Herbertt')
+        messiah = Book.objects.create(
+            title='Dune Messiah', author='Frank Herbert',
+        )
+        messiah_typo = Book.objects.create(
+            title='Dune Mesiah', author='Frank Herbert',
+        )
+
+        self.assertEqual(
+            dedup.find_duplicate_groups(),
+            sorted([[dune.pk, typo.pk], [messiah.pk, messiah_typo.pk]]),
+        )
+
+    def test_similar_pairs_bounded_per_key(self):
+        """Test a key is compared with at most max_block_size - 1 of the
+        keys after it."""
+        block = [
+            (1, 'the hobbit|anon'),
+            (2, 'silmarillion|anon'),
+            (3, 'the hobbitt|anon'),
+        ]
+
+        self.assertEqual(list(dedup.similar_pairs(block, 0.9, 2)), [])
+        self.assertEqual(list(dedup.similar_pairs(block, 0.9, 3)), [(1, 3)])
+
+    def test_merge_books_moves_soft_deleted_reviews(self):
+        """Test a soft-deleted review on the canonical book does not block
+        moving the reviewer's live one."""
+        hobbit = Book.objects.create(title='The Hobbit', author='Tolkien')
+        variant = Book.objects.create(title='the hobbit', author='Tolkien')
+        user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        deleted = ReviewPost.objects.create(
+            reviewer=user, book=hobbit, review_content='Old.', rating=2,
+        )
+        ReviewPost.objects.filter(pk=deleted.pk).update(
+            deleted_at=timezone.now(),
+        )
+        live = ReviewPost.objects.create(
+            reviewer=user, book=variant, review_content='New.', rating=5,
+        )
+
+        moved, dropped = dedup.merge_books(hobbit.pk, [variant.pk])
+
+        self.assertEqual((moved, dropped), (1, 0))
+        self.assertEqual(list(hobbit.reviews.all()), [live])
+        self.assertEqual(
+            ReviewPost._base_manager.filter(book=hobbit).count(), 2,
+        )
+
+    def test_merge_books_dry_run(self):
+        """Test nothing changes without --apply."""
+        Book.objects.create(title='Dune', author='Frank Herbert')
+        Book.objects.create(title='DUNE', author='frank herbert')
+
+        out = io.StringIO()
+        call_command('merge_books', stdout=out)
+
+        self.assertIn('Found 1 duplicates', out.getvalue())
+        self.assertEqual(Book.objects.count(), 2)
@@ -0,0 +1,158 @@
+"""
+Tests for chunked admin bulk actions.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core_db import bulk_actions, tasks
+from core_db.models import (
+    Book, BulkActionJob, Comment, Genre, Reaction, ReviewPost,
+)
+
+
+class BulkActionTests(TestCase):
+    """Test bulk actions run in chunks, inline or as background jobs."""
+
+    def setUp(self):
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='Django@123',
+        )
+        self.client.force_login(self.admin_user)
+        self.reviews = []
+        for i in range(5):
+            book = Book.objects.create(title=f'Spam {i}', author='Bot')
+            review = ReviewPost.objects.create(
+                reviewer=self.admin_user,
+                book=book,
+                review_content='Buy followers now!',
+                rating=5,
+            )
+            Comment.objects.create(
+                user=self.admin_user, review_post=review, content='spam',
+            )
+            Reaction.objects.create(
+                user=self.admin_user, review_post=review,
+                reaction_type='LIKE',
+            )
+            self.reviews.append(review)
+
+    def post_action(self, model, action, pks, select_across=False):
+        url = reverse(f'admin:core_db_{model}_changelist')
+        return self.client.post(url, {
+            'action': action,
+            '_selected_action': [str(pk) for pk in pks],
+            'select_across': '1' if select_across else '0',
+            'index': '0',
+        })
+
+    def test_iter_pk_chunks_is_bounded(self):
+        """Test the keyset walk yields every pk in bounded chunks."""
+        chunks = list(bulk_actions.iter_pk_chunks(ReviewPost.objects, 2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            sorted(pk for chunk in chunks for pk in chunk),
+            sorted(review.pk for review in self.reviews),
+        )
+
+    def test_selected_reviews_deleted_inline(self):
+        """Test hand-picked reviews are hidden and purged in background."""
+        targets = [self.reviews[0].pk, self.reviews[1].pk]
+        self.post_action('reviewpost', 'delete_reviews', targets)
+
+        self.assertFalse(ReviewPost.objects.filter(pk__in=targets).exists())
+        self.assertEqual(ReviewPost.objects.count(), 3)
+        self.assertFalse(BulkActionJob.objects.exists())
+
+        tasks.run_pending()
+
+        self.assertFalse(
+            ReviewPost._base_manager.filter(pk__in=targets).exists(),
+        )
+        self.assertEqual(Comment._base_manager.count(), 3)
+        self.assertEqual(Reaction._base_manager.count(), 3)
+
+    @override_settings(BULK_ACTION_CHUNK_SIZE=2)
+    def test_review_interactions_deleted_in_chunks(self):
+        """Test a review's comments are purged in chunks before it."""
+        review = self.reviews[0]
+        for i in range(4):
+            Comment.objects.create(
+                user=self.admin_user, review_post=review, content=f'{i}',
+            )
+        bulk_actions.run_chunks(
+            'delete_reviews', ReviewPost.objects.filter(pk=review.pk),
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            tasks.run_pending()
+
+        chunk_deletes = [
+            query for query in ctx.captured_queries
+            if query['sql'].startswith(
+                'DELETE FROM "core_db_comment" WHERE "core_db_comment"."id"',
+            )
+        ]
+        self.assertEqual(len(chunk_deletes), 3)
+        self.assertFalse(
+            Comment._base_manager.filter(review_post_id=review.pk).exists(),
+        )
+        self.assertFalse(
+            ReviewPost._base_manager.filter(pk=review.pk).exists(),
+        )
+
+    def test_select_across_queues_job(self):
+        """Test "select all matching" only queues a job."""
+        self.post_action(
+            'reviewpost', 'delete_reviews', [self.reviews[0].pk],
+            select_across=True,
+        )
+
+        job = BulkActionJob.objects.get()
+        self.assertEqual(job.status, BulkActionJob.Status.PENDING)
+        self.assertEqual(job.created_by, self.admin_user)
+        self.assertEqual(ReviewPost.objects.count(), 5)
+
+    def test_run_job_records_progress(self):
+        """Test a job runs every chunk and records its progress."""
+        job = bulk_actions.create_job(
+            'delete_reviews', ReviewPost.objects.filter(rating=5),
+        )
+
+        bulk_actions.run_job(job, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkActionJob.Status.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(job.last_pk, max(r.pk for r in self.reviews))
+        self.assertFalse(ReviewPost.objects.exists())
+        tasks.run_pending()
+        self.assertFalse(Comment._base_manager.exists())
+
+    @override_settings(BULK_ACTION_CHUNK_SIZE=1)
+    def test_jobs_run_on_task_workers(self):
+        """Test the task workers drain pending jobs."""
+        Genre.objects.create(name='Fantasy')
+        Genre.objects.create(name='Horror')
+        bulk_actions.create_job('approve_genres', Genre.objects.all())
+
+        call_command('run_workers', '--burst')
+
+        self.assertEqual(Genre.objects.filter(is_approved=False).count(), 0)
+        job = BulkActionJob.objects.get()
+        self.assertEqual(job.status, BulkActionJob.Status.DONE)
+        self.assertEqual(job.processed, 2)
+
+    def test_stock_delete_action_removed(self):
+        """Test the one-transaction delete_selected action is not offered."""
+        url = reverse('admin:core_db_reviewpost_changelist')
+        res = self.client.get(url)
+
+        actions = dict(res.context['action_form'].fields['action'].choices)
+        self.assertIn('delete_reviews', actions)
+        self.assertNotIn('delete_selected', actions)
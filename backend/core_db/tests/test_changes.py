@@ -0,0 +1,195 @@
+"""
+Tests for the change outbox and stream.
+"""
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from core_db import bulk_actions, changes
+from core_db.models import (
+    Book,
+    Change,
+    ChangeConsumer,
+    Comment,
+    Genre,
+    ReviewPost,
+)
+
+
+class ChangeStreamTests(TransactionTestCase):
+    """Test writes of every kind land in the outbox and can be followed.
+
+    Changes only become readable once their transaction has committed,
+    hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        self.genre = Genre.objects.create(name='Fantasy')
+        self.book = Book.objects.create(title='Dune', author='Herbert')
+        Change.objects.all().delete()
+
+    def recorded(self):
+        return [
+            (change.model, change.op, change.row_id)
+            for change in changes.read()
+        ]
+
+    def test_save_update_and_delete_recorded(self):
+        """Test ORM saves, bulk updates and deletes are all recorded."""
+        review = ReviewPost.objects.create(
+            reviewer=self.user, book=self.book,
+            review_content='Spice.', rating=5,
+        )
+        comment = Comment.objects.create(
+            user=self.user, review_post=review, content='Agreed.',
+        )
+        Genre.objects.filter(pk=self.genre.pk).update(is_approved=True)
+        ReviewPost.objects.filter(pk=review.pk).delete()
+
+        recorded = self.recorded()
+
+        self.assertIn(('reviewpost', 'I', review.pk), recorded)
+        self.assertIn(('comment', 'I', comment.pk), recorded)
+        self.assertIn(('genre', 'U', self.genre.pk), recorded)
+        self.assertIn(('comment', 'D', comment.pk), recorded)
+        self.assertIn(('reviewpost', 'D', review.pk), recorded)
+
+    def test_bulk_action_and_genre_links_recorded(self):
+        """Test admin bulk actions and genre links reach the outbox."""
+        bulk_actions.approve_genres(Genre.objects.all())
+        self.book.genres.add(self.genre)
+
+        self.assertEqual(self.recorded()[:2], [
+            ('genre', 'U', self.genre.pk),
+            ('book', 'U', self.book.pk),
+        ])
+
+    def test_noop_update_and_rollback_not_recorded(self):
+        """Test unchanged rows and rolled back writes leave no change."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE core_db_genre SET name = name WHERE id = %s',
+                [self.genre.pk],
+            )
+        try:
+            with transaction.atomic():
+                Book.objects.create(title='Emma', author='Austen')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self.recorded(), [])
+
+    def test_open_transaction_holds_stream_back(self):
+        """Test a later commit is withheld while an older write is open."""
+        written, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    Genre.objects.create(name='Slow')
+                    written.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_writer)
+        thread.start()
+        written.wait(5)
+        Genre.objects.create(name='Fast')
+
+        self.assertEqual(changes.read(), [])
+
+        release.set()
+        thread.join()
+        self.assertEqual(len(changes.read()), 2)
+
+    def test_consumer_checkpoint(self):
+        """Test a consumer resumes after the last batch it handled."""
+        for i in range(5):
+            Genre.objects.create(name=f'Genre {i}')
+        seen = []
+
+        self.assertEqual(changes.consume('search', seen.extend, limit=3), 3)
+        self.assertEqual(changes.consume('search', seen.extend, limit=3), 2)
+        self.assertEqual(changes.consume('search', seen.extend, limit=3), 0)
+
+        self.assertEqual(len({change.pk for change in seen}), 5)
+        consumer = ChangeConsumer.objects.get(name='search')
+        self.assertEqual(consumer.position, seen[-1].position)
+
+    def test_failed_handler_keeps_position(self):
+        """Test a handler that raises leaves the batch to be re-read."""
+        Genre.objects.create(name='Epic')
+
+        def fail(batch):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            changes.consume('cache', fail)
+
+        self.assertEqual(
+            ChangeConsumer.objects.get(name='cache').position, changes.START,
+        )
+        self.assertEqual(changes.consume('cache', lambda batch: None), 1)
+
+    def test_handler_holds_back_nobody(self):
+        """Test other readers see new changes while a handler runs, and
+        the consumer itself is left to the process running it."""
+        Genre.objects.create(name='Epic')
+        seen = {}
+
+        def other_session():
+            try:
+                Genre.objects.create(name='Meanwhile')
+                seen['read'] = len(changes.read())
+                seen['consumed'] = changes.consume('cache', list)
+            finally:
+                connection.close()
+
+        def handler(batch):
+            thread = threading.Thread(target=other_session)
+            thread.start()
+            thread.join(5)
+
+        self.assertEqual(changes.consume('cache', handler), 1)
+
+        self.assertEqual(seen, {'read': 2, 'consumed': 0})
+        self.assertEqual(changes.consume('cache', list), 1)
+
+    def test_stream_changes_command(self):
+        """Test the command prints JSON lines and prunes old changes."""
+        Genre.objects.create(name='Epic')
+        book = Book.objects.create(title='Emma', author='Austen')
+        out = StringIO()
+
+        call_command(
+            'stream_changes', consumer='analytics', model=['book'],
+            stdout=out,
+        )
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [(line['model'], line['op'], line['id']) for line in lines],
+            [('book', 'I', book.pk)],
+        )
+        self.assertEqual(
+            ChangeConsumer.objects.get(name='analytics').position,
+            changes.parse_position(
+                changes.format_position(Change.objects.last().position),
+            ),
+        )
+
+        Change.objects.update(created_at=timezone.now() - timedelta(days=30))
+        call_command('stream_changes', prune=True, stdout=StringIO())
+        self.assertFalse(Change.objects.exists())
@@ -0,0 +1,213 @@
+"""
+Tests for near-duplicate review detection.
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.forms import modelform_factory
+from django.test import TestCase, override_settings
+
+from core_db import duplicates
+from core_db.admin import ReviewPostForm
+from core_db.models import (
+    Book,
+    ReviewPost,
+    ReviewSignature,
+    SignatureBucket,
+)
+
+SPAM = (
+    'Buy cheap watches at example dot com, best prices on the internet, '
+    'free shipping worldwide and a money back guarantee for every order'
+)
+ORIGINAL = (
+    'A slow start, but the second half of the book pulls every thread '
+    'together and the ending made me want to start over from page one'
+)
+
+
+class DuplicateDetectionTests(TestCase):
+    """Test MinHash signatures, LSH lookups and the write-time check."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author='Anon')
+            for i in range(4)
+        ]
+
+    def review(self, book, content, user=None):
+        return ReviewPost.objects.create(
+            reviewer=user or self.user, book=book,
+            review_content=content, rating=3,
+        )
+
+    def test_similarity_estimates_jaccard(self):
+        """Test near-identical bodies score high and unrelated ones low."""
+        spam = duplicates.signature(SPAM)
+
+        self.assertEqual(duplicates.similarity(spam, spam), 1.0)
+        self.assertGreater(
+            duplicates.similarity(spam, duplicates.signature(SPAM + '!!')),
+            0.9,
+        )
+        self.assertLess(
+            duplicates.similarity(spam, duplicates.signature(ORIGINAL)),
+            0.2,
+        )
+
+    def test_signature_matches_minhash_formula(self):
+        """Test the vectorized signature equals the per-shingle minimum."""
+        hashes = duplicates.shingles(SPAM)
+        expected = [
+            min((a * x + b) % duplicates._PRIME for x in hashes)
+            & duplicates._MASK
+            for a, b in duplicates.PERMUTATIONS
+        ]
+
+        self.assertEqual(
+            list(duplicates.array('I', duplicates.signature(SPAM))),
+            expected,
+        )
+
+    def test_admin_save_signs_once(self):
+        """Test the admin form's check is reused when the review saves."""
+        fields = ['reviewer', 'book', 'review_content', 'rating']
+        form_class = modelform_factory(
+            ReviewPost, form=ReviewPostForm, fields=fields,
+        )
+        form = form_class(data={
+            'reviewer': self.user.pk, 'book': self.books[0].pk,
+            'review_content': SPAM, 'rating': 3,
+        })
+
+        with patch.object(
+            duplicates, 'signature', wraps=duplicates.signature,
+        ) as sign:
+            self.assertTrue(form.is_valid(), form.errors)
+            review = form.save()
+
+        self.assertEqual(sign.call_count, 1)
+        self.assertTrue(
+            ReviewSignature.objects.filter(review_post=review).exists(),
+        )
+
+    def test_short_bodies_not_indexed(self):
+        """Test short reviews get no signature."""
+        review = self.review(self.books[0], 'Loved it!')
+
+        self.assertIsNone(duplicates.signature('Loved it!'))
+        self.assertFalse(
+            ReviewSignature.objects.filter(review_post=review).exists(),
+        )
+
+    def test_copy_flagged_on_save(self):
+        """Test a pasted copy is flagged against the first review."""
+        first = self.review(self.books[0], SPAM)
+        self.review(self.books[1], ORIGINAL)
+
+        copy = self.review(self.books[2], SPAM.upper() + '.')
+
+        signature = ReviewSignature.objects.get(review_post=copy)
+        self.assertEqual(signature.duplicate_of, first)
+        self.assertEqual(signature.similarity, 1.0)
+        self.assertIsNone(
+            ReviewSignature.objects.get(review_post=first).duplicate_of,
+        )
+        self.assertFalse(SignatureBucket.objects.filter(review_post=copy))
+
+    def test_copies_compared_with_original_only(self):
+        """Test later copies match the original, not earlier copies."""
+        first = self.review(self.books[0], SPAM)
+        self.review(self.books[1], SPAM + ' now')
+
+        _, match = duplicates.find_duplicate(SPAM)
+
+        self.assertEqual(match[0], first.pk)
+        self.assertEqual(
+            list(duplicates._candidates(
+                duplicates.band_keys(duplicates.signature(SPAM)),
+            )),
+            [first.pk],
+        )
+
+    def test_candidates_capped(self):
+        """Test a lookup takes the reviews sharing most bands first."""
+        with self.settings(REVIEW_DUPLICATE_ACTION='off'):
+            exact = self.review(self.books[0], SPAM)
+            close = self.review(self.books[1], SPAM + ' now')
+        keys = duplicates.band_keys(duplicates.signature(SPAM))
+
+        self.assertCountEqual(
+            duplicates._candidates(keys), [exact.pk, close.pk],
+        )
+        self.assertEqual(
+            list(duplicates._candidates(keys, limit=1)), [exact.pk],
+        )
+
+    def test_lookup_is_one_query(self):
+        """Test a check probes the buckets and fetches signatures at once."""
+        for book in self.books:
+            self.review(book, f'{ORIGINAL} {book.title}')
+
+        with self.assertNumQueries(1):
+            _, match = duplicates.find_duplicate(SPAM)
+
+        self.assertIsNone(match)
+
+    @override_settings(REVIEW_DUPLICATE_ACTION='reject')
+    def test_copy_rejected(self):
+        """Test 'reject' refuses the copy and leaves no row behind."""
+        self.review(self.books[0], SPAM)
+
+        with self.assertRaises(duplicates.DuplicateReview):
+            self.review(self.books[1], SPAM)
+
+        self.assertEqual(ReviewPost.objects.count(), 1)
+
+    def test_edit_reindexes_without_matching_itself(self):
+        """Test editing a review replaces its buckets."""
+        review = self.review(self.books[0], SPAM)
+        review = ReviewPost.objects.with_content().get(pk=review.pk)
+        review.review_content = ORIGINAL
+        review.save()
+
+        signature = ReviewSignature.objects.get(review_post=review)
+        self.assertIsNone(signature.duplicate_of)
+        self.assertEqual(
+            bytes(signature.signature), duplicates.signature(ORIGINAL),
+        )
+        self.assertEqual(
+            SignatureBucket.objects.filter(review_post=review).count(),
+            duplicates.BANDS,
+        )
+
+    def test_backfill_command(self):
+        """Test the command indexes reviews in batches and flags copies."""
+        with self.settings(REVIEW_DUPLICATE_ACTION='off'):
+            reviews = [
+                self.review(self.books[0], SPAM),
+                self.review(self.books[1], ORIGINAL),
+                self.review(self.books[2], SPAM),
+                self.review(self.books[3], SPAM + ' now'),
+            ]
+        ReviewSignature.objects.all().delete()
+        SignatureBucket.objects.all().delete()
+        out = StringIO()
+
+        call_command('index_review_signatures', batch_size=2, stdout=out)
+
+        self.assertIn('Indexed 4 reviews, 2 flagged', out.getvalue())
+        flagged = dict(ReviewSignature.objects.values_list(
+            'review_post_id', 'duplicate_of_id',
+        ))
+        self.assertEqual(flagged, {
+            reviews[0].pk: None,
+            reviews[1].pk: None,
+            reviews[2].pk: reviews[0].pk,
+            reviews[3].pk: reviews[0].pk,
+        })
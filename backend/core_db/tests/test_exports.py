@@ -0,0 +1,87 @@
+"""
+Tests for the streaming review and book exports.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core_db import exports, purge
+from core_db.models import Book, Genre, ReviewPost
+
+
+class ExportTests(TestCase):
+    """Test exporting reviews and books."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='reader@example.com',
+            password='Django@123',
+            first_name='Avid',
+            last_name='Reader',
+        )
+        fantasy = Genre.objects.create(name='Fantasy', is_approved=True)
+        classic = Genre.objects.create(name='Classic', is_approved=True)
+        for i in range(5):
+            book = Book.objects.create(title=f'Book {i}', author='Author')
+            book.genres.add(fantasy, classic)
+            ReviewPost.objects.create(
+                reviewer=cls.user,
+                book=book,
+                review_title=f'Review {i}',
+                review_content='Line one,\nline "two".',
+                rating=4,
+            )
+
+    def test_review_rows_do_not_query_per_row(self):
+        """Test genres are fetched once per batch, not once per review."""
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(exports.review_rows(chunk_size=2))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['reviewer_slug'], 'avid-reader')
+        self.assertCountEqual(rows[0]['book_genres'], ['Fantasy', 'Classic'])
+        # The cursor plus one genre query for each of the three batches.
+        self.assertLessEqual(len(ctx.captured_queries), 1 + 3 + 2)
+
+    def test_soft_deleted_reviews_not_exported(self):
+        """Test reviews of soft-deleted users are left out."""
+        purge.soft_delete_user(self.user)
+
+        self.assertEqual(list(exports.review_rows()), [])
+
+    def test_export_reviews_csv_to_stdout(self):
+        """Test the CSV export round-trips through the csv module."""
+        out = io.StringIO()
+        call_command('export_reviews', stdout=out)
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['review_content'], 'Line one,\nline "two".')
+        self.assertEqual(
+            set(rows[0]['book_genres'].split('|')), {'Fantasy', 'Classic'},
+        )
+
+    def test_export_books_gzipped_jsonl(self):
+        """Test the gzip JSON Lines export of the catalog."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'books.jsonl.gz')
+            call_command(
+                'export_books', '--format', 'jsonl', '--gzip',
+                '--output', path, stderr=io.StringIO(),
+            )
+            with gzip.open(path, 'rt') as export_file:
+                books = [json.loads(line) for line in export_file]
+
+        self.assertEqual(len(books), 5)
+        self.assertEqual(books[0]['title'], 'Book 0')
+        self.assertCountEqual(books[0]['genres'], ['Fantasy', 'Classic'])
@@ -1,6 +1,10 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.db.utils import IntegrityError
-from backend.core_db.models import Genre
+from core_db import genre_counts
+from core_db.models import Book, BookGenre, Genre, ReviewPost, Task
 
 class GenreModelTests(TestCase):
     """Test suite for the Genre model."""
@@ -39,4 +43,133 @@ class GenreModelTests(TestCase):
     def test_approved_genre_string_representation(self):
         """Test that approved genres don't show the (Pending) suffix."""
         genre = Genre.objects.get(name="History")
-        self.assertEqual(str(genre), "History")
\ No newline at end of file
+        self.assertEqual(str(genre), "History")
+
+class GenreCountsAndFilterTests(TestCase):
+    """Test the denormalized genre counts and the multi-genre filters."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass',
+        )
+        self.fantasy = Genre.objects.create(name='Fantasy', is_approved=True)
+        self.epic = Genre.objects.create(name='Epic', is_approved=True)
+        self.pending = Genre.objects.create(name='Grimdark')
+        self.both = Book.objects.create(title='Both', author='A')
+        self.both.genres.add(self.fantasy, self.epic)
+        self.fantasy_only = Book.objects.create(title='Fantasy', author='B')
+        self.fantasy_only.genres.add(self.fantasy)
+        self.pending_only = Book.objects.create(title='Pending', author='C')
+        self.pending_only.genres.add(self.pending)
+        self.no_genres = Book.objects.create(title='None', author='D')
+
+    def counts(self, genre):
+        genre.refresh_from_db()
+        return genre.book_count, genre.review_count
+
+    def review(self, book):
+        return ReviewPost.objects.create(
+            reviewer=self.user, book=book, review_content='Good.', rating=4,
+        )
+
+    def test_book_count_follows_links(self):
+        """Test adding, removing and clearing genres keeps book_count."""
+        self.assertEqual(self.counts(self.fantasy), (2, 0))
+
+        self.no_genres.genres.add(self.fantasy)
+        self.assertEqual(self.counts(self.fantasy), (3, 0))
+        self.fantasy.books.remove(self.both)
+        self.assertEqual(self.counts(self.fantasy), (2, 0))
+        self.fantasy_only.genres.clear()
+        self.assertEqual(self.counts(self.fantasy), (1, 0))
+        BookGenre.objects.create(book=self.pending_only, genre=self.fantasy)
+        self.assertEqual(self.counts(self.fantasy), (2, 0))
+        self.no_genres.delete()
+        self.assertEqual(self.counts(self.fantasy), (1, 0))
+
+    def refresh(self):
+        """Run the genre count refresh without waiting for its task."""
+        genre_counts.refresh_genre_counts()
+
+    def test_review_count_follows_reviews(self):
+        """Test reviews of a book count towards each of its genres."""
+        updated_at = self.fantasy.updated_at
+        review = self.review(self.both)
+        self.review(self.fantasy_only)
+
+        self.assertEqual(self.counts(self.fantasy), (2, 0))
+        self.refresh()
+        self.assertEqual(self.counts(self.fantasy), (2, 2))
+        self.assertEqual(self.counts(self.epic), (1, 1))
+        self.assertEqual(self.fantasy.updated_at, updated_at)
+
+        review.delete()
+        self.refresh()
+        self.assertEqual(self.counts(self.fantasy), (2, 1))
+        self.assertEqual(self.counts(self.epic), (1, 0))
+
+    def test_review_writes_leave_genres_alone(self):
+        """Test a review write queues one refresh and updates no genre."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.review(self.both)
+            self.review(self.fantasy_only)
+
+        self.assertFalse([
+            query for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE "core_db_genre"')
+        ])
+        self.assertEqual(
+            Task.objects.filter(name='refresh_genre_counts').count(), 1,
+        )
+
+    def test_links_carry_their_reviews(self):
+        """Test linking a reviewed book adds its reviews at once."""
+        self.review(self.no_genres)
+        ReviewPost.objects.create(
+            reviewer=get_user_model().objects.create_user(
+                email='critic@example.com', password='pass',
+            ),
+            book=self.no_genres, review_content='Fine.', rating=3,
+        )
+
+        self.no_genres.genres.add(self.epic)
+        self.assertEqual(self.counts(self.epic), (2, 2))
+        BookGenre.objects.create(book=self.no_genres, genre=self.pending)
+        self.assertEqual(self.counts(self.pending), (2, 2))
+        self.epic.books.remove(self.no_genres)
+        self.assertEqual(self.counts(self.epic), (1, 0))
+
+    def test_refresh_counts(self):
+        """Test refresh_counts recomputes counts drifted from the links."""
+        self.review(self.both)
+        Genre.objects.update(book_count=0, review_count=0)
+
+        Genre.objects.refresh_counts([self.fantasy.pk, self.epic.pk])
+
+        self.assertEqual(self.counts(self.fantasy), (2, 1))
+        self.assertEqual(self.counts(self.epic), (1, 1))
+
+    def test_in_genres(self):
+        """Test any and all matching of several genres."""
+        genre_ids = [self.fantasy.pk, self.epic.pk]
+
+        self.assertCountEqual(
+            Book.objects.in_genres(genre_ids),
+            [self.both, self.fantasy_only],
+        )
+        self.assertCountEqual(
+            Book.objects.in_genres(genre_ids, match_all=True), [self.both],
+        )
+
+    def test_exclude_unapproved_only(self):
+        """Test books with only pending genres are left out."""
+        self.assertCountEqual(
+            Book.objects.exclude_unapproved_only(),
+            [self.both, self.fantasy_only, self.no_genres],
+        )
+
+        self.pending_only.genres.add(self.epic)
+
+        self.assertIn(
+            self.pending_only, Book.objects.exclude_unapproved_only(),
+        )
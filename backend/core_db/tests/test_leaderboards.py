@@ -0,0 +1,124 @@
+"""
+Tests for the materialized genre and author leaderboards.
+"""
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core_db import purge
+from core_db.models import (
+    AuthorLeaderboard, Book, Genre, GenreLeaderboard, ReviewPost,
+)
+
+
+class LeaderboardTests(TestCase):
+    """Test leaderboards read from refreshed materialized views."""
+
+    def setUp(self):
+        self.fantasy = Genre.objects.create(name='Fantasy', is_approved=True)
+        self.hobbit = Book.objects.create(
+            title='The Hobbit', author='J.R.R. Tolkien',
+        )
+        self.rings = Book.objects.create(
+            title='The Fellowship of the Ring', author='J.R.R. Tolkien',
+        )
+        self.earthsea = Book.objects.create(
+            title='A Wizard of Earthsea', author='Ursula K. Le Guin',
+        )
+        for book in (self.hobbit, self.rings, self.earthsea):
+            book.genres.add(self.fantasy)
+
+        ratings = [
+            (self.hobbit, [5, 5, 4]),
+            (self.rings, [3]),
+            (self.earthsea, [5, 4]),
+        ]
+        for book, stars in ratings:
+            for i, rating in enumerate(stars):
+                reviewer = get_user_model().objects.create_user(
+                    email=f'{book.pk}-{i}@example.com', password='pass',
+                )
+                ReviewPost.objects.create(
+                    reviewer=reviewer, book=book,
+                    review_content='...', rating=rating,
+                )
+        old_review = ReviewPost.objects.filter(book=self.rings).get()
+        ReviewPost.objects.filter(pk=old_review.pk).update(
+            review_date=timezone.now() - datetime.timedelta(days=90),
+        )
+
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+    def test_genre_leaderboard(self):
+        """Test books are ranked per genre by rating, count and activity."""
+        board = GenreLeaderboard.objects.filter(genre=self.fantasy)
+
+        self.assertEqual(
+            [row.book for row in board.top_rated()],
+            [self.hobbit, self.earthsea, self.rings],
+        )
+        self.assertEqual(
+            [row.book for row in board.top_rated(min_reviews=2)],
+            [self.hobbit, self.earthsea],
+        )
+        self.assertEqual(board.most_reviewed().first().book, self.hobbit)
+        self.assertNotIn(self.rings, [row.book for row in board.trending()])
+
+    def test_author_leaderboard(self):
+        """Test authors are aggregated across their books."""
+        tolkien = AuthorLeaderboard.objects.get(author='J.R.R. Tolkien')
+
+        self.assertEqual(tolkien.book_count, 2)
+        self.assertEqual(tolkien.review_count, 4)
+        self.assertEqual(tolkien.average_rating, 4.25)
+        self.assertEqual(tolkien.recent_review_count, 3)
+        self.assertEqual(
+            AuthorLeaderboard.objects.most_reviewed().first(), tolkien,
+        )
+
+    def test_refresh_picks_up_new_reviews(self):
+        """Test the views only change when refreshed."""
+        reviewer = get_user_model().objects.create_user(
+            email='late@example.com', password='pass',
+        )
+        ReviewPost.objects.create(
+            reviewer=reviewer, book=self.rings,
+            review_content='...', rating=5,
+        )
+        row = GenreLeaderboard.objects.get(book=self.rings)
+        self.assertEqual(row.review_count, 1)
+
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+        row = GenreLeaderboard.objects.get(book=self.rings)
+        self.assertEqual(row.review_count, 2)
+        self.assertEqual(row.average_rating, 4)
+
+    def test_deleted_reviews_not_counted(self):
+        """Test soft-deleted reviews drop out of both leaderboards."""
+        purge.soft_delete_review(
+            ReviewPost.objects.filter(book=self.hobbit, rating=4).get(),
+        )
+
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+        row = GenreLeaderboard.objects.get(book=self.hobbit)
+        self.assertEqual(row.review_count, 2)
+        self.assertEqual(row.average_rating, 5)
+        tolkien = AuthorLeaderboard.objects.get(author='J.R.R. Tolkien')
+        self.assertEqual(tolkien.review_count, 3)
+
+    def test_rows_keep_their_pk_across_refreshes(self):
+        """Test a genre row keeps its pk when rows before it go."""
+        pk = GenreLeaderboard.objects.get(book=self.earthsea).pk
+        self.hobbit.genres.remove(self.fantasy)
+
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+        self.assertEqual(
+            GenreLeaderboard.objects.get(pk=pk).book, self.earthsea,
+        )
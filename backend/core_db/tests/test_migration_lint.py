@@ -0,0 +1,152 @@
+"""
+Tests for the lock-safe migration operations and the migration linter.
+"""
+from django.apps import apps
+from django.core.management import call_command
+from django.db import (
+    IntegrityError,
+    connection,
+    migrations,
+    models,
+    transaction,
+)
+from django.db.migrations.state import ProjectState
+from django.test import TestCase
+
+from core_db import migration_ops
+from core_db.migration_lint import lint_migration
+from core_db.models import Book
+
+
+def make_migration(operations, atomic=True):
+    migration = migrations.Migration('0999_test', 'core_db')
+    migration.operations = operations
+    migration.atomic = atomic
+    return migration
+
+
+class MigrationLintTests(TestCase):
+    """Test unsafe operations are flagged and safe ones let through."""
+
+    def messages(self, operations, atomic=True):
+        return [
+            problem.message
+            for problem in lint_migration(make_migration(operations, atomic))
+        ]
+
+    def test_blocking_index_and_constraint_flagged(self):
+        index = models.Index(fields=['title'], name='book_title_idx')
+        unique = models.UniqueConstraint(fields=['slug'], name='u_slug')
+        problems = self.messages([
+            migrations.AddIndex('book', index),
+            migrations.AddConstraint('book', unique),
+            migrations.RunSQL('CREATE INDEX x ON core_db_book (title)'),
+        ])
+
+        self.assertEqual(len(problems), 3)
+        self.assertIn('AddIndexConcurrently', problems[0])
+        self.assertIn('AddUniqueConstraintConcurrently', problems[1])
+
+    def test_safe_operations_pass(self):
+        index = models.Index(fields=['title'], name='book_title_idx')
+        check = models.CheckConstraint(
+            check=models.Q(review_count__gte=0), name='count_positive',
+        )
+        problems = self.messages([
+            migration_ops.AddIndexConcurrently('book', index),
+            migration_ops.AddConstraintNotValid('book', check),
+            migration_ops.ValidateConstraint('book', 'count_positive'),
+            migration_ops.BatchedBackfill('book', {'review_count': 0}),
+            migrations.RunSQL(
+                'CREATE INDEX CONCURRENTLY x ON core_db_book (title)',
+            ),
+        ], atomic=False)
+
+        self.assertEqual(problems, [])
+
+    def test_new_model_operations_pass(self):
+        """Test indexes on a table created in the same migration pass."""
+        problems = self.messages([
+            migrations.CreateModel('Shelf', fields=[
+                ('id', models.BigAutoField(primary_key=True)),
+                ('name', models.CharField(max_length=50)),
+            ]),
+            migrations.AddIndex(
+                'shelf', models.Index(fields=['name'], name='shelf_idx'),
+            ),
+        ])
+
+        self.assertEqual(problems, [])
+
+    def test_foreign_key_and_atomic_backfill_flagged(self):
+        problems = self.messages([
+            migrations.AddField('book', 'owner', models.ForeignKey(
+                'core_db.User', null=True, on_delete=models.SET_NULL,
+            )),
+            migrations.RunPython(migrations.RunPython.noop),
+        ])
+
+        self.assertIn('AddConstraintNotValid', problems[0])
+        self.assertIn('BatchedBackfill', problems[1])
+
+    def test_alter_field_flagged_only_for_schema_changes(self):
+        """Test help_text edits pass while type changes are flagged."""
+        state = ProjectState()
+        migrations.CreateModel('Shelf', fields=[
+            ('id', models.BigAutoField(primary_key=True)),
+            ('name', models.CharField(max_length=50)),
+        ]).state_forwards('core_db', state)
+        migration = make_migration([
+            migrations.AlterField(
+                'shelf', 'name',
+                models.CharField(max_length=50, help_text='Shelf name'),
+            ),
+            migrations.AlterField('shelf', 'name', models.TextField()),
+        ])
+
+        problems = lint_migration(migration, state)
+
+        self.assertEqual(len(problems), 1)
+        self.assertIn('AlterField', problems[0].message)
+
+    def test_project_migrations_pass(self):
+        """Test every migration outside the baseline is lock-safe."""
+        call_command('lint_migrations')
+
+
+class MigrationOperationTests(TestCase):
+    """Test NOT VALID constraints and batched backfills."""
+
+    def test_not_valid_check_then_validate(self):
+        """Test old rows are skipped until the constraint is validated."""
+        book = Book.objects.create(title='Dune', author='Frank Herbert')
+        Book.objects.filter(pk=book.pk).update(title='')
+        check = models.CheckConstraint(
+            check=~models.Q(title=''), name='book_title_not_empty',
+        )
+        state = ProjectState.from_apps(apps)
+        new_state = state.clone()
+        add = migration_ops.AddConstraintNotValid('book', check)
+        add.state_forwards('core_db', new_state)
+
+        with connection.schema_editor(atomic=False) as editor:
+            add.database_forwards('core_db', editor, state, new_state)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            with connection.schema_editor(atomic=False) as editor:
+                migration_ops.ValidateConstraint(
+                    'book', 'book_title_not_empty',
+                ).database_forwards('core_db', editor, new_state, new_state)
+
+    def test_backfill_in_batches(self):
+        for i in range(5):
+            Book.objects.create(title=f'Book {i}', author='Anon')
+
+        updated = migration_ops.backfill(
+            Book.objects.filter(author='Anon'), {'review_count': 7},
+            batch_size=2, pause=0,
+        )
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(
+            set(Book.objects.values_list('review_count', flat=True)), {7},
+        )
@@ -0,0 +1,161 @@
+"""
+Tests for coalesced reaction and comment notifications.
+"""
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core_db import notifications, purge, tasks
+from core_db.models import (
+    Book,
+    Comment,
+    Notification,
+    Reaction,
+    ReviewPost,
+    Task,
+)
+
+
+class NotificationTests(TestCase):
+    """Test events are coalesced into inbox rows, counters and digests."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user(
+            email='author@example.com', password='pass',
+        )
+        self.fans = [
+            User.objects.create_user(
+                email=f'fan{i}@example.com', password='pass',
+            )
+            for i in range(3)
+        ]
+        self.review = ReviewPost.objects.create(
+            reviewer=self.author,
+            book=Book.objects.create(title='Dune', author='Frank Herbert'),
+            review_content='Spice.',
+            rating=5,
+        )
+
+    def react(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(
+                user=user, review_post=self.review, reaction_type='LOVE',
+            )
+
+    def deliver(self):
+        """Close the current window and run the due deliveries."""
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+
+    def test_reactions_coalesced_into_one_notification(self):
+        """Test a window of reactions queues one task and one row."""
+        for fan in self.fans:
+            self.react(fan)
+
+        self.assertEqual(
+            Task.objects.filter(name='deliver_notification').count(), 1,
+        )
+        self.deliver()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.actor_count, 3)
+        self.assertIn('3 people reacted to your review', notification.message)
+        self.assertEqual(notifications.counts(self.author), (1, 1))
+
+    def test_delivery_waits_for_window_to_close(self):
+        """Test nothing is written before the window ends."""
+        self.react(self.fans[0])
+
+        tasks.run_pending()
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_own_reaction_not_notified(self):
+        """Test reviewers are not told about their own reactions."""
+        self.react(self.author)
+
+        self.assertFalse(
+            Task.objects.filter(name='deliver_notification').exists(),
+        )
+
+    def test_comments_notified_separately(self):
+        """Test comments get their own notification kind."""
+        self.react(self.fans[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                user=self.fans[1], review_post=self.review, content='Yes!',
+            )
+        self.deliver()
+
+        kinds = set(Notification.objects.values_list('kind', flat=True))
+        self.assertEqual(kinds, {'REACTION', 'COMMENT'})
+        comment = Notification.objects.get(kind='COMMENT')
+        self.assertEqual(comment.message, (
+            f'{self.fans[1].slug} commented on your review "{self.review}"'
+        ))
+        self.assertEqual(notifications.counts(self.author), (2, 2))
+
+    def test_mark_read_updates_counter(self):
+        """Test marking read keeps the unread counter in step."""
+        self.react(self.fans[0])
+        self.deliver()
+
+        self.assertEqual(notifications.mark_read(self.author), 1)
+        self.assertEqual(notifications.counts(self.author), (0, 1))
+        self.assertEqual(notifications.mark_read(self.author), 0)
+
+    def test_hard_delete_updates_counter(self):
+        """Test notifications deleted by cascade leave the counter."""
+        self.react(self.fans[0])
+        self.deliver()
+        other = ReviewPost.objects.create(
+            reviewer=self.author,
+            book=Book.objects.create(title='Emma', author='Jane Austen'),
+            review_content='Witty.',
+            rating=4,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                user=self.fans[1], review_post=other, content='Yes.',
+            )
+        self.deliver()
+        notifications.mark_read(self.author, [
+            Notification.objects.get(review_post=other).pk,
+        ])
+        self.assertEqual(notifications.counts(self.author), (1, 2))
+
+        ReviewPost.objects.filter(pk=self.review.pk).delete()
+        self.assertEqual(notifications.counts(self.author), (0, 1))
+        other.delete()
+        self.assertEqual(notifications.counts(self.author), (0, 0))
+
+    def test_counts_take_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(notifications.counts(self.author), (0, 0))
+
+    def test_digest_emails_once(self):
+        """Test digests are batched and each notification mailed once."""
+        self.react(self.fans[0])
+        self.deliver()
+
+        call_command('send_notification_digests', '--batch-size', '1')
+        call_command('send_notification_digests')
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.author.email])
+        self.assertIn('reacted to your review', mail.outbox[0].body)
+        self.assertTrue(Notification.objects.get().emailed)
+
+    def test_no_digest_for_deleted_users(self):
+        """Test soft-deleted recipients are not emailed."""
+        self.react(self.fans[0])
+        self.deliver()
+        purge.soft_delete_user(self.author)
+
+        call_command('send_notification_digests')
+
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,171 @@
+"""
+Tests for the time-partitioned comment table.
+"""
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core_db import partitions
+from core_db.models import Book, Comment, ReviewPost
+
+TABLE = 'core_db_comment'
+
+
+class PartitionTests(TestCase):
+    """Test comments are stored in monthly partitions."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='reader@example.com',
+            password='Django@123',
+        )
+        book = Book.objects.create(title='Dune', author='Frank Herbert')
+        self.review = ReviewPost.objects.create(
+            reviewer=user, book=book, review_content='Spice!', rating=5,
+        )
+        self.user = user
+
+    def create_comment(self, created_at):
+        comment = Comment.objects.create(
+            user=self.user, review_post=self.review, content='Agreed.',
+        )
+        Comment.objects.filter(pk=comment.pk).update(created_at=created_at)
+        return comment
+
+    def partition_of(self, comment):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM {TABLE} WHERE id = %s',
+                [comment.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_new_comment_lands_in_current_partition(self):
+        """Test rows are routed to the partition of their month."""
+        comment = Comment.objects.create(
+            user=self.user, review_post=self.review, content='First!',
+        )
+
+        expected = partitions.partition_name(
+            TABLE,
+            partitions.bucket_start(comment.created_at, 'month'),
+            'month',
+        )
+        self.assertEqual(self.partition_of(comment), expected)
+
+    def test_ensure_partitions_moves_rows_out_of_default(self):
+        """Test creating a partition adopts rows parked in the default."""
+        far_future = timezone.make_aware(datetime.datetime(2099, 3, 15))
+        comment = self.create_comment(far_future)
+        self.assertEqual(self.partition_of(comment), f'{TABLE}_default')
+
+        created = partitions.ensure_partitions(
+            TABLE, ahead=0, today=datetime.date(2099, 3, 1),
+        )
+
+        self.assertEqual(created, [f'{TABLE}_p2099_03'])
+        self.assertEqual(self.partition_of(comment), f'{TABLE}_p2099_03')
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_manage_partitions_detaches_expired(self):
+        """Test the command archives partitions past retention."""
+        with connection.cursor() as cursor:
+            partitions.create_partition(
+                cursor, TABLE, datetime.date(2001, 1, 1), 'month',
+            )
+        old = self.create_comment(
+            timezone.make_aware(datetime.datetime(2001, 1, 10)),
+        )
+
+        out = io.StringIO()
+        call_command('manage_partitions', '--retain', '240', stdout=out)
+
+        self.assertIn(f'Detached partition {TABLE}_p2001_01', out.getvalue())
+        self.assertFalse(Comment.objects.filter(pk=old.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {TABLE}_p2001_01')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_detached_partition_does_not_block_deletes(self):
+        """Test reviews with archived comments can still be deleted."""
+        with connection.cursor() as cursor:
+            partitions.create_partition(
+                cursor, TABLE, datetime.date(2001, 1, 1), 'month',
+            )
+        self.create_comment(
+            timezone.make_aware(datetime.datetime(2001, 1, 10)),
+        )
+        partitions.detach_old_partitions(TABLE, retain=240)
+
+        ReviewPost._base_manager.filter(pk=self.review.pk).delete()
+        get_user_model()._base_manager.filter(pk=self.user.pk).delete()
+
+        with connection.cursor() as cursor:
+            # Check the deferred foreign keys now instead of at commit.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(f'SELECT COUNT(*) FROM {TABLE}_p2001_01')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class PartitionTableTests(TransactionTestCase):
+    """Test a plain table is converted while keeping its rows.
+
+    partition_table() commits batches of its own, hence
+    TransactionTestCase.
+    """
+
+    def test_partition_table_copies_rows_in_batches(self):
+        """Test rows end up in their partitions, with indexes and triggers."""
+        user = get_user_model().objects.create_user(
+            email='reader@example.com', password='Django@123',
+        )
+        book = Book.objects.create(title='Dune', author='Frank Herbert')
+        review = ReviewPost.objects.create(
+            reviewer=user, book=book, review_content='Spice!', rating=5,
+        )
+        with connection.schema_editor() as editor:
+            partitions.unpartition_table(editor, TABLE)
+        comments = [
+            Comment.objects.create(
+                user=user, review_post=review, content=f'Comment {i}',
+            )
+            for i in range(5)
+        ]
+        old = comments[0]
+        Comment.objects.filter(pk=old.pk).update(
+            created_at=timezone.make_aware(datetime.datetime(2020, 2, 3)),
+        )
+
+        with connection.schema_editor(atomic=False) as editor:
+            partitions.partition_table(editor, TABLE, batch_size=2)
+
+        self.assertEqual(Comment.objects.count(), 5)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM {TABLE} WHERE id = %s',
+                [old.pk],
+            )
+            self.assertEqual(cursor.fetchone()[0], f'{TABLE}_p2020_02')
+            cursor.execute(
+                'SELECT indexname FROM pg_indexes WHERE tablename = %s',
+                [TABLE],
+            )
+            indexes = {name for (name,) in cursor.fetchall()}
+            cursor.execute(
+                'SELECT tgname FROM pg_trigger WHERE tgrelid = %s::regclass',
+                [TABLE],
+            )
+            triggers = {name for (name,) in cursor.fetchall()}
+        self.assertIn(f'{TABLE}_pkey', indexes)
+        self.assertIn('comment_created_id_idx', indexes)
+        self.assertIn(f'{TABLE}_changes', triggers)
+        self.assertNotIn(f'{TABLE}_new_mirror', triggers)
+        new = Comment.objects.create(
+            user=user, review_post=review, content='After.',
+        )
+        self.assertGreater(new.pk, comments[-1].pk)
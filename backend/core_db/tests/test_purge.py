@@ -0,0 +1,228 @@
+"""
+Tests for soft deletion and the background purge.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import authentication
+
+from core_db import notifications, purge, tasks
+from core_db.models import (
+    Book,
+    Comment,
+    Notification,
+    Reaction,
+    ReviewPost,
+    Task,
+)
+
+
+class SoftDeleteTests(TestCase):
+    """Test soft-deleted rows vanish at once and are purged later."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user(
+            email='author@example.com', password='pass',
+        )
+        self.fan = User.objects.create_user(
+            email='fan@example.com', password='pass',
+        )
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author='Anon')
+            for i in range(3)
+        ]
+        self.reviews = []
+        for book in self.books:
+            review = ReviewPost.objects.create(
+                reviewer=self.author, book=book,
+                review_content='Good.', rating=4,
+            )
+            Reaction.objects.create(
+                user=self.fan, review_post=review, reaction_type='LIKE',
+            )
+            Comment.objects.create(
+                user=self.fan, review_post=review, content='Agreed.',
+            )
+            self.reviews.append(review)
+        self.fan_review = ReviewPost.objects.create(
+            reviewer=self.fan, book=self.books[0],
+            review_content='Fine.', rating=3,
+        )
+        Comment.objects.create(
+            user=self.author, review_post=self.fan_review, content='Hm.',
+        )
+
+    def purge(self):
+        return tasks.run_pending()
+
+    def test_soft_deleted_review_hidden_and_uncounted(self):
+        """Test a review disappears from reads and its book's count."""
+        review = self.reviews[0]
+        purge.soft_delete_review(review)
+
+        self.assertFalse(ReviewPost.objects.filter(pk=review.pk).exists())
+        self.assertFalse(Comment.objects.filter(
+            review_post__in=ReviewPost.objects.all(), review_post=review,
+        ))
+        self.books[0].refresh_from_db()
+        self.assertEqual(self.books[0].review_count, 1)
+        self.assertTrue(
+            ReviewPost._base_manager.filter(pk=review.pk).exists(),
+        )
+
+    def test_purge_review_keeps_counter(self):
+        """Test the purge deletes rows without uncounting twice."""
+        purge.soft_delete_review(self.reviews[0])
+
+        self.assertEqual(self.purge(), 1)
+
+        self.assertFalse(
+            ReviewPost._base_manager.filter(pk=self.reviews[0].pk).exists(),
+        )
+        self.assertEqual(
+            Reaction._base_manager.filter(review_post=self.reviews[0].pk)
+            .count(), 0,
+        )
+        self.books[0].refresh_from_db()
+        self.assertEqual(self.books[0].review_count, 1)
+
+    def test_soft_deleted_user_hidden_at_once(self):
+        """Test a user's account, reviews and comments vanish from reads."""
+        purge.soft_delete_user(self.author)
+
+        User = get_user_model()
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(ReviewPost.objects.filter(reviewer=self.author))
+        self.assertFalse(
+            Comment.objects.by_live_users().filter(user=self.author),
+        )
+        self.assertEqual(ReviewPost.objects.count(), 1)
+        self.assertFalse(
+            User._base_manager.get(pk=self.author.pk).is_active,
+        )
+        self.assertIsNone(authentication.load_claims(self.author.pk))
+
+    def test_review_queries_not_joined(self):
+        """Test default review reads leave the users table alone."""
+        sql = str(ReviewPost.objects.filter(book=self.books[0]).query)
+        self.assertNotIn('JOIN', sql)
+
+    def test_book_reviewed_again_after_delete(self):
+        """Test only live reviews count towards one per user and book."""
+        purge.soft_delete_review(self.reviews[0])
+
+        ReviewPost.objects.create(
+            reviewer=self.author, book=self.books[0],
+            review_content='Second thoughts.', rating=2,
+        )
+
+        self.assertEqual(
+            ReviewPost._base_manager.filter(
+                reviewer=self.author, book=self.books[0],
+            ).count(), 2,
+        )
+
+    def test_interaction_queries_not_joined(self):
+        """Test reaction and comment reads leave users and reviews alone."""
+        for model in (Reaction, Comment):
+            sql = str(model.objects.filter(review_post=self.reviews[0]).query)
+            self.assertNotIn('JOIN', sql)
+
+    def test_purge_user_removes_everything(self):
+        """Test the purge clears the user's rows and fixes counters."""
+        purge.soft_delete_user(self.author)
+
+        self.purge()
+
+        User = get_user_model()
+        self.assertFalse(
+            User._base_manager.filter(pk=self.author.pk).exists(),
+        )
+        self.assertEqual(ReviewPost._base_manager.count(), 1)
+        self.assertEqual(Reaction._base_manager.count(), 0)
+        self.assertEqual(Comment._base_manager.count(), 0)
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list(
+                'review_count', flat=True,
+            )),
+            [1, 0, 0],
+        )
+
+    def test_purge_updates_notification_counters(self):
+        """Test deleting a review also takes its notifications off the
+        recipient's counters."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(
+                user=self.author, review_post=self.fan_review,
+                reaction_type='LOVE',
+            )
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        self.assertEqual(notifications.counts(self.fan), (1, 1))
+
+        purge.soft_delete_review(self.fan_review)
+        self.purge()
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(notifications.counts(self.fan), (0, 0))
+
+    def test_admin_delete_books_purges_reviews(self):
+        """Test the bulk action deletes books with their reviews."""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='Django@123',
+        )
+        self.client.force_login(admin)
+
+        res = self.client.post(reverse('admin:core_db_book_changelist'), {
+            'action': 'delete_books',
+            '_selected_action': [self.books[0].pk, self.books[1].pk],
+        })
+        self.assertEqual(res.status_code, 302)
+        self.assertTrue(Book.objects.filter(pk=self.books[0].pk).exists())
+
+        self.purge()
+
+        self.assertEqual(
+            list(Book.objects.values_list('pk', flat=True)),
+            [self.books[2].pk],
+        )
+        self.assertEqual(
+            list(ReviewPost._base_manager.values_list('pk', flat=True)),
+            [self.reviews[2].pk],
+        )
+        self.assertEqual(Reaction._base_manager.count(), 1)
+        self.assertEqual(Comment._base_manager.count(), 1)
+
+    def test_delete_account_endpoint(self):
+        """Test DELETE /api/me/ soft-deletes and queues the purge."""
+        client = APIClient()
+        client.force_authenticate(self.author)
+
+        res = client.delete(reverse('api:me'))
+
+        self.assertEqual(res.status_code, 204)
+        self.assertTrue(Task.objects.filter(name='purge_user').exists())
+
+    def test_admin_delete_is_soft(self):
+        """Test deleting through the admin only hides the review."""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='Django@123',
+        )
+        self.client.force_login(admin)
+        url = reverse(
+            'admin:core_db_reviewpost_delete', args=[self.reviews[1].pk],
+        )
+
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertTrue(
+            ReviewPost._base_manager.filter(pk=self.reviews[1].pk).exists(),
+        )
+        self.assertFalse(
+            ReviewPost.objects.filter(pk=self.reviews[1].pk).exists(),
+        )
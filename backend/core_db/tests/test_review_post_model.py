@@ -0,0 +1,109 @@
+"""
+Tests for the ReviewPost model.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core_db.models import Book, ReviewPost
+
+
+class ReviewPostModelTests(TestCase):
+    """Test the ReviewPost model."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com',
+            password='Django@123',
+        )
+        self.book = Book.objects.create(title='Dune', author='Frank Herbert')
+
+    def create_review(self, **params):
+        defaults = {
+            'reviewer': self.user,
+            'book': self.book,
+            'review_content': 'Fear is the mind-killer.',
+            'rating': 5,
+        }
+        defaults.update(params)
+        return ReviewPost.objects.create(**defaults)
+
+    def test_book_review_count_follows_reviews(self):
+        """Test the denormalized counter tracks creates and deletes."""
+        review = self.create_review()
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='Django@123',
+        )
+        self.create_review(reviewer=other)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.review_count, 2)
+
+        review.delete()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.review_count, 1)
+
+    def test_moved_review_recounted(self):
+        """Test moving a review to another book moves its count too."""
+        self.create_review()
+        other_book = Book.objects.create(title='Emma', author='Jane Austen')
+
+        review = ReviewPost.objects.get()
+        review.book = other_book
+        review.save()
+
+        self.book.refresh_from_db()
+        other_book.refresh_from_db()
+        self.assertEqual(self.book.review_count, 0)
+        self.assertEqual(other_book.review_count, 1)
+
+        review.book = self.book
+        review.save()
+
+        self.book.refresh_from_db()
+        other_book.refresh_from_db()
+        self.assertEqual(self.book.review_count, 1)
+        self.assertEqual(other_book.review_count, 0)
+
+    def test_refresh_review_counts(self):
+        """Test counters can be recomputed after bulk updates."""
+        self.create_review()
+        Book.objects.filter(pk=self.book.pk).update(review_count=7)
+
+        Book.objects.refresh_review_counts([self.book.pk])
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.review_count, 1)
+
+    def test_excerpt_and_reading_time(self):
+        """Test listing metadata is derived from the body on save."""
+        body = ' '.join(['word'] * 450)
+        review = self.create_review(review_content=body)
+
+        self.assertEqual(review.content_length, len(body))
+        self.assertEqual(review.reading_time, 3)
+        self.assertLessEqual(len(review.review_excerpt), 200)
+        self.assertTrue(review.review_excerpt.endswith('…'))
+
+    def test_content_deferred_by_default(self):
+        """Test listings leave the body out and detail views load it."""
+        self.create_review()
+
+        review = ReviewPost.objects.get()
+        self.assertIn('review_content', review.get_deferred_fields())
+        self.assertEqual(review.review_excerpt, 'Fear is the mind-killer.')
+
+        review = ReviewPost.objects.with_content().get()
+        self.assertEqual(review.get_deferred_fields(), set())
+
+    def test_saving_deferred_review_keeps_body(self):
+        """Test saving a listing instance leaves the stored body alone."""
+        self.create_review()
+
+        review = ReviewPost.objects.get()
+        review.rating = 4
+        review.save()
+
+        review = ReviewPost.objects.with_content().get()
+        self.assertEqual(review.rating, 4)
+        self.assertEqual(review.review_content, 'Fear is the mind-killer.')
@@ -0,0 +1,213 @@
+"""
+Tests for the pre-rendered book and review pages.
+"""
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from core_db import static_site
+from core_db.models import (
+    Book,
+    Change,
+    ChangeConsumer,
+    Comment,
+    Genre,
+    ReviewPost,
+)
+
+
+class StaticSiteTests(TransactionTestCase):
+    """Test full and incremental builds of the static site.
+
+    Incremental builds follow the change stream, which only shows
+    committed changes, hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(
+            STATIC_SITE_ROOT=self.root,
+            STATIC_SITE_BASE_URL='https://bookworm.example',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pass', first_name='Ada',
+        )
+        self.genre = Genre.objects.create(name='Fantasy', is_approved=True)
+        self.book = Book.objects.create(title='Dune', author='Herbert')
+        self.book.genres.add(self.genre)
+        self.review = ReviewPost.objects.create(
+            reviewer=self.user, book=self.book, review_title='Spice',
+            review_content='The spice must flow.', rating=5,
+        )
+
+    def page(self, kind, obj):
+        return self.root / kind / str(obj.pk) / obj.slug / 'index.html'
+
+    def test_full_build(self):
+        """Test a full build renders pages, sitemaps and the consumer."""
+        pages = static_site.build_all()
+
+        self.assertEqual(pages, 2)
+        book_page = self.page('books', self.book).read_text()
+        self.assertIn('<h1>Dune</h1>', book_page)
+        self.assertIn('Fantasy', book_page)
+        self.assertIn(static_site.page_url(
+            'reviews', self.review.pk, self.review.slug,
+        ), book_page)
+        self.assertIn(
+            'The spice must flow.',
+            self.page('reviews', self.review).read_text(),
+        )
+        sitemap = (self.root / 'sitemaps' / 'books-0.xml').read_text()
+        self.assertIn(
+            f'<loc>https://bookworm.example/books/{self.book.pk}/'
+            f'{self.book.slug}/</loc>',
+            sitemap,
+        )
+        self.assertIn(
+            'https://bookworm.example/sitemaps/reviews-0.xml',
+            (self.root / 'sitemap.xml').read_text(),
+        )
+        self.assertTrue(ChangeConsumer.objects.filter(
+            name=static_site.CONSUMER,
+        ).exists())
+        self.assertEqual(static_site.build_changes(), 0)
+
+    def test_full_build_in_processes(self):
+        """Test a build across forked processes renders the same pages."""
+        Book.objects.create(title='Emma', author='Austen')
+
+        self.assertEqual(static_site.build_all(processes=2), 3)
+        self.assertTrue(self.page('books', self.book).exists())
+        self.assertTrue(self.page('reviews', self.review).exists())
+
+    def test_full_build_removes_stale_pages(self):
+        """Test pages of deleted rows are gone after the next build."""
+        static_site.build_all()
+        ReviewPost.objects.filter(pk=self.review.pk).delete()
+
+        static_site.build_all()
+
+        self.assertFalse(
+            (self.root / 'reviews' / str(self.review.pk)).exists(),
+        )
+        self.assertFalse((self.root / 'sitemaps' / 'reviews-0.xml').exists())
+
+    def test_incremental_comment(self):
+        """Test a new comment re-renders its review's page only."""
+        other = Book.objects.create(title='Emma', author='Austen')
+        static_site.build_all()
+        book_page = self.page('books', other)
+        book_page.write_text('untouched')
+
+        Comment.objects.create(
+            user=self.user, review_post=self.review, content='Agreed.',
+        )
+        self.assertGreater(static_site.build_changes(), 0)
+
+        self.assertIn('Agreed.', self.page('reviews', self.review).read_text())
+        self.assertEqual(book_page.read_text(), 'untouched')
+
+    def test_incremental_new_review(self):
+        """Test a new review gets a page and is listed on its book's."""
+        static_site.build_all()
+        other = get_user_model().objects.create_user(
+            email='critic@example.com', password='pass',
+        )
+        review = ReviewPost.objects.create(
+            reviewer=other, book=self.book, review_title='Sand',
+            review_content='Worms everywhere.', rating=4,
+        )
+
+        static_site.build_changes()
+
+        self.assertIn('Worms everywhere.',
+                      self.page('reviews', review).read_text())
+        self.assertIn('Sand', self.page('books', self.book).read_text())
+
+    def test_incremental_slug_change(self):
+        """Test a new slug moves the page and drops the old one."""
+        static_site.build_all()
+        old_page = self.page('books', self.book)
+        Book.objects.filter(pk=self.book.pk).update(slug='dune-herbert-2')
+        self.book.refresh_from_db()
+
+        static_site.build_changes()
+
+        self.assertTrue(self.page('books', self.book).exists())
+        self.assertFalse(old_page.exists())
+
+    def test_incremental_genre(self):
+        """Test unapproving a genre hides its books and their reviews,
+        while count updates leave them alone."""
+        static_site.build_all()
+        book_page = self.page('books', self.book)
+        book_page.write_text('untouched')
+
+        Genre.objects.filter(pk=self.genre.pk).update(book_count=5)
+        static_site.build_changes()
+        self.assertEqual(book_page.read_text(), 'untouched')
+
+        Genre.objects.filter(pk=self.genre.pk).update(is_approved=False)
+        static_site.build_changes()
+        self.assertFalse((self.root / 'books' / str(self.book.pk)).exists())
+        self.assertFalse(
+            (self.root / 'reviews' / str(self.review.pk)).exists(),
+        )
+        self.assertFalse((self.root / 'sitemaps' / 'reviews-0.xml').exists())
+
+        Genre.objects.filter(pk=self.genre.pk).update(is_approved=True)
+        static_site.build_changes()
+        self.assertTrue(self.page('reviews', self.review).exists())
+
+    def test_reviews_of_hidden_books_left_out(self):
+        """Test a full build skips reviews of books hidden by genres."""
+        self.genre.is_approved = False
+        self.genre.save()
+
+        self.assertEqual(static_site.build_all(), 0)
+
+        self.assertFalse(self.page('reviews', self.review).exists())
+        self.assertFalse((self.root / 'sitemaps' / 'reviews-0.xml').exists())
+
+    def test_sitemap_rewritten_only_when_urls_change(self):
+        """Test edits leave sitemaps alone while new pages are added."""
+        static_site.build_all()
+        sitemap = self.root / 'sitemaps' / 'reviews-0.xml'
+        sitemap.write_text('untouched')
+
+        ReviewPost.objects.filter(pk=self.review.pk).update(rating=3)
+        static_site.build_changes()
+        self.assertEqual(sitemap.read_text(), 'untouched')
+
+        other = get_user_model().objects.create_user(
+            email='critic@example.com', password='pass',
+        )
+        review = ReviewPost.objects.create(
+            reviewer=other, book=self.book, review_content='Meh.', rating=2,
+        )
+        static_site.build_changes()
+        self.assertIn(
+            static_site.page_url('reviews', review.pk, review.slug),
+            sitemap.read_text(),
+        )
+
+    def test_command(self):
+        """Test the command runs full and incremental builds."""
+        out = StringIO()
+        call_command('build_static_site', processes=1, stdout=out)
+        self.assertIn('Rendered 2 pages.', out.getvalue())
+
+        Change.objects.all().delete()
+        ReviewPost.objects.filter(pk=self.review.pk).update(rating=3)
+        call_command('build_static_site', incremental=True, stdout=out)
+        self.assertIn('Applied 1 changes.', out.getvalue())
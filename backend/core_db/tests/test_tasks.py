@@ -0,0 +1,253 @@
+"""
+Tests for the database-backed task queue.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from backend import metrics
+from core_db import bulk_actions, tasks
+from core_db.models import BulkActionJob, Genre, Task
+
+calls = []
+
+
+@tasks.task('test_record', max_attempts=3)
+def record(value):
+    calls.append(value)
+
+
+@tasks.task('test_explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@tasks.task('test_sleep')
+def pause(seconds):
+    time.sleep(seconds)
+
+
+@override_settings(TASK_RETRY_BACKOFF=10, TASK_RETRY_BACKOFF_MAX=60)
+class TaskQueueTests(TestCase):
+    """Test enqueueing, claiming, retrying and running tasks."""
+
+    def setUp(self):
+        calls.clear()
+        metrics.reset()
+
+    def test_enqueue_and_run(self):
+        """Test queued tasks run in order with their arguments."""
+        tasks.enqueue('test_record', value=1)
+        tasks.enqueue('test_record', value=2)
+
+        self.assertEqual(tasks.run_pending(), 2)
+
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Task.objects.exclude(status=Task.Status.DONE))
+        self.assertIn(
+            'tasks_finished_last_hour{status="DONE",task="test_record"} 2',
+            metrics.render(),
+        )
+
+    def test_idempotency_key(self):
+        """Test enqueueing twice with one key queues a single task."""
+        first = tasks.enqueue('test_record', idempotency_key='k', value=1)
+        second = tasks.enqueue('test_record', idempotency_key='k', value=2)
+
+        self.assertEqual(first.pk, second.pk)
+        tasks.run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_delayed_task_waits(self):
+        """Test a task is not claimed before its run_at."""
+        tasks.enqueue('test_record', delay=timedelta(minutes=5), value=1)
+
+        self.assertEqual(tasks.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failure_retries_with_backoff(self):
+        """Test a failing task is retried later, then marked FAILED."""
+        queued = tasks.enqueue('test_explode')
+
+        tasks.run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn('boom', queued.last_error)
+        self.assertGreater(
+            queued.run_at, timezone.now() + timedelta(seconds=7),
+        )
+
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_backoff_is_capped(self):
+        self.assertLessEqual(tasks.backoff(20), 60 * 1.2)
+
+    def test_running_task_not_claimed_twice(self):
+        """Test a claimed task is invisible to other claims."""
+        tasks.enqueue('test_record', value=1)
+
+        self.assertIsNotNone(tasks.claim_task())
+        self.assertIsNone(tasks.claim_task())
+
+    def test_stale_task_requeued(self):
+        """Test a task left RUNNING by a dead worker is run again."""
+        tasks.enqueue('test_record', value=1)
+        tasks.claim_task()
+        Task.objects.update(
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_long_task_with_heartbeat_left_running(self):
+        """Test a task started long ago is not requeued while it beats."""
+        queued = tasks.enqueue('test_record', value=1)
+        tasks.claim_task()
+        Task.objects.update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(tasks.run_pending(), 0)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.RUNNING)
+        self.assertEqual(calls, [])
+
+    def test_stale_task_out_of_attempts_failed(self):
+        """Test a lost task that used its last attempt is not run again."""
+        queued = tasks.enqueue('test_record', value=1)
+        Task.objects.update(
+            status=Task.Status.RUNNING, attempts=3,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+
+        self.assertEqual(tasks.run_pending(), 0)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.FAILED)
+        self.assertIn('Worker lost', queued.last_error)
+        self.assertEqual(calls, [])
+
+    @override_settings(TASK_RETENTION=24 * 3600)
+    def test_prune_finished_tasks(self):
+        """Test tasks finished before the retention period are deleted."""
+        now = timezone.now()
+        old = now - timedelta(days=2)
+        Task.objects.bulk_create([
+            Task(name='test_record', status=Task.Status.DONE,
+                 finished_at=old),
+            Task(name='test_record', status=Task.Status.FAILED,
+                 finished_at=old),
+            Task(name='test_record', status=Task.Status.DONE,
+                 finished_at=now),
+            Task(name='test_record', run_at=old),
+        ])
+
+        self.assertEqual(tasks.prune(chunk_size=1), 2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_prune_scheduled_once_an_hour(self):
+        """Test idle workers queue one prune task per hour."""
+        first = tasks.schedule_prune()
+        second = tasks.schedule_prune()
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(first.name, 'prune_tasks')
+
+    def test_metrics_count_queued_tasks(self):
+        """Test queued tasks are read from the table for /metrics."""
+        tasks.enqueue('test_record', value=1)
+        tasks.enqueue('test_record', value=2)
+
+        self.assertIn(
+            'tasks{status="QUEUED",task="test_record"} 2', metrics.render(),
+        )
+
+    def test_run_workers_command(self):
+        """Test the worker command drains the queue in burst mode."""
+        for value in range(3):
+            tasks.enqueue('test_record', value=value)
+
+        call_command('run_workers', '--burst')
+
+        self.assertEqual(calls, [0, 1, 2])
+
+    def test_bulk_action_job_runs_as_task(self):
+        """Test background bulk actions are queued as tasks."""
+        Genre.objects.create(name='Fantasy')
+        Genre.objects.create(name='Horror')
+        job = bulk_actions.create_job('approve_genres', Genre.objects.all())
+
+        tasks.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkActionJob.Status.DONE)
+        self.assertFalse(Genre.objects.filter(is_approved=False).exists())
+        self.assertEqual(
+            Task.objects.get().idempotency_key, f'bulk-action-job:{job.pk}',
+        )
+
+    def test_bulk_action_job_of_dead_worker_resumed(self):
+        """Test a job left RUNNING by a dead worker resumes from last_pk."""
+        first = Genre.objects.create(name='Fantasy')
+        Genre.objects.create(name='Horror')
+        job = bulk_actions.create_job('approve_genres', Genre.objects.all())
+        # The worker approved the first genre, then died.
+        Genre.objects.filter(pk=first.pk).update(is_approved=True)
+        BulkActionJob.objects.filter(pk=job.pk).update(
+            status=BulkActionJob.Status.RUNNING, processed=1,
+            last_pk=first.pk, updated_at=timezone.now() - timedelta(hours=1),
+        )
+        Task.objects.update(
+            status=Task.Status.RUNNING, attempts=1,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+
+        tasks.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkActionJob.Status.DONE)
+        self.assertEqual(job.processed, 2)
+        self.assertFalse(Genre.objects.filter(is_approved=False).exists())
+
+    def test_running_bulk_action_job_checked_again_later(self):
+        """Test a job running elsewhere is looked at again once stale."""
+        Genre.objects.create(name='Fantasy')
+        job = bulk_actions.create_job('approve_genres', Genre.objects.all())
+        BulkActionJob.objects.filter(pk=job.pk).update(
+            status=BulkActionJob.Status.RUNNING,
+        )
+
+        tasks.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkActionJob.Status.RUNNING)
+        retry = Task.objects.get(status=Task.Status.QUEUED)
+        self.assertEqual(retry.kwargs, {'job_id': job.pk})
+        self.assertGreater(retry.run_at, timezone.now())
+
+
+@override_settings(TASK_HEARTBEAT_INTERVAL=0.05)
+class TaskHeartbeatTests(TransactionTestCase):
+    """Test running tasks keep their heartbeat fresh.
+
+    The heartbeat is written from its own thread and connection, which
+    only sees committed tasks, hence TransactionTestCase.
+    """
+
+    def test_heartbeat_refreshed_while_running(self):
+        """Test a running task's heartbeat moves past its start."""
+        queued = tasks.enqueue('test_sleep', seconds=0.3)
+
+        self.assertEqual(tasks.run_pending(), 1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.DONE)
+        self.assertGreater(queued.heartbeat_at, queued.started_at)